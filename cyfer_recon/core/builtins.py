@@ -0,0 +1,196 @@
+"""
+Registry of built-in stages that can be used as commands in tasks.json.
+
+A built-in is written like any other command (e.g. `cyfer-jsscan {output}/js/live_output.txt {output}/js`)
+but runs inside the cyfer_recon process instead of spawning a tool.
+"""
+import argparse
+import os
+import shlex
+import subprocess
+import traceback
+from typing import Callable, Dict, List, Optional, Tuple
+
+_BUILTINS = {}  # type: Dict[str, Callable[[List[str], Optional[str]], Optional[str]]]
+_REQUIRES = {}  # type: Dict[str, Tuple[str, ...]]
+_PASSIVE = set()
+_LIST_READERS = set()
+
+
+def builtin(name: str, requires: Tuple[str, ...] = (), passive: bool = False, reads_lists: bool = False):
+    """
+    Decorator registering a built-in. The function gets (args, cwd) and returns text for stdout (or None).
+    Built-ins run in worker threads, so they must not print; raising marks the command as failed.
+    requires lists the external tools (tools.json names) the built-in drives.
+    passive marks built-ins that only work on local files, like `"passive": true` tools in tools.json.
+    reads_lists marks built-ins taking host lists next to the target; the liveness gate never skips them,
+    since an unreachable target is one of many hosts they scan.
+    """
+    def register(func):
+        _BUILTINS[name] = func
+        _REQUIRES[name] = tuple(requires)
+        if passive:
+            _PASSIVE.add(name)
+        if reads_lists:
+            _LIST_READERS.add(name)
+        return func
+    return register
+
+
+def is_builtin(name: str) -> bool:
+    return name in _BUILTINS
+
+
+def is_passive_builtin(name: str) -> bool:
+    return name in _PASSIVE
+
+
+def reads_lists(name: str) -> bool:
+    return name in _LIST_READERS
+
+
+def builtin_requirements(name: str) -> Tuple[str, ...]:
+    """External tools needed by a built-in (empty for unknown names)."""
+    return _REQUIRES.get(name, ())
+
+
+class _ArgumentParser(argparse.ArgumentParser):
+    """ArgumentParser that raises instead of exiting the whole process."""
+
+    def error(self, message):
+        raise ValueError(f"{self.prog}: {message}\n{self.format_usage()}")
+
+
+def make_parser(name: str, description: str) -> argparse.ArgumentParser:
+    return _ArgumentParser(prog=name, description=description)
+
+
+def run_builtin(argv: List[str], cwd: Optional[str] = None) -> subprocess.CompletedProcess:
+    """Run a built-in and return a CompletedProcess as if it had been a subprocess."""
+    func = _BUILTINS[argv[0]]
+    try:
+        out = func(argv[1:], cwd)
+    except ValueError as e:
+        return subprocess.CompletedProcess(argv, 2, '', f"{e}\n")
+    except SystemExit as e:
+        return subprocess.CompletedProcess(argv, e.code or 0, '', '')
+    except Exception:
+        return subprocess.CompletedProcess(argv, 1, '', traceback.format_exc())
+    return subprocess.CompletedProcess(argv, 0, out or '', '')
+
+
+def _path(path: str, cwd: Optional[str]) -> str:
+    if cwd and not os.path.isabs(path):
+        return os.path.join(cwd, path)
+    return path
+
+
+@builtin("cyfer-jsscan")
+def _jsscan(args, cwd):
+    from cyfer_recon.core.js_analysis import analyze_js_urls
+    parser = make_parser("cyfer-jsscan", "Fetch live JS files once and extract endpoints, secrets and storage references.")
+    parser.add_argument("urls_file", help="File with one JavaScript URL per line (e.g. js/live_output.txt).")
+    parser.add_argument("out_dir", help="Folder for linkfinder_*.txt, manual_secrets.txt and local_storage_refs.txt.")
+    parser.add_argument("--workers", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=15.0)
+    opts = parser.parse_args(args)
+    stats = analyze_js_urls(_path(opts.urls_file, cwd), _path(opts.out_dir, cwd), workers=opts.workers, timeout=opts.timeout)
+    return f"{stats['fetched']} fetched, {stats['unique']} unique bodies, {stats['endpoints']} endpoints, {stats['secrets']} secret lines\n"
+
+
+@builtin("cyfer-urlnorm", passive=True)
+def _urlnorm(args, cwd):
+    from cyfer_recon.core.urls import collapse_url_files
+    parser = make_parser("cyfer-urlnorm", "Merge URL dumps, normalize them and collapse near-duplicates.")
+    parser.add_argument("output", help="File to write the unique URLs to (e.g. urls/{target}_unique.txt).")
+    parser.add_argument("inputs", nargs="+", help="URL dump files; missing files are skipped.")
+    parser.add_argument("--keep-static", action="store_true", help="Keep images, fonts, stylesheets and other static files.")
+    opts = parser.parse_args(args)
+    written = collapse_url_files([_path(p, cwd) for p in opts.inputs], _path(opts.output, cwd), keep_static=opts.keep_static)
+    return f"{written} unique URLs\n"
+
+
+@builtin("cyfer-favicon", reads_lists=True)
+def _favicon(args, cwd):
+    from cyfer_recon.core.favicon import hash_favicons
+    parser = make_parser("cyfer-favicon", "Fetch the favicons of many hosts once and write their Shodan mmh3 and md5 hashes.")
+    parser.add_argument("output", help="File to write '<mmh3> <md5> <icon URL>' lines to (e.g. favicons/{target}_favfreak.txt).")
+    parser.add_argument("inputs", nargs="+", help="URLs, or host/URL lists such as {target}_alive_subs.txt; missing files are skipped.")
+    parser.add_argument("--workers", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    opts = parser.parse_args(args)
+    inputs = [p if '://' in p else _path(p, cwd) for p in opts.inputs]
+    stats = hash_favicons(inputs, _path(opts.output, cwd), workers=opts.workers, timeout=opts.timeout)
+    return f"{stats['icons']} icons ({stats['unique']} distinct) on {stats['hosts'] - stats['unreachable']} of {stats['hosts']} hosts\n"
+
+
+@builtin("cyfer-techscan", reads_lists=True)
+def _techscan(args, cwd):
+    from cyfer_recon.core.fingerprint import fingerprint_hosts
+    parser = make_parser("cyfer-techscan", "Fetch many hosts once and fingerprint their technologies with Wappalyzer-format signatures.")
+    parser.add_argument("output", help="JSON report to write (e.g. tech/{target}_tech.json).")
+    parser.add_argument("inputs", nargs="+", help="URLs, or host/URL lists such as {target}_alive_subs.txt; missing files are skipped.")
+    parser.add_argument("--signatures", action="append", default=[],
+                        help="Extra Wappalyzer-format file or technologies/ directory (repeatable; overrides the bundled signatures).")
+    parser.add_argument("--workers", type=int, default=20)
+    parser.add_argument("--processes", type=int, default=None, help="Matching processes (default: CPU count; 1 matches in-process).")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    opts = parser.parse_args(args)
+    inputs = [p if '://' in p else _path(p, cwd) for p in opts.inputs]
+    stats = fingerprint_hosts(inputs, _path(opts.output, cwd), signatures=[_path(p, cwd) for p in opts.signatures],
+                              workers=opts.workers, processes=opts.processes, timeout=opts.timeout)
+    return f"{stats['technologies']} technologies ({stats['detections']} detections) on {stats['reachable']} of {stats['hosts']} hosts\n"
+
+
+@builtin("cyfer-probe")
+def _probe(args, cwd):
+    from cyfer_recon.core import storage
+    from cyfer_recon.core.probe import DEFAULT_CONCURRENCY, DEFAULT_TIMEOUT, FORMATS, PER_HOST_LIMIT, probe_to_file
+    parser = make_parser("cyfer-probe", "Probe URLs and hosts over HTTP(S) with the run's shared connection pools and write one view of the results.")
+    parser.add_argument("inputs", nargs="+", help="URLs, bare hosts, or lists of them (e.g. unique_subdomains.txt); missing files are skipped.")
+    parser.add_argument("-o", "--output", required=True, help="File to write, one line per answering URL.")
+    parser.add_argument("--format", choices=FORMATS, default="live",
+                        help="urls: URL; live: URL [status]; headers: + title, server, missing security headers; "
+                             "tech: + title, technologies; json: everything, one object per line.")
+    parser.add_argument("--mc", default="", help="Only write these status codes (comma-separated).")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--per-host", type=int, default=PER_HOST_LIMIT, help="Requests in flight per host.")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    opts = parser.parse_args(args)
+    try:
+        codes = [int(c) for c in opts.mc.split(',') if c.strip()]
+    except ValueError:
+        raise ValueError(f"cyfer-probe: invalid --mc {opts.mc!r}")
+    # Anything that is not a URL, a path or an existing list is a bare host
+    inputs = [p if '://' in p or ('/' not in p and not storage.exists(_path(p, cwd))) else _path(p, cwd) for p in opts.inputs]
+    stats = probe_to_file(inputs, _path(opts.output, cwd), fmt=opts.format, match_codes=codes, timeout=opts.timeout,
+                          concurrency=opts.concurrency, per_host=max(1, opts.per_host))
+    return f"{stats['written']} written, {stats['answered']} of {stats['probed']} URLs answered\n"
+
+
+@builtin("cyfer-portscan", requires=("rustscan", "nmap"))
+def _portscan(args, cwd):
+    from cyfer_recon.core.portscan import parse_open_ports, run_rustscan, run_targeted_nmap
+    parser = make_parser("cyfer-portscan", "Discover open ports with rustscan, then run nmap -sC -sV on those ports only.")
+    parser.add_argument("target", help="Host, IP or CIDR passed to rustscan -a.")
+    parser.add_argument("nmap_output", help="Merged nmap normal output (e.g. {target}_nmap.txt).")
+    parser.add_argument("--rustscan-output", help="Where to keep rustscan's greppable output (default: next to nmap_output).")
+    parser.add_argument("--from-file", action="store_true",
+                        help="Skip discovery and read open ports from --rustscan-output (rustscan -g or nmap -oG).")
+    parser.add_argument("--ulimit", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=4, help="Parallel nmap processes, one per host.")
+    parser.add_argument("--nmap-args", default="-Pn -n -T4 --open", help="Extra nmap arguments (quoted).")
+    opts = parser.parse_args(args)
+    nmap_output = _path(opts.nmap_output, cwd)
+    rustscan_output = _path(opts.rustscan_output, cwd) if opts.rustscan_output else \
+        os.path.join(os.path.dirname(nmap_output), f"{opts.target.replace('/', '_')}_rustscan.txt")
+    if not opts.from_file:
+        result = run_rustscan(opts.target, rustscan_output, ulimit=opts.ulimit)
+        if result.returncode != 0:
+            raise RuntimeError(f"rustscan exited with {result.returncode}: {result.stderr.decode('utf-8', 'replace').strip()}")
+    open_ports = parse_open_ports(rustscan_output)
+    failed = run_targeted_nmap(open_ports, nmap_output, workers=opts.workers, nmap_args=shlex.split(opts.nmap_args))
+    if failed:
+        raise RuntimeError(f"nmap failed for: {', '.join(failed)}")
+    total = sum(len(p) for p in open_ports.values())
+    return f"{total} open ports on {len(open_ports)} hosts\n"
@@ -0,0 +1,247 @@
+"""
+Invocation coalescing: one run of a scanner instead of several runs against the same input.
+
+Full Recon runs nuclei in many tasks, often with the same target URL or alive list. Each run reloads
+the whole template tree and re-sends the same baseline requests. Tools opt in through their tools.json
+entry:
+
+    "coalesce": {
+        "selectors": {"-tags": {"field": "info.tags", "match": "any"},
+                      "-t": {"field": "template-path", "match": "path"}},
+        "output": "-o",
+        "flags": "-jsonl -omit-raw",
+        "line": "[{template-id}] [{type}] [{info.severity}] {matched-at}"
+    }
+
+Commands of the tool that differ only in their selector values and output file are merged into
+one command. It runs with the union of the selector values and writes JSONL (added "flags") to
+{output}/coalesced/. Afterwards every result is written, formatted with "line", to the output
+file of each original command whose selectors match it: "any" compares comma-separated values
+and "path" looks for the path in the field. The merged command takes the place of the last
+command it replaces, so it runs only after everything that ran before any of them.
+"""
+import hashlib
+import json
+import os
+import re
+import shlex
+from typing import Any, Dict, List, Optional, Tuple
+
+from cyfer_recon.core import storage
+from cyfer_recon.core.templates import CommandTemplate, Part, _split_parts
+
+COALESCED_DIR = 'coalesced'
+# Words that make a command more than `tool ...` or `cat FILE | tool ...`
+_SHELL_WORDS = ('|', '||', '&', '&&', ';', '<', '>', '>>', '2>', '2>&1')
+_FIELD_RE = re.compile(r'\{([A-Za-z0-9_.\-]+)\}')
+
+Plan = List[Tuple[str, List[CommandTemplate], bool]]
+
+
+class CoalescedTemplate(CommandTemplate):
+    """A merged command plus, per replaced command, its selectors and output file."""
+
+    def __init__(self, source: str, task: str, spec: Dict[str, Any], result_file: str,
+                 members: List[Tuple[Dict[str, List[str]], str]]):
+        super().__init__(source, task)
+        self.spec = spec
+        self.result_file = _split_parts(result_file)
+        self.members = [(selectors, _split_parts(path)) for selectors, path in members]
+
+    def split(self, **values: str) -> Dict[str, int]:
+        """Write the merged results to the replaced commands' output files; returns results per file."""
+        values = self._values(values)
+        result_file = _join(self.result_file, values)
+        outputs = [(selectors, _join(path, values)) for selectors, path in self.members]
+        files = {}  # type: Dict[str, Any]
+        counts = {path: 0 for _, path in outputs}
+        try:
+            for line in storage.iter_lines(result_file) if storage.exists(result_file) else ():
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(result, dict):
+                    continue
+                text = None
+                for selectors, path in outputs:
+                    if not _matches(result, selectors, self.spec['selectors']):
+                        continue
+                    if text is None:
+                        text = format_result(result, self.spec.get('line'))
+                    if path not in files:
+                        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                        files[path] = storage.open_text(path, 'w')
+                    files[path].write(text + '\n')
+                    counts[path] += 1
+        finally:
+            for f in files.values():
+                f.close()
+        # Results of a previous run must not survive a run that found nothing
+        for path, count in counts.items():
+            if not count and storage.exists(path):
+                storage.open_text(path, 'w').close()
+        return counts
+
+
+def _join(parts: Tuple[Part, ...], values: Dict[str, str]) -> str:
+    return ''.join(p if isinstance(p, str) else values[p[0]] for p in parts)
+
+
+def _field(result: Dict[str, Any], name: str) -> Any:
+    value = result
+    for key in name.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def _values_of(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip().lower() for v in value]
+    return [v.strip().lower() for v in str(value).split(',')]
+
+
+def _matches(result: Dict[str, Any], selectors: Dict[str, List[str]], config: Dict[str, Dict[str, str]]) -> bool:
+    """True if the result satisfies every selector flag of one replaced command."""
+    for flag, wanted in selectors.items():
+        field = _field(result, config[flag]['field'])
+        if config[flag].get('match') == 'path':
+            path = '/' + str(field or '').replace('\\', '/').strip('/') + '/'
+            if not any('/' + w.replace('\\', '/').strip('/') + '/' in path for w in wanted):
+                return False
+        elif not set(_values_of(field)) & {w.lower() for w in wanted}:
+            return False
+    return True
+
+
+def format_result(result: Dict[str, Any], line: Optional[str]) -> str:
+    """Render a JSON result with a "{dotted.field}" line format (the raw JSON without one)."""
+    if not line:
+        return json.dumps(result, sort_keys=True)
+
+    def repl(m):
+        value = _field(result, m.group(1))
+        if value is None:
+            return ''
+        if isinstance(value, (list, tuple)):
+            return ','.join(str(v) for v in value)
+        return str(value)
+    return _FIELD_RE.sub(repl, line).strip()
+
+
+def _parse(template: CommandTemplate, tool: str, spec: Dict[str, Any]) -> Optional[Tuple[tuple, Dict[str, List[str]], str]]:
+    """(key, selectors, output) of a mergeable command of tool, or None."""
+    text = template.text
+    words = text.split()
+    try:
+        if shlex.split(text) != words:
+            return None  # quoting: keep it as written
+    except ValueError:
+        return None
+    if words[0] == tool:
+        prefix, args = [], words[1:]
+    elif len(words) > 3 and words[0] == 'cat' and words[2] == '|' and words[3] == tool:
+        prefix, args = words[:3], words[4:]
+    else:
+        return None
+    if any(w in _SHELL_WORDS for w in args) or 'wordlist' in template.placeholders:
+        return None
+    for flag in (spec.get('flags') or '').split():
+        if flag in args:
+            return None
+    selectors = {}  # type: Dict[str, List[str]]
+    output = None
+    base = []
+    idx = 0
+    while idx < len(args):
+        word = args[idx]
+        if word in spec['selectors'] and idx + 1 < len(args):
+            selectors.setdefault(word, []).extend(v for v in args[idx + 1].split(',') if v)
+            idx += 2
+        elif word == spec.get('output', '-o') and idx + 1 < len(args):
+            if output is not None:
+                return None
+            output = args[idx + 1]
+            idx += 2
+        else:
+            base.append(word)
+            idx += 1
+    if not selectors or output is None or not output.startswith('{output}/'):
+        return None
+    return (tuple(prefix), tuple(base), frozenset(selectors)), selectors, output
+
+
+def _coalesce_specs(tools_config: Optional[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    specs = {}
+    for tool, info in (tools_config or {}).items():
+        if isinstance(info, dict) and isinstance(info.get('coalesce'), dict) and info['coalesce'].get('selectors'):
+            specs[info.get('check') or tool] = info['coalesce']
+    return specs
+
+
+def _mentions(template: CommandTemplate, paths: List[str]) -> bool:
+    return any(p in template.text for p in paths)
+
+
+def optimize(plan: Plan, tools_config: Optional[Dict[str, Any]]) -> Plan:
+    """
+    Replace groups of mergeable commands in the plan with one CoalescedTemplate each.
+    Commands are only merged when they run in the same mode (concurrent or sequential), when no other
+    command mentions their output files, and, for concurrent commands outside the merged command's
+    task, when no earlier command of their own task mentions their input (it might be producing it).
+    """
+    specs = _coalesce_specs(tools_config)
+    if not specs:
+        return plan
+    # (tool, key, concurrent) -> [(plan index, template index, selectors, output)]
+    groups = {}  # type: Dict[tuple, List[Tuple[int, int, Dict[str, List[str]], str]]]
+    for pi, (task, templates, task_concurrent) in enumerate(plan):
+        for ti, template in enumerate(templates):
+            for tool, spec in specs.items():
+                parsed = _parse(template, tool, spec)
+                if parsed is not None:
+                    groups.setdefault((tool, parsed[0], task_concurrent), []).append((pi, ti, parsed[1], parsed[2]))
+                    break
+    every = [t for _, templates, _ in plan for t in templates]
+    replace = {}  # (plan index, template index) -> merged template or None to drop
+    for (tool, key, task_concurrent), members in groups.items():
+        members = [m for m in members if not any(t is not plan[m[0]][1][m[1]] and m[3] in t.text for t in every)]
+        last_pi = members[-1][0] if members else None
+        if task_concurrent:
+            inputs = [w for w in key[0] + key[1] if '{output}' in w]
+            members = [m for m in members if m[0] == last_pi
+                       or not any(_mentions(t, inputs) for t in plan[m[0]][1][:m[1]])]
+        if len(members) < 2:
+            continue
+        spec = specs[tool]
+        prefix, base, flags = key
+        merged_selectors = []
+        for flag in sorted(flags):
+            values = []  # type: List[str]
+            for _, _, selectors, _ in members:
+                values.extend(v for v in selectors[flag] if v not in values)
+            merged_selectors += [flag, ','.join(values)]
+        words = list(prefix) + [tool] + list(base) + merged_selectors + (spec.get('flags') or '').split()
+        digest = hashlib.sha1(' '.join(words).encode('utf-8')).hexdigest()[:10]
+        result_file = f"{{output}}/{COALESCED_DIR}/{tool}_{digest}.jsonl"
+        words += [spec.get('output', '-o'), result_file]
+        pi, ti = members[-1][0], members[-1][1]
+        replace[(pi, ti)] = CoalescedTemplate(' '.join(words), plan[pi][0], spec, result_file,
+                                              [(selectors, output) for _, _, selectors, output in members])
+        for m in members[:-1]:
+            replace[(m[0], m[1])] = None
+    if not replace:
+        return plan
+    optimized = []
+    for pi, (task, templates, task_concurrent) in enumerate(plan):
+        kept = []
+        for ti, template in enumerate(templates):
+            new = replace.get((pi, ti), template)
+            if new is not None:
+                kept.append(new)
+        optimized.append((task, kept, task_concurrent))
+    return optimized
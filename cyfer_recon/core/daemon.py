@@ -0,0 +1,511 @@
+"""
+Long-running scan service (`cyfer-recon serve`).
+
+Configs, compiled templates, limits and the installed-tool index are loaded once at startup.
+Scan jobs (targets plus a preset or task list) are submitted over a small JSON API on localhost
+HTTP or a Unix socket, persisted under ~/.cyfer_recon/queue and run by a few scan slots on one
+shared, warm worker pool. Jobs still queued or interrupted while running are picked up again when
+the service restarts.
+
+    POST   /jobs                         {"targets": ["example.com"], "preset": "Quick Recon"}
+    GET    /jobs                         all jobs, newest first
+    GET    /jobs/<id>                    one job's status
+    DELETE /jobs/<id>                    cancel a queued job
+    GET    /jobs/<id>/log                the job's console output
+    GET    /jobs/<id>/results            output files per target
+    GET    /jobs/<id>/results/<target>/<path>   one output file (decompressed)
+    GET    /health                       queue counters
+
+Every request must carry "Authorization: Bearer <token>". The token is generated at each start and
+written owner-only to ~/.cyfer_recon/serve.token (next to the queue directory). Requests sending an
+Origin header (browsers) or, over TCP, a Host that is not a loopback name or the listen address are
+refused, and POST bodies must be sent as application/json. A web page the operator visits can
+therefore neither submit jobs nor read results, including through DNS rebinding.
+"""
+import json
+import os
+import re
+import secrets
+import shutil
+import socketserver
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+from rich.console import Console
+
+from cyfer_recon.core import history, storage
+from cyfer_recon.core.config_utils import CONFIG_DIR
+from cyfer_recon.core.limits import tool_limits
+from cyfer_recon.core.targets import Deduplicator, expand_entry, normalize_target
+from cyfer_recon.core.task_runner import default_workers, postprocess_subdomains, run_custom_commands, run_tasks
+from cyfer_recon.core.templates import compile_tasks
+from cyfer_recon.core.tool_checker import check_tools
+from cyfer_recon.core.utils import target_output_dir
+
+DEFAULT_QUEUE_DIR = os.path.join(CONFIG_DIR, "queue")
+DEFAULT_PORT = 8787
+TOKEN_FILE_NAME = "serve.token"
+LOOPBACK_HOSTS = ('localhost', '127.0.0.1', '::1')
+MAX_REQUEST_BYTES = 1024 * 1024
+LIVE_STATUS_CODES = [200, 301, 302, 403, 401]
+
+_JOB_ID_RE = re.compile(r'^[0-9]{14}-[0-9a-f]{6}$')
+
+
+class ScanConfig:
+    """Everything a scan needs that does not change between jobs, loaded and checked once."""
+
+    def __init__(self, tasks_config: Dict[str, Any], tools_config: Dict[str, Any], presets: Dict[str, Any],
+                 custom_presets: Dict[str, Any], wordlists: Dict[str, str]):
+        self.tasks_config = tasks_config
+        self.tools_config = tools_config
+        self.presets = presets
+        self.custom_presets = custom_presets
+        self.wordlists = {tool: path for tool, path in wordlists.items() if path}
+        # Raise TemplateError / ValueError now rather than in the middle of a job
+        compile_tasks(tasks_config)
+        tool_limits(tools_config)
+        # Tool index: missing tools per task, resolved once instead of per job
+        self.missing_by_task = {task: check_tools([task], tasks_config, tools_config) for task in tasks_config}
+
+    def resolve(self, spec: Dict[str, Any]) -> Tuple[List[str], Optional[List[str]]]:
+        """(task names, custom commands) for a job spec naming a preset or a list of tasks."""
+        preset = spec.get('preset')
+        if preset:
+            if preset in self.presets:
+                return [t for t in self.presets[preset]['tasks'] if t in self.tasks_config], None
+            if preset in self.custom_presets:
+                return [], list(self.custom_presets[preset]['commands'])
+            raise ValueError(f"Unknown preset: {preset}")
+        tasks = spec.get('tasks')
+        if not tasks or not isinstance(tasks, list):
+            raise ValueError("A job needs a 'preset' or a non-empty 'tasks' list")
+        unknown = [t for t in tasks if t not in self.tasks_config]
+        if unknown:
+            raise ValueError(f"Unknown task(s): {', '.join(unknown)}")
+        return list(tasks), None
+
+    def missing_tools(self, tasks: List[str], commands: Optional[List[str]]) -> List[str]:
+        missing = set()
+        for task in tasks:
+            missing.update(self.missing_by_task.get(task, {}))
+        for cmd in commands or []:
+            tool = cmd.split()[0]
+            info = self.tools_config.get(tool)
+            if info and not info['check'].startswith('file:') and shutil.which(info['check']) is None:
+                missing.add(tool)
+        return sorted(missing)
+
+
+def iter_job_targets(entries: List[str]):
+    """Expanded, normalized, deduplicated targets of a job (entries are never read as file paths)."""
+    dedup = Deduplicator()
+    for raw in entries:
+        for entry in str(raw).replace(',', ' ').split():
+            for expanded in expand_entry(entry):
+                target = normalize_target(expanded)
+                if target is not None and dedup.add(target):
+                    yield target
+
+
+class JobStore:
+    """Persistent job queue: one JSON file per job in a directory, plus an in-memory FIFO of queued ids."""
+
+    def __init__(self, path: str = DEFAULT_QUEUE_DIR):
+        self.path = path
+        self._cond = threading.Condition()
+        self._jobs = {}  # type: Dict[str, Dict[str, Any]]
+        self._queue = deque()  # type: deque
+        os.makedirs(path, exist_ok=True)
+        for name in sorted(os.listdir(path)):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(path, name), 'r', encoding='utf-8') as f:
+                    job = json.load(f)
+            except (OSError, ValueError):
+                continue
+            self._jobs[job['id']] = job
+            if job['status'] == 'running':
+                # Interrupted by a restart: run it again
+                job['status'] = 'queued'
+                job['note'] = 'requeued after restart'
+                self._save(job)
+            if job['status'] == 'queued':
+                self._queue.append(job['id'])
+
+    def _save(self, job: Dict[str, Any]) -> None:
+        target = os.path.join(self.path, f"{job['id']}.json")
+        with open(target + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(job, f, indent=1)
+        os.replace(target + '.tmp', target)
+
+    def log_path(self, job_id: str) -> str:
+        return os.path.join(self.path, f"{job_id}.log")
+
+    def submit(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        job_id = f"{time.strftime('%Y%m%d%H%M%S')}-{secrets.token_hex(3)}"
+        job = dict(spec, id=job_id, status='queued', submitted=time.time(), started=None, finished=None,
+                   results={}, error=None)
+        with self._cond:
+            self._jobs[job_id] = job
+            self._save(job)
+            self._queue.append(job_id)
+            self._cond.notify()
+        return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            return sorted((dict(j) for j in self._jobs.values()), key=lambda j: j['submitted'], reverse=True)
+
+    def counts(self) -> Dict[str, int]:
+        counts = {}  # type: Dict[str, int]
+        with self._cond:
+            for job in self._jobs.values():
+                counts[job['status']] = counts.get(job['status'], 0) + 1
+        return counts
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        with self._cond:
+            job = self._jobs[job_id]
+            job.update(fields)
+            self._save(job)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued job; running and finished jobs are left alone."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job['status'] != 'queued':
+                return False
+            job.update(status='cancelled', finished=time.time())
+            self._save(job)
+            return True
+
+    def next(self, stop: threading.Event, timeout: float = 1.0) -> Optional[Dict[str, Any]]:
+        """Take the oldest queued job (marking it running), or None once stop is set."""
+        with self._cond:
+            while not stop.is_set():
+                while self._queue:
+                    job = self._jobs[self._queue.popleft()]
+                    if job['status'] == 'queued':
+                        job.update(status='running', started=time.time())
+                        self._save(job)
+                        return dict(job)
+                self._cond.wait(timeout)
+        return None
+
+    def wake(self) -> None:
+        with self._cond:
+            self._cond.notify_all()
+
+
+class ScanDaemon:
+    """Runs queued jobs on scan slots that share one warm worker pool."""
+
+    def __init__(self, config: ScanConfig, store: JobStore, output_root: str, workers: Optional[int] = None,
+                 scan_slots: int = 2, skip_live_check: bool = False, live_check_tool: str = 'cyfer-probe',
+                 discord_webhook: Optional[str] = None):
+        self.config = config
+        self.store = store
+        self.output_root = output_root
+        self.workers = workers or default_workers()
+        self.scan_slots = max(1, scan_slots)
+        self.skip_live_check = skip_live_check
+        self.live_check_tool = live_check_tool
+        self.discord_webhook = discord_webhook
+        self.executor = None  # type: Optional[ThreadPoolExecutor]
+        self._stop = threading.Event()
+        self._runners = []  # type: List[threading.Thread]
+
+    def start(self) -> 'ScanDaemon':
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='cyfer-worker')
+        for idx in range(self.scan_slots):
+            t = threading.Thread(target=self._run_slot, name=f"cyfer-scan-{idx}", daemon=True)
+            t.start()
+            self._runners.append(t)
+        return self
+
+    def stop(self) -> None:
+        """Stop taking jobs; running jobs stay 'running' on disk and are requeued on the next start."""
+        self._stop.set()
+        self.store.wake()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+    def submit(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate a job spec against the loaded configs and queue it. Raises ValueError."""
+        targets = spec.get('targets')
+        if isinstance(targets, str):
+            targets = [targets]
+        if not targets or not isinstance(targets, list):
+            raise ValueError("A job needs 'targets' (a list or a comma-separated string)")
+        if next(iter_job_targets(targets), None) is None:
+            raise ValueError("No valid targets")
+        tasks, commands = self.config.resolve(spec)
+        missing = self.config.missing_tools(tasks, commands)
+        if missing:
+            raise ValueError(f"Missing tool(s): {', '.join(missing)}")
+        return self.store.submit({
+            'targets': [str(t) for t in targets],
+            'preset': spec.get('preset'),
+            'tasks': tasks,
+            'commands': commands,
+            'concurrent': bool(spec.get('concurrent', True)),
+            'output_dir': None,
+        })
+
+    def _run_slot(self) -> None:
+        while not self._stop.is_set():
+            job = self.store.next(self._stop)
+            if job is None:
+                return
+            try:
+                self.run_job(job)
+            except Exception as e:
+                self.store.update(job['id'], status='failed', finished=time.time(), error=str(e))
+
+    def run_job(self, job: Dict[str, Any]) -> None:
+        job_dir = os.path.join(self.output_root, job['id'])
+        self.store.update(job['id'], output_dir=job_dir)
+        tasks, commands = job['tasks'], job.get('commands')
+        results = {}  # type: Dict[str, Dict[str, Any]]
+        with open(self.store.log_path(job['id']), 'a', encoding='utf-8') as log:
+            console = Console(file=log, force_terminal=False, width=160)
+            for target in iter_job_targets(job['targets']):
+                output_dir = target_output_dir(target, job_dir)
+                try:
+                    if tasks:
+                        run_tasks([target], tasks, self.config.tasks_config, output_dir, job['concurrent'], console,
+                                  wordlists=self.config.wordlists, discord_webhook=self.discord_webhook,
+                                  tools_config=self.config.tools_config, max_workers=self.workers, executor=self.executor)
+                    else:
+                        run_custom_commands(target, commands, output_dir, job['concurrent'], console,
+                                            wordlists=self.config.wordlists, discord_webhook=self.discord_webhook,
+                                            tools_config=self.config.tools_config)
+                    results[target] = {'status': 'success', 'output_dir': output_dir}
+                except Exception as e:
+                    console.print(f"[red]Error running tasks for {target}: {e}")
+                    results[target] = {'status': 'failed', 'error': str(e), 'output_dir': output_dir}
+                if any(t.lower().startswith('automated subdomain enumeration') for t in tasks) or \
+                        any('subfinder' in c or 'amass' in c for c in commands or []):
+                    postprocess_subdomains(output_dir, console=console, skip_live_check=self.skip_live_check,
+                                           tool_preference=self.live_check_tool, status_codes=LIVE_STATUS_CODES,
+                                           tools_config=self.config.tools_config)
+                if storage.enabled():
+                    storage.compact_tree(output_dir)
+                self.store.update(job['id'], results=results)
+        # Durations learned by this job feed the scheduling of the next ones
+        durations = history.active()
+        if durations is not None:
+            durations.save()
+        failed = [t for t, r in results.items() if r['status'] != 'success']
+        self.store.update(job['id'], status='failed' if failed and len(failed) == len(results) else 'done',
+                          finished=time.time(), results=results)
+
+    def result_files(self, job: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+        """Output files per target (logical names relative to the target folder, with stored sizes)."""
+        listing = {}
+        for target, result in (job.get('results') or {}).items():
+            root = result.get('output_dir')
+            files = []
+            if root and os.path.isdir(root):
+                for dirpath, _, names in os.walk(root):
+                    for name in sorted(names):
+                        path = os.path.join(dirpath, name)
+                        files.append({'path': storage.logical_path(os.path.relpath(path, root)),
+                                      'size': os.path.getsize(path)})
+            listing[target] = files
+        return listing
+
+    def result_path(self, job: Dict[str, Any], target: str, relpath: str) -> Optional[str]:
+        """Absolute path of one output file, or None if it is not inside the target's folder."""
+        result = (job.get('results') or {}).get(target)
+        if not result or not result.get('output_dir'):
+            return None
+        root = os.path.realpath(result['output_dir'])
+        path = os.path.realpath(os.path.join(root, relpath))
+        if not path.startswith(root + os.sep) or not storage.exists(path):
+            return None
+        return path
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = 'cyfer-recon'
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def address_string(self) -> str:
+        # Unix socket clients have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    @property
+    def daemon(self) -> 'ScanDaemon':
+        return self.server.scan_daemon
+
+    def _send_json(self, status: int, payload: Any) -> None:
+        body = json.dumps(payload, indent=1, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_file(self, path: str) -> None:
+        with storage.open_binary(path) as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorize(self) -> bool:
+        """Refuse browser-originated, rebound-host and unauthenticated requests (sending the error)."""
+        if self.headers.get('Origin') is not None:
+            self._send_json(403, {'error': 'cross-origin requests are not accepted'})
+            return False
+        allowed_hosts = getattr(self.server, 'allowed_hosts', None)
+        if allowed_hosts is not None and _host_name(self.headers.get('Host', '')) not in allowed_hosts:
+            self._send_json(403, {'error': 'the Host header must name a loopback address'})
+            return False
+        scheme, _, token = self.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not secrets.compare_digest(token.strip(), self.server.api_token):
+            self.send_response(401)
+            self.send_header('WWW-Authenticate', 'Bearer')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return False
+        return True
+
+    def _route(self) -> Tuple[List[str], Optional[Dict[str, Any]]]:
+        parts = [unquote(p) for p in self.path.split('?', 1)[0].strip('/').split('/') if p]
+        job = None
+        if len(parts) >= 2 and parts[0] == 'jobs':
+            job = self.daemon.store.get(parts[1]) if _JOB_ID_RE.match(parts[1]) else None
+        return parts, job
+
+    def do_GET(self) -> None:
+        if not self._authorize():
+            return
+        parts, job = self._route()
+        if parts == ['health']:
+            return self._send_json(200, {'status': 'ok', 'jobs': self.daemon.store.counts(), 'workers': self.daemon.workers})
+        if parts == ['jobs']:
+            return self._send_json(200, self.daemon.store.list())
+        if len(parts) < 2 or parts[0] != 'jobs':
+            return self._send_json(404, {'error': 'not found'})
+        if job is None:
+            return self._send_json(404, {'error': 'unknown job'})
+        if len(parts) == 2:
+            return self._send_json(200, job)
+        if parts[2:] == ['log']:
+            path = self.daemon.store.log_path(job['id'])
+            return self._send_file(path) if os.path.isfile(path) else self._send_json(404, {'error': 'no log yet'})
+        if parts[2:] == ['results']:
+            return self._send_json(200, self.daemon.result_files(job))
+        if len(parts) > 4 and parts[2] == 'results':
+            path = self.daemon.result_path(job, parts[3], '/'.join(parts[4:]))
+            if path is None:
+                return self._send_json(404, {'error': 'no such result file'})
+            return self._send_file(path)
+        return self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self) -> None:
+        if not self._authorize():
+            return
+        parts, _ = self._route()
+        if parts != ['jobs']:
+            return self._send_json(404, {'error': 'not found'})
+        if self.headers.get('Content-Type', '').split(';', 1)[0].strip().lower() != 'application/json':
+            return self._send_json(415, {'error': 'the body must be sent as application/json'})
+        length = int(self.headers.get('Content-Length') or 0)
+        if length <= 0 or length > MAX_REQUEST_BYTES:
+            return self._send_json(400, {'error': 'missing or oversized JSON body'})
+        try:
+            spec = json.loads(self.rfile.read(length).decode('utf-8'))
+            if not isinstance(spec, dict):
+                raise ValueError("The body must be a JSON object")
+            job = self.daemon.submit(spec)
+        except ValueError as e:
+            return self._send_json(400, {'error': str(e)})
+        self._send_json(202, job)
+
+    def do_DELETE(self) -> None:
+        if not self._authorize():
+            return
+        parts, job = self._route()
+        if len(parts) != 2 or parts[0] != 'jobs' or job is None:
+            return self._send_json(404, {'error': 'unknown job'})
+        if not self.daemon.store.cancel(job['id']):
+            return self._send_json(409, {'error': f"job is {job['status']}, only queued jobs can be cancelled"})
+        self._send_json(200, self.daemon.store.get(job['id']))
+
+
+class _TCPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], daemon: ScanDaemon, api_token: str):
+        self.scan_daemon = daemon
+        self.api_token = api_token
+        # Besides loopback names, a specific listen address may be used as Host (not a wildcard one)
+        self.allowed_hosts = LOOPBACK_HOSTS + ((address[0].lower(),) if address[0] not in ('', '0.0.0.0', '::') else ())
+        super().__init__(address, _Handler)
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, daemon: ScanDaemon, api_token: str):
+        self.scan_daemon = daemon
+        self.api_token = api_token
+        if os.path.exists(path):
+            os.remove(path)
+        super().__init__(path, _Handler)
+        os.chmod(path, 0o600)
+
+
+def _host_name(host: str) -> str:
+    """Host header without its port ("[::1]:8787" -> "::1")."""
+    host = host.strip().lower()
+    if host.startswith('['):
+        return host[1:].split(']', 1)[0]
+    return host.rsplit(':', 1)[0] if host.count(':') == 1 else host
+
+
+def token_path(queue_dir: str = DEFAULT_QUEUE_DIR) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(queue_dir)), TOKEN_FILE_NAME)
+
+
+def write_token(path: str) -> str:
+    """Generate a new API token and store it in an owner-only file."""
+    token = secrets.token_urlsafe(32)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.chmod(path, 0o600)  # an existing file keeps its old mode through O_CREAT
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(token + '\n')
+    return token
+
+
+def make_server(daemon: ScanDaemon, host: str = '127.0.0.1', port: int = DEFAULT_PORT,
+                socket_path: Optional[str] = None, token_file: Optional[str] = None) -> socketserver.BaseServer:
+    """
+    HTTP API server for daemon on a Unix socket (owner-only) if socket_path is given, else on host:port.
+    A fresh bearer token is written to token_file (next to the job queue by default).
+    """
+    token_file = token_file or token_path(daemon.store.path)
+    token = write_token(token_file)
+    server = _UnixServer(socket_path, daemon, token) if socket_path else _TCPServer((host, port), daemon, token)
+    server.token_file = token_file
+    return server
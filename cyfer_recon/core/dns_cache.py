@@ -0,0 +1,564 @@
+"""
+Optional local caching DNS forwarder shared by the DNS-heavy tools of a run.
+
+One UDP socket on 127.0.0.1 serves every tool; a single event loop answers repeated questions from an
+in-memory cache and forwards the rest to a pool of upstream resolvers (round-robin, with a retry on the
+next upstream after a timeout, SERVFAIL or REFUSED). Identical questions in flight are sent upstream
+once. Answers are cached for their smallest record TTL, NXDOMAIN/NODATA for the SOA minimum (RFC 2308),
+both capped; served answers get their TTLs counted down. Answers too large for a client's UDP size are
+sent truncated, and a small TCP listener on the same port serves the retry.
+
+Tools opt in through their tools.json entry:
+  "resolver": "-r {resolver}"          flag inserted after the tool name ({resolver} is 127.0.0.1:port)
+  "resolver": "-r {resolvers_file}"    the same, with a generated resolvers file listing the forwarder
+  "resolver_after": "enum"             place the flag after this subcommand (or any of a list of them)
+                                       instead (`amass enum -r ...`); invocations without it are left alone
+An existing value of the flag in the command (e.g. `massdns -r resolvers.txt`) is replaced.
+"""
+import heapq
+import os
+import random
+import selectors
+import shlex
+import socket
+import socketserver
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from cyfer_recon.core.utils import set_tool_option
+
+DEFAULT_UPSTREAMS = ('1.1.1.1', '8.8.8.8', '9.9.9.9')
+MAX_TTL = 3600
+MAX_NEGATIVE_TTL = 900
+DEFAULT_NEGATIVE_TTL = 60
+TYPE_SOA = 6
+TYPE_OPT = 41
+RCODE_SERVFAIL = 2
+RCODE_NXDOMAIN = 3
+RCODE_REFUSED = 5
+
+_active = None  # type: Optional[DnsForwarder]
+_random = random.SystemRandom()
+
+
+class Message:
+    """The parts of a DNS message the forwarder needs."""
+    __slots__ = ('id', 'flags', 'qname', 'qtype', 'qclass', 'question_end', 'records', 'counts', 'udp_size', 'dnssec_ok')
+
+    def __init__(self, data: bytes):
+        if len(data) < 12:
+            raise ValueError("short DNS message")
+        self.id, self.flags, qdcount, ancount, nscount, arcount = struct.unpack('!HHHHHH', data[:12])
+        if qdcount != 1:
+            raise ValueError("expected exactly one question")
+        self.counts = (ancount, nscount, arcount)
+        name, offset = _read_name(data, 12)
+        if offset + 4 > len(data):
+            raise ValueError("truncated question")
+        self.qname = name
+        self.qtype, self.qclass = struct.unpack('!HH', data[offset:offset + 4])
+        self.question_end = offset + 4
+        self.udp_size = 512
+        self.dnssec_ok = False
+        # (section, type, ttl, ttl offset, rdata offset, rdata length); section 0 answer, 1 authority, 2 additional
+        self.records = []  # type: List[Tuple[int, int, int, int, int, int]]
+        offset = self.question_end
+        for section, count in enumerate(self.counts):
+            for _ in range(count):
+                _, offset = _read_name(data, offset)
+                if offset + 10 > len(data):
+                    raise ValueError("truncated record")
+                rtype, rclass, ttl, rdlength = struct.unpack('!HHIH', data[offset:offset + 10])
+                if offset + 10 + rdlength > len(data):
+                    raise ValueError("truncated record data")
+                if rtype == TYPE_OPT:
+                    self.udp_size = max(512, rclass)
+                    self.dnssec_ok = bool(ttl & 0x8000)
+                self.records.append((section, rtype, ttl, offset + 4, offset + 10, rdlength))
+                offset += 10 + rdlength
+
+    @property
+    def rcode(self) -> int:
+        return self.flags & 0xF
+
+    @property
+    def truncated(self) -> bool:
+        return bool(self.flags & 0x0200)
+
+    def key(self) -> Tuple[str, int, int, bool, bool]:
+        return self.qname, self.qtype, self.qclass, self.dnssec_ok, bool(self.flags & 0x0010)
+
+
+def _read_name(data: bytes, offset: int) -> Tuple[str, int]:
+    """(lower-cased name, offset after it), following compression pointers."""
+    labels = []
+    end = None
+    hops = 0
+    while True:
+        if offset >= len(data):
+            raise ValueError("truncated name")
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if offset + 1 >= len(data) or hops > 64:
+                raise ValueError("bad compression pointer")
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            hops += 1
+            continue
+        if length & 0xC0:
+            raise ValueError("bad label")
+        offset += 1
+        if length == 0:
+            break
+        labels.append(data[offset:offset + length])
+        offset += length
+    return b'.'.join(labels).decode('ascii', 'replace').lower(), end if end is not None else offset
+
+
+class _Entry:
+    __slots__ = ('data', 'stored', 'expires', 'ttls', 'negative')
+
+    def __init__(self, data: bytes, ttl: int, ttls: List[Tuple[int, int]], negative: bool):
+        self.data = data
+        self.stored = time.monotonic()
+        self.expires = self.stored + ttl
+        self.ttls = ttls
+        self.negative = negative
+
+
+def cache_ttl(message: Message, data: bytes, max_ttl: int = MAX_TTL,
+              max_negative_ttl: int = MAX_NEGATIVE_TTL) -> Optional[Tuple[int, bool]]:
+    """(seconds, negative) an upstream answer may be cached for, or None if it must not be cached."""
+    if message.truncated:
+        return None
+    answers = [r for r in message.records if r[0] == 0]
+    if message.rcode == 0 and answers:
+        return min(min(r[2] for r in answers), max_ttl), False
+    if message.rcode not in (0, RCODE_NXDOMAIN):
+        return None
+    for section, rtype, ttl, _, rdata, rdlength in message.records:
+        if section == 1 and rtype == TYPE_SOA and rdlength >= 20:
+            minimum = struct.unpack('!I', data[rdata + rdlength - 4:rdata + rdlength])[0]
+            return min(ttl, minimum, max_negative_ttl), True
+    return min(DEFAULT_NEGATIVE_TTL, max_negative_ttl), True
+
+
+def _answer(data: bytes, query: bytes, question_end: int, ttls: List[Tuple[int, int]] = (), elapsed: int = 0) -> bytes:
+    """An answer addressed to query: its id and question spelling, TTLs counted down by elapsed seconds."""
+    out = bytearray(data)
+    out[0:2] = query[0:2]
+    if len(query) >= question_end and len(out) >= question_end:
+        out[12:question_end] = query[12:question_end]
+    for offset, ttl in ttls:
+        struct.pack_into('!I', out, offset, max(0, ttl - elapsed))
+    return bytes(out)
+
+
+def _truncated(answer: bytes, question_end: int) -> bytes:
+    """Header and question only, with TC set, so the client retries over TCP."""
+    out = bytearray(answer[:question_end])
+    flags = struct.unpack('!H', out[2:4])[0] | 0x0200
+    out[2:12] = struct.pack('!HHHHH', flags, 1, 0, 0, 0)
+    return bytes(out)
+
+
+def _servfail(query: bytes, question_end: int) -> bytes:
+    flags = struct.unpack('!H', query[2:4])[0]
+    out = bytearray(query[:question_end])
+    out[2:12] = struct.pack('!HHHHH', (flags & 0x7900) | 0x8080 | RCODE_SERVFAIL, 1, 0, 0, 0)
+    return bytes(out)
+
+
+def parse_upstream(spec: str) -> Tuple[str, int]:
+    """"1.1.1.1", "1.1.1.1:5353", "[2606:4700::1111]:53" or a bare IPv6 address -> (host, port)."""
+    spec = spec.strip()
+    if spec.startswith('['):
+        host, _, port = spec[1:].partition(']')
+        return host, int(port.lstrip(':') or 53)
+    if spec.count(':') == 1:
+        host, _, port = spec.partition(':')
+        return host, int(port)
+    return spec, 53
+
+
+def system_upstreams(path: str = '/etc/resolv.conf') -> List[Tuple[str, int]]:
+    """Nameservers from resolv.conf, or DEFAULT_UPSTREAMS."""
+    found = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0] == 'nameserver':
+                    found.append((parts[1].split('%')[0], 53))
+    except OSError:
+        pass
+    return found or [(host, 53) for host in DEFAULT_UPSTREAMS]
+
+
+class _Pending:
+    __slots__ = ('key', 'query', 'question_end', 'waiters', 'attempts', 'upstream', 'uid', 'deadline')
+
+    def __init__(self, key: tuple, query: bytes, question_end: int):
+        self.key = key
+        self.query = query
+        self.question_end = question_end
+        self.waiters = []  # type: List[Tuple[Any, bytes, int, int]]  (address, query, question end, udp size)
+        self.attempts = 0
+        self.upstream = None  # type: Optional[Tuple[str, int]]
+        self.uid = 0
+        self.deadline = 0.0
+
+
+class _TcpHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        forwarder = self.server.forwarder
+        self.request.settimeout(forwarder.timeout * 5)
+        try:
+            while True:
+                header = self._read(2)
+                if header is None:
+                    return
+                query = self._read(struct.unpack('!H', header)[0])
+                if query is None:
+                    return
+                answer = forwarder.resolve_tcp(query)
+                if answer is None:
+                    return
+                self.request.sendall(struct.pack('!H', len(answer)) + answer)
+        except OSError:
+            return
+
+    def _read(self, size: int) -> Optional[bytes]:
+        data = b''
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+
+class _TcpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class DnsForwarder:
+    """Caching DNS forwarder on 127.0.0.1 (UDP and TCP on the same port)."""
+
+    def __init__(self, upstreams: Optional[List[Tuple[str, int]]] = None, host: str = '127.0.0.1', port: int = 0,
+                 timeout: float = 2.0, attempts: int = 3, max_entries: int = 200000, max_ttl: int = MAX_TTL,
+                 max_negative_ttl: int = MAX_NEGATIVE_TTL):
+        self.upstreams = list(upstreams or system_upstreams())
+        self.timeout = timeout
+        self.attempts = attempts
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self.max_negative_ttl = max_negative_ttl
+        self.stats = {'queries': 0, 'hits': 0, 'negative_hits': 0, 'misses': 0, 'coalesced': 0,
+                      'upstream_timeouts': 0, 'servfail': 0, 'tcp': 0}
+        self._cache = OrderedDict()  # type: OrderedDict
+        self._lock = threading.Lock()
+        self._pending = {}  # type: Dict[Tuple[Tuple[str, int], int], _Pending]
+        self._inflight = {}  # type: Dict[tuple, _Pending]
+        self._deadlines = []  # type: List[Tuple[float, int, _Pending]]
+        self._seq = 0
+        self._next_upstream = 0
+        self._stop = threading.Event()
+        self._thread = None  # type: Optional[threading.Thread]
+        self.sock, self.tcp = self._bind(host, port)
+        self.tcp.forwarder = self
+        self.address = f"{host}:{self.sock.getsockname()[1]}"
+        self._upstream_socks = {}  # type: Dict[int, socket.socket]
+        for upstream in self.upstreams:
+            family = socket.AF_INET6 if ':' in upstream[0] else socket.AF_INET
+            if family not in self._upstream_socks:
+                sock = socket.socket(family, socket.SOCK_DGRAM)
+                sock.setblocking(False)
+                self._upstream_socks[family] = sock
+        self.resolvers_dir = tempfile.mkdtemp(prefix='cyfer-dns-')
+        self.resolvers_file = os.path.join(self.resolvers_dir, 'resolvers.txt')
+        with open(self.resolvers_file, 'w', encoding='utf-8') as f:
+            f.write(self.address + '\n')
+
+    @staticmethod
+    def _bind(host: str, port: int) -> Tuple[socket.socket, _TcpServer]:
+        # UDP picks the port (ephemeral unless given), TCP must get the same one
+        for _ in range(20):
+            udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            udp.bind((host, port))
+            try:
+                tcp = _TcpServer((host, udp.getsockname()[1]), _TcpHandler)
+            except OSError:
+                udp.close()
+                if port:
+                    raise
+                continue
+            udp.setblocking(False)
+            return udp, tcp
+        raise OSError("no free port for the DNS forwarder")
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.stats[name] += amount
+
+    # Cache
+
+    def _lookup(self, key: tuple) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() >= entry.expires:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return entry
+
+    def _store(self, key: tuple, message: Message, data: bytes) -> None:
+        verdict = cache_ttl(message, data, self.max_ttl, self.max_negative_ttl)
+        if verdict is None or verdict[0] <= 0:
+            return
+        ttls = [(r[3], r[2]) for r in message.records if r[1] != TYPE_OPT]
+        entry = _Entry(data, verdict[0], ttls, verdict[1])
+        with self._lock:
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def _cached_answer(self, query: bytes, message: Message) -> Optional[bytes]:
+        entry = self._lookup(message.key())
+        if entry is None:
+            return None
+        self.count('negative_hits' if entry.negative else 'hits')
+        return _answer(entry.data, query, message.question_end, entry.ttls, int(time.monotonic() - entry.stored))
+
+    # UDP event loop
+
+    def _serve(self) -> None:
+        selector = selectors.DefaultSelector()
+        selector.register(self.sock, selectors.EVENT_READ)
+        for sock in self._upstream_socks.values():
+            selector.register(sock, selectors.EVENT_READ)
+        try:
+            while not self._stop.is_set():
+                wait = 0.5
+                if self._deadlines:
+                    wait = min(wait, max(0.0, self._deadlines[0][0] - time.monotonic()))
+                for key, _ in selector.select(wait):
+                    if key.fileobj is self.sock:
+                        self._from_clients()
+                    else:
+                        self._from_upstream(key.fileobj)
+                self._expire()
+        finally:
+            selector.close()
+
+    def _from_clients(self) -> None:
+        while True:
+            try:
+                query, address = self.sock.recvfrom(65535)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            try:
+                message = Message(query)
+            except ValueError:
+                continue
+            if message.flags & 0x8000:
+                continue  # a response, not a query
+            self.count('queries')
+            answer = self._cached_answer(query, message)
+            if answer is not None:
+                self._reply(address, answer, message.question_end, message.udp_size)
+                continue
+            key = message.key()
+            pending = self._inflight.get(key)
+            if pending is not None:
+                self.count('coalesced')
+            else:
+                self.count('misses')
+                pending = self._inflight[key] = _Pending(key, query, message.question_end)
+                self._send_upstream(pending)
+            pending.waiters.append((address, query, message.question_end, message.udp_size))
+
+    def _reply(self, address: Any, answer: bytes, question_end: int, udp_size: int) -> None:
+        if len(answer) > udp_size:
+            answer = _truncated(answer, question_end)
+        try:
+            self.sock.sendto(answer, address)
+        except OSError:
+            pass
+
+    def _send_upstream(self, pending: _Pending) -> None:
+        upstream = self.upstreams[self._next_upstream % len(self.upstreams)]
+        self._next_upstream += 1
+        uid = _random.randrange(65536)
+        while (upstream, uid) in self._pending:
+            uid = _random.randrange(65536)
+        pending.upstream, pending.uid = upstream, uid
+        pending.attempts += 1
+        pending.deadline = time.monotonic() + self.timeout
+        self._pending[(upstream, uid)] = pending
+        self._seq += 1
+        heapq.heappush(self._deadlines, (pending.deadline, self._seq, pending))
+        family = socket.AF_INET6 if ':' in upstream[0] else socket.AF_INET
+        try:
+            self._upstream_socks[family].sendto(struct.pack('!H', uid) + pending.query[2:], upstream)
+        except OSError:
+            pass  # retried or failed when the deadline passes
+
+    def _from_upstream(self, sock: socket.socket) -> None:
+        while True:
+            try:
+                data, address = sock.recvfrom(65535)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            if len(data) < 12:
+                continue
+            pending = self._pending.get(((address[0], address[1]), struct.unpack('!H', data[:2])[0]))
+            if pending is None:
+                continue
+            try:
+                message = Message(data)
+            except ValueError:
+                continue
+            if message.key()[:3] != pending.key[:3]:
+                continue  # not the answer to our question
+            del self._pending[(pending.upstream, pending.uid)]
+            if message.rcode in (RCODE_SERVFAIL, RCODE_REFUSED) and pending.attempts < min(self.attempts, len(self.upstreams)):
+                self._send_upstream(pending)
+                continue
+            self._finish(pending, data, message)
+
+    def _finish(self, pending: _Pending, data: Optional[bytes], message: Optional[Message]) -> None:
+        self._inflight.pop(pending.key, None)
+        if data is not None:
+            self._store(pending.key, message, data)
+        for address, query, question_end, udp_size in pending.waiters:
+            if data is None:
+                self.count('servfail')
+                self._reply(address, _servfail(query, question_end), question_end, udp_size)
+            else:
+                self._reply(address, _answer(data, query, question_end), question_end, udp_size)
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        while self._deadlines and self._deadlines[0][0] <= now:
+            deadline, _, pending = heapq.heappop(self._deadlines)
+            if self._pending.get((pending.upstream, pending.uid)) is not pending or pending.deadline != deadline:
+                continue  # answered, or re-sent with a later deadline
+            del self._pending[(pending.upstream, pending.uid)]
+            self.count('upstream_timeouts')
+            if pending.attempts < max(self.attempts, 1):
+                self._send_upstream(pending)
+            else:
+                self._finish(pending, None, None)
+
+    # TCP (truncated answers)
+
+    def resolve_tcp(self, query: bytes) -> Optional[bytes]:
+        try:
+            message = Message(query)
+        except ValueError:
+            return None
+        self.count('queries')
+        self.count('tcp')
+        answer = self._cached_answer(query, message)
+        if answer is not None:
+            return answer
+        self.count('misses')
+        for attempt in range(max(1, min(self.attempts, len(self.upstreams)))):
+            upstream = self.upstreams[(self._next_upstream + attempt) % len(self.upstreams)]
+            try:
+                with socket.create_connection(upstream, timeout=self.timeout) as sock:
+                    sock.sendall(struct.pack('!H', len(query)) + query)
+                    header = _recv_exact(sock, 2)
+                    data = _recv_exact(sock, struct.unpack('!H', header)[0])
+                upstream_message = Message(data)
+            except (OSError, ValueError, struct.error):
+                self.count('upstream_timeouts')
+                continue
+            if upstream_message.rcode in (RCODE_SERVFAIL, RCODE_REFUSED):
+                continue
+            self._store(message.key(), upstream_message, data)
+            return _answer(data, query, message.question_end)
+        self.count('servfail')
+        return _servfail(query, message.question_end)
+
+    # Lifecycle
+
+    def start(self) -> 'DnsForwarder':
+        self._thread = threading.Thread(target=self._serve, name="cyfer-dns-cache", daemon=True)
+        self._thread.start()
+        threading.Thread(target=self.tcp.serve_forever, name="cyfer-dns-cache-tcp", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        self.tcp.shutdown()
+        self.tcp.server_close()
+        self.sock.close()
+        for sock in self._upstream_socks.values():
+            sock.close()
+        try:
+            os.remove(self.resolvers_file)
+            os.rmdir(self.resolvers_dir)
+        except OSError:
+            pass
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise OSError("connection closed")
+        data += chunk
+    return data
+
+
+def start_forwarder(upstreams: Optional[List[Tuple[str, int]]] = None, **options: Any) -> DnsForwarder:
+    """Start the run-wide DNS forwarder; commands prepared afterwards are pointed at it."""
+    global _active
+    _active = DnsForwarder(upstreams, **options).start()
+    return _active
+
+
+def stop_forwarder() -> Optional[Dict[str, int]]:
+    """Stop the run-wide forwarder and return its counters."""
+    global _active
+    if _active is None:
+        return None
+    forwarder, _active = _active, None
+    forwarder.stop()
+    return dict(forwarder.stats)
+
+
+def active_forwarder() -> Optional[DnsForwarder]:
+    return _active
+
+
+def apply_resolver(cmd: str, tools_config: Optional[Dict[str, Any]], forwarder: Optional[DnsForwarder] = None) -> str:
+    """Point the resolver-capable tools of a command at the forwarder."""
+    forwarder = forwarder or _active
+    if forwarder is None or not tools_config:
+        return cmd
+    for tool, info in tools_config.items():
+        spec = info.get('resolver') if isinstance(info, dict) else None
+        if not spec:
+            continue
+        rendered = spec.replace('{resolvers_file}', shlex.quote(forwarder.resolvers_file)).replace('{resolver}', forwarder.address)
+        cmd = set_tool_option(cmd, (tool, info.get('check') or tool), rendered, info.get('resolver_after'))
+    return cmd
@@ -0,0 +1,265 @@
+"""
+Built-in favicon hashing: fetch the favicons of many hosts once and hash them the way Shodan does.
+
+Replaces the per-target `favfreak` process of the "Automated Favicon Hashing" task. Each host's home
+page is fetched with pooled connections. Icons it declares with <link rel="icon"> ("shortcut icon",
+"apple-touch-icon", ... and data: URIs) are fetched along with /favicon.ico. Every icon gets the mmh3
+hash of its base64 encoding (the value Shodan's http.favicon.hash filter expects) and the md5 of its
+bytes. The mmh3 package is used when installed, a pure-Python MurmurHash3 otherwise.
+
+Icons are content-addressed by SHA-256. Icon URLs shared by several targets (CDNs, shared platforms)
+are fetched once per run (per FETCH_TTL in a long-running daemon). Hashes are kept by SHA-256 in ~/.cyfer_recon/favicon_hashes.json, so an
+icon seen before is not hashed again.
+"""
+import base64
+import binascii
+import hashlib
+import html
+import json
+import os
+import re
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote_to_bytes, urljoin, urlsplit
+
+from cyfer_recon.core import storage
+from cyfer_recon.core.config_utils import CONFIG_DIR
+from cyfer_recon.core.http_client import HttpClient
+
+try:
+    import mmh3
+except ImportError:  # optional dependency, the pure-Python hash below is used instead
+    mmh3 = None
+
+DEFAULT_CACHE_FILE = os.path.join(CONFIG_DIR, "favicon_hashes.json")
+FETCH_TTL = 3600.0
+ICON_RELS = ('icon', 'shortcut', 'apple-touch-icon', 'apple-touch-icon-precomposed', 'mask-icon', 'fluid-icon')
+
+_LINK_RE = re.compile(r'<link\b[^>]*>', re.I)
+_ATTR_RE = re.compile(r'([a-zA-Z][\w:-]*)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+))')
+
+_lock = threading.Lock()
+# Per run: icon URL -> its fetch, shared by every target that links the icon
+_fetched = {}  # type: Dict[str, _Fetch]
+# SHA-256 -> (mmh3, md5), loaded from and saved to the cache file
+_hashes = None  # type: Optional[Dict[str, Tuple[int, str]]]
+_dirty = False
+
+
+class _Fetch:
+    """One icon URL's fetch; digest is the SHA-256 of its content, None if it is not an icon."""
+    __slots__ = ('done', 'digest', 'started')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.digest = None  # type: Optional[str]
+        self.started = time.monotonic()
+
+
+def murmur3_32(data: bytes, seed: int = 0) -> int:
+    """MurmurHash3 x86 32-bit as a signed int, like mmh3.hash()."""
+    c1, c2, mask = 0xcc9e2d51, 0x1b873593, 0xffffffff
+    h = seed & mask
+    full = len(data) & ~3
+    for (k,) in struct.iter_unpack('<I', data[:full]):
+        k = (k * c1) & mask
+        k = ((k << 15) | (k >> 17)) & mask
+        h ^= (k * c2) & mask
+        h = ((h << 13) | (h >> 19)) & mask
+        h = (h * 5 + 0xe6546b64) & mask
+    tail = data[full:]
+    if tail:
+        k = 0
+        for shift, byte in enumerate(tail):
+            k |= byte << (8 * shift)
+        k = (k * c1) & mask
+        k = ((k << 15) | (k >> 17)) & mask
+        h ^= (k * c2) & mask
+    h ^= len(data)
+    h ^= h >> 16
+    h = (h * 0x85ebca6b) & mask
+    h ^= h >> 13
+    h = (h * 0xc2b2ae35) & mask
+    h ^= h >> 16
+    return h - 0x100000000 if h & 0x80000000 else h
+
+
+def shodan_hash(content: bytes) -> int:
+    """mmh3 of the base64 encoding with 76-character lines, as Shodan computes http.favicon.hash."""
+    encoded = base64.encodebytes(content)
+    return mmh3.hash(encoded) if mmh3 is not None else murmur3_32(encoded)
+
+
+def icon_links(page_url: str, body: str) -> List[str]:
+    """Icon URLs declared by <link rel=...icon...> tags, resolved against the page URL, in page order."""
+    found = []
+    for tag in _LINK_RE.findall(body):
+        attrs = {m.group(1).lower(): html.unescape(next(v for v in m.group(2, 3, 4) if v is not None))
+                 for m in _ATTR_RE.finditer(tag)}
+        rels = attrs.get('rel', '').lower().split()
+        href = attrs.get('href', '').strip()
+        if not href or not any(r in ICON_RELS for r in rels) or ('shortcut' in rels and 'icon' not in rels):
+            continue
+        url = href if href.startswith('data:') else urljoin(page_url, href)
+        if url not in found:
+            found.append(url)
+    return found
+
+
+def _decode_data_uri(uri: str) -> Optional[bytes]:
+    header, sep, payload = uri.partition(',')
+    if not sep:
+        return None
+    try:
+        return base64.b64decode(payload) if header.endswith(';base64') else unquote_to_bytes(payload)
+    except (ValueError, binascii.Error):
+        return None
+
+
+def _load_hashes(path: str) -> Dict[str, Tuple[int, str]]:
+    global _hashes
+    if _hashes is None:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                _hashes = {k: (int(v[0]), str(v[1])) for k, v in json.load(f).items()}
+        except (OSError, ValueError, TypeError, IndexError):
+            _hashes = {}
+    return _hashes
+
+
+def _save_hashes(path: str) -> None:
+    global _dirty
+    with _lock:
+        if not _dirty or _hashes is None:
+            return
+        data = {k: list(v) for k, v in _hashes.items()}
+        _dirty = False
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def hashes_of(content: bytes, cache_file: str = DEFAULT_CACHE_FILE) -> Tuple[str, int, str]:
+    """(sha256, mmh3, md5) of an icon, hashing it only if its content was not seen before."""
+    global _dirty
+    digest = hashlib.sha256(content).hexdigest()
+    with _lock:
+        known = _load_hashes(cache_file).get(digest)
+    if known is None:
+        known = (shodan_hash(content), hashlib.md5(content).hexdigest())
+        with _lock:
+            _hashes[digest] = known
+            _dirty = True
+    return digest, known[0], known[1]
+
+
+def _looks_like_icon(resp) -> bool:
+    if resp.status != 200 or not resp.body:
+        return False
+    # Soft 404s: an HTML page served for /favicon.ico
+    return 'html' not in resp.headers.get('content-type', '').lower() and not resp.body.lstrip()[:15].lower().startswith((b'<!doctype', b'<html'))
+
+
+def _entry_urls(entry: str) -> List[str]:
+    # Lines may be bare hosts (dnsx) or httpx style "url [200] ..."
+    value = entry.strip().split(' ')[0]
+    if not value:
+        return []
+    if '://' in value:
+        return [value if urlsplit(value).path else value + '/']
+    return [f"https://{value}/", f"http://{value}/"]
+
+
+def hash_favicons(inputs: List[str], output_file: str, workers: int = 20, timeout: float = 10.0,
+                  cache_file: str = DEFAULT_CACHE_FILE) -> Dict[str, int]:
+    """
+    Fetch the favicons of every host or URL in inputs (URLs, or files with one host/URL per line;
+    missing files are skipped) and write '<mmh3> <md5> <icon URL>' lines to output_file. Returns counters.
+    """
+    stats = {'hosts': 0, 'unreachable': 0, 'icons': 0, 'unique': 0, 'fetched': 0}
+    entries = []  # type: List[str]
+    for item in inputs:
+        if '://' in item:
+            entries.append(item)
+        elif storage.exists(item):
+            entries.extend(line for line in storage.iter_lines(item) if line.strip())
+    entries = list(dict.fromkeys(e.strip() for e in entries))
+    stats['hosts'] = len(entries)
+    client = HttpClient(timeout=timeout)
+
+    def icon(url: str) -> Optional[Tuple[str, int, str]]:
+        if url.startswith('data:'):
+            content = _decode_data_uri(url)
+            return hashes_of(content, cache_file) if content else None
+        with _lock:
+            fetch = _fetched.get(url)
+            owner = fetch is None or time.monotonic() - fetch.started > FETCH_TTL
+            if owner:
+                fetch = _fetched[url] = _Fetch()
+                stats['fetched'] += 1
+        if owner:
+            try:
+                resp = client.get(url)
+                if _looks_like_icon(resp):
+                    fetch.digest = hashes_of(resp.body, cache_file)[0]
+            except Exception:
+                pass
+            finally:
+                fetch.done.set()
+        else:
+            fetch.done.wait()
+        if fetch.digest is None:
+            return None
+        with _lock:
+            mmh3_hash, md5 = _hashes[fetch.digest]
+        return fetch.digest, mmh3_hash, md5
+
+    def scan(entry: str) -> Optional[List[Tuple[str, int, str, str]]]:
+        page = None
+        for url in _entry_urls(entry):
+            try:
+                page = client.get(url)
+                break
+            except Exception:
+                continue
+        if page is None:
+            return None
+        candidates = icon_links(page.url, page.text()) if 'html' in page.headers.get('content-type', 'text/html').lower() else []
+        default = urljoin(page.url, '/favicon.ico')
+        if default not in candidates:
+            candidates.append(default)
+        found = []
+        for url in candidates:
+            hashed = icon(url)
+            if hashed is not None:
+                found.append((url if not url.startswith('data:') else f"{page.url} (inline icon)",) + hashed)
+        return found
+
+    lines = []  # type: List[str]
+    digests = set()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for found in executor.map(scan, entries):
+                if found is None:
+                    stats['unreachable'] += 1
+                    continue
+                for url, digest, mmh3_hash, md5 in found:
+                    lines.append(f"{mmh3_hash} {md5} {url}")
+                    digests.add(digest)
+    finally:
+        client.close()
+    # The same host may be listed both as a URL and as a bare name
+    lines = list(dict.fromkeys(lines))
+    stats['icons'] = len(lines)
+    stats['unique'] = len(digests)
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    with storage.open_text(output_file, 'w') as f:
+        for line in lines:
+            f.write(line + '\n')
+    _save_hashes(cache_file)
+    return stats
@@ -0,0 +1,448 @@
+"""
+Built-in web technology fingerprinting over Wappalyzer-format signatures.
+
+Replaces the per-target `wappalyzer` and `whatweb` processes of the "Automated Web Tech Fingerprinting"
+task. Signatures are read from config/technologies.json. They are extended or overridden by
+~/.cyfer_recon/technologies.json, or by --signatures files and directories. A directory may be the
+technologies/ folder of the Wappalyzer repository, with its categories.json. Each signature file is
+compiled once per process.
+
+Every pattern source is compiled into one matcher: url, html (and text/scripts), scriptSrc, and
+headers, cookies and meta by name. For each pattern, the matcher derives a literal that any match
+must contain. All literals of a source are folded into a single trie-shaped regex, so one pass over
+a response finds the patterns that can match. Only those patterns' regexes run, and patterns without
+such a literal always run. Versions ("\\;version:\\1"), confidence, "implies" and "excludes" follow
+Wappalyzer's rules. Browser-only sources (js, dom, css) are ignored.
+
+Hosts are fetched with the pooled HTTP client on threads. Matching is CPU-bound, so with many hosts
+the responses go to a process pool that is started once and reused for every target of the run.
+"""
+import atexit
+import glob
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from cyfer_recon.core import storage
+from cyfer_recon.core.config_utils import CONFIG_DIR
+from cyfer_recon.core.http_client import HttpClient
+
+DEFAULT_SIGNATURES = os.path.join(os.path.dirname(__file__), "..", "config", "technologies.json")
+USER_SIGNATURES = os.path.join(CONFIG_DIR, "technologies.json")
+# Shortest literal worth using as a prefilter key
+MIN_LITERAL = 3
+# Bytes of a body that are matched
+MAX_BODY = 512 * 1024
+# Fewer responses than this are matched in-process
+POOL_THRESHOLD = 16
+
+_KEYED_SOURCES = ('headers', 'cookies', 'meta')
+# Wappalyzer source -> source matched here
+_TEXT_SOURCES = {'url': 'url', 'html': 'html', 'text': 'html', 'scripts': 'html', 'scriptSrc': 'scriptSrc', 'script': 'scriptSrc'}
+_META_RE = re.compile(r'<meta\b[^>]*>', re.I)
+_SCRIPT_RE = re.compile(r'<script\b[^>]*\bsrc\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))', re.I)
+_ATTR_RE = re.compile(r'([a-zA-Z][\w:-]*)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+))')
+
+_cache_lock = threading.Lock()
+_compiled = {}  # type: Dict[Tuple, Signatures]
+_pool = None  # type: Optional[ProcessPoolExecutor]
+_pool_key = None  # type: Optional[Tuple]
+_worker = None  # type: Optional[Signatures]
+
+
+def required_literal(pattern: str) -> Optional[str]:
+    """
+    The longest lower-cased literal every match of pattern contains (outside groups, classes and
+    optional characters), or None when there is none of at least MIN_LITERAL characters.
+    """
+    runs = []
+    current = ''
+    depth = 0
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '\\':
+            nxt = pattern[i + 1] if i + 1 < n else ''
+            i += 2
+            if depth == 0 and nxt and not nxt.isalnum():
+                current += nxt
+                continue
+        elif c == '[':
+            i += 1
+            if i < n and pattern[i] == '^':
+                i += 1
+            if i < n and pattern[i] == ']':
+                i += 1
+            while i < n and pattern[i] != ']':
+                i += 2 if pattern[i] == '\\' else 1
+            i += 1
+        elif c == '(':
+            depth += 1
+            i += 1
+        elif c == ')':
+            depth -= 1
+            i += 1
+        elif c == '|':
+            if depth == 0:
+                return None  # top-level alternation: no single literal is required
+            i += 1
+        elif c in '?*{':
+            # The preceding character is optional (for {, only with a zero minimum)
+            if depth == 0 and (c != '{' or pattern[i + 1:i + 2] == '0' or pattern[i + 1:i + 3] == ',}'):
+                current = current[:-1]
+            if c == '{':
+                close = pattern.find('}', i)
+                i = close + 1 if close != -1 else n
+            else:
+                i += 1
+        else:
+            i += 1
+            if depth == 0 and c not in '.^$+':
+                current += c
+                continue
+        if current:
+            runs.append(current)
+        current = ''
+    if current:
+        runs.append(current)
+    best = max(runs, key=len, default='')
+    return best.lower() if len(best) >= MIN_LITERAL else None
+
+
+def _trie_regex(words: List[str]) -> str:
+    """An alternation of words factored by common prefixes; the longest word wins at each position."""
+    trie = {}  # type: Dict[str, Any]
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{body})?" if '' in node else body
+    return build(trie)
+
+
+def _version(template: str, match: 're.Match') -> str:
+    def group(idx: str) -> str:
+        try:
+            return match.group(int(idx)) or ''
+        except IndexError:
+            return ''
+    out = re.sub(r'\\(\d)\?([^:]*):(.*)', lambda m: m.group(2) if group(m.group(1)) else m.group(3), template)
+    return re.sub(r'\\(\d)', lambda m: group(m.group(1)), out).strip()
+
+
+class Pattern:
+    """One signature pattern: regex plus Wappalyzer's "\\;version:" and "\\;confidence:" tags."""
+    __slots__ = ('tech', 'regex', 'version', 'confidence', 'literal')
+
+    def __init__(self, tech: str, value: str):
+        parts = str(value).split('\\;')
+        self.tech = tech
+        self.version = ''
+        self.confidence = 100
+        for tag in parts[1:]:
+            key, _, val = tag.partition(':')
+            if key == 'version':
+                self.version = val
+            elif key == 'confidence' and val.isdigit():
+                self.confidence = int(val)
+        # JavaScript-only escapes Python's re rejects
+        source = parts[0].replace('\\/', '/')
+        self.regex = re.compile(source, re.I)
+        self.literal = required_literal(source)
+
+
+class Matcher:
+    """The patterns of one source, prefiltered by their required literals in a single regex pass."""
+
+    def __init__(self, patterns: List[Pattern]):
+        self.always = [p for p in patterns if not p.literal]
+        self.by_literal = {}  # type: Dict[str, List[Pattern]]
+        for p in patterns:
+            if p.literal:
+                self.by_literal.setdefault(p.literal, []).append(p)
+        # The lookahead reports the longest literal at every position; shorter ones there are its prefixes
+        self.prefilter = re.compile(f"(?=({_trie_regex(list(self.by_literal))}))", re.I) if self.by_literal else None
+        self.prefixes = {lit: [lit[:k] for k in range(MIN_LITERAL, len(lit) + 1) if lit[:k] in self.by_literal]
+                         for lit in self.by_literal}
+
+    def match(self, text: str) -> Iterator[Tuple[str, str, int]]:
+        """(technology, version, confidence) for every pattern matching text."""
+        candidates = list(self.always)
+        if self.prefilter is not None:
+            seen = set()
+            for m in self.prefilter.finditer(text):
+                hit = m.group(1).lower()
+                if hit and hit not in seen:
+                    seen.add(hit)
+            literals = set()
+            for hit in seen:
+                literals.update(self.prefixes.get(hit, ()))
+            for lit in literals:
+                candidates.extend(self.by_literal[lit])
+        for p in candidates:
+            m = p.regex.search(text)
+            if m:
+                yield p.tech, _version(p.version, m) if p.version else '', p.confidence
+
+
+def _as_list(value: Any) -> List[str]:
+    if value is None:
+        return []
+    return [str(v) for v in value] if isinstance(value, list) else [str(value)]
+
+
+class Signatures:
+    """Compiled technologies of one or more Wappalyzer-format files."""
+
+    def __init__(self, technologies: Dict[str, Dict[str, Any]], categories: Dict[str, str]):
+        self.technologies = technologies
+        self.categories = categories
+        self.skipped = 0
+        text = {}  # type: Dict[str, List[Pattern]]
+        keyed = {source: {} for source in _KEYED_SOURCES}  # type: Dict[str, Dict[str, List[Pattern]]]
+        for name, tech in technologies.items():
+            for source, target in _TEXT_SOURCES.items():
+                for value in _as_list(tech.get(source)):
+                    self._add(text.setdefault(target, []), name, value)
+            for source in _KEYED_SOURCES:
+                for key, values in (tech.get(source) or {}).items() if isinstance(tech.get(source), dict) else ():
+                    for value in _as_list(values) or ['']:
+                        self._add(keyed[source].setdefault(key.lower(), []), name, value)
+        self.text = {source: Matcher(patterns) for source, patterns in text.items()}
+        self.keyed = {source: {key: Matcher(patterns) for key, patterns in by_key.items()} for source, by_key in keyed.items()}
+
+    def _add(self, patterns: List[Pattern], name: str, value: str) -> None:
+        try:
+            patterns.append(Pattern(name, value))
+        except re.error:
+            self.skipped += 1  # JavaScript regex syntax Python does not support
+
+    def analyze(self, response: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Technologies detected in one response: {"url", "headers": [(name, value)], "body"}."""
+        body = response.get('body') or ''
+        headers = {}  # type: Dict[str, str]
+        cookies = {}  # type: Dict[str, str]
+        for name, value in response.get('headers') or ():
+            name = name.lower()
+            headers[name] = f"{headers[name]}, {value}" if name in headers else value
+            if name == 'set-cookie':
+                key, _, rest = value.partition('=')
+                cookies[key.strip().lower()] = rest.split(';', 1)[0].strip()
+        meta = {}  # type: Dict[str, str]
+        for tag in _META_RE.findall(body):
+            attrs = {m.group(1).lower(): next(v for v in m.group(2, 3, 4) if v is not None) for m in _ATTR_RE.finditer(tag)}
+            key = (attrs.get('name') or attrs.get('property') or '').lower()
+            if key and 'content' in attrs:
+                meta[key] = attrs['content']
+        sources = {
+            'url': [response.get('url') or ''],
+            'html': [body],
+            'scriptSrc': [next(v for v in m.groups() if v is not None) for m in _SCRIPT_RE.finditer(body)],
+        }
+        found = {}  # type: Dict[str, List]  name -> [confidence, version]
+
+        def add(tech: str, version: str, confidence: int) -> None:
+            entry = found.setdefault(tech, [0, ''])
+            entry[0] = min(100, entry[0] + confidence)
+            if len(version) > len(entry[1]):
+                entry[1] = version
+
+        for source, values in sources.items():
+            matcher = self.text.get(source)
+            if matcher is not None:
+                for value in values:
+                    for hit in matcher.match(value):
+                        add(*hit)
+        for source, values in (('headers', headers), ('cookies', cookies), ('meta', meta)):
+            for key, value in values.items():
+                matcher = self.keyed[source].get(key)
+                if matcher is not None:
+                    for hit in matcher.match(value):
+                        add(*hit)
+        self._imply(found)
+        results = []
+        for name, (confidence, version) in sorted(found.items()):
+            tech = self.technologies.get(name, {})
+            results.append({'name': name, 'version': version or None, 'confidence': confidence,
+                            'categories': [self.categories.get(str(c), str(c)) for c in tech.get('cats', [])],
+                            'website': tech.get('website')})
+        return results
+
+    def _imply(self, found: Dict[str, List]) -> None:
+        queue = list(found)
+        while queue:
+            name = queue.pop()
+            for implied in _as_list(self.technologies.get(name, {}).get('implies')):
+                parts = implied.split('\\;')
+                target = parts[0]
+                confidence = next((int(p.split(':')[1]) for p in parts[1:] if p.startswith('confidence:') and p.split(':')[1].isdigit()), 100)
+                if target not in found and target in self.technologies:
+                    found[target] = [found[name][0] * confidence // 100, '']
+                    queue.append(target)
+        for name in list(found):
+            for excluded in _as_list(self.technologies.get(name, {}).get('excludes')):
+                found.pop(excluded, None)
+
+
+def _category_names(data: Dict[str, Any]) -> Dict[str, str]:
+    return {str(k): (v.get('name') if isinstance(v, dict) else str(v)) for k, v in data.items()}
+
+
+def _read_json(path: str) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """(technologies, category names) of one file: a whole Wappalyzer file, a technologies/*.json or categories.json."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if os.path.basename(path) == 'categories.json':
+        return {}, _category_names(data)
+    technologies = data.get('technologies') or data.get('apps')
+    if technologies is None:
+        technologies = {k: v for k, v in data.items() if k != 'categories' and isinstance(v, dict)}
+    return technologies, _category_names(data.get('categories') or {})
+
+
+def signature_files(paths: Optional[List[str]] = None) -> List[str]:
+    """The signature files to load: the bundled file, the user's, then paths (files or directories) in order."""
+    files = [DEFAULT_SIGNATURES]
+    if os.path.isfile(USER_SIGNATURES):
+        files.append(USER_SIGNATURES)
+    for path in paths or ():
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '*.json'))))
+        else:
+            files.append(path)
+    return files
+
+
+def load_signatures(paths: Optional[List[str]] = None) -> Signatures:
+    """Compile the signature files (later files override technologies of earlier ones); cached per process."""
+    files = signature_files(paths)
+    key = tuple((f, os.path.getmtime(f)) for f in files)
+    with _cache_lock:
+        compiled = _compiled.get(key)
+        if compiled is not None:
+            return compiled
+    technologies = {}  # type: Dict[str, Dict[str, Any]]
+    categories = {}  # type: Dict[str, str]
+    for path in files:
+        techs, cats = _read_json(path)
+        technologies.update(techs)
+        categories.update(cats)
+    compiled = Signatures(technologies, categories)
+    with _cache_lock:
+        _compiled[key] = compiled
+    return compiled
+
+
+def _init_worker(paths: Optional[List[str]]) -> None:
+    global _worker
+    _worker = load_signatures(paths)
+
+
+def _analyze_in_worker(response: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return _worker.analyze(response)
+
+
+def _shared_pool(paths: Optional[List[str]], processes: int) -> ProcessPoolExecutor:
+    """The run-wide matching pool; started once (spawned, as the caller runs on worker threads)."""
+    global _pool, _pool_key
+    key = (tuple(signature_files(paths)), processes)
+    with _cache_lock:
+        if _pool is None or _pool_key != key or getattr(_pool, '_broken', False):
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=_init_worker, initargs=(paths,))
+            _pool_key = key
+        return _pool
+
+
+@atexit.register
+def _shutdown_pool() -> None:
+    if _pool is not None:
+        _pool.shutdown(wait=False)
+
+
+def _entry_urls(entry: str) -> List[str]:
+    # Lines may be bare hosts (dnsx) or httpx style "url [200] ..."
+    value = entry.strip().split(' ')[0]
+    if not value:
+        return []
+    if '://' in value:
+        return [value]
+    return [f"https://{value}/", f"http://{value}/"]
+
+
+def fingerprint_hosts(inputs: List[str], output_file: str, signatures: Optional[List[str]] = None, workers: int = 20,
+                      processes: Optional[int] = None, timeout: float = 10.0) -> Dict[str, int]:
+    """
+    Fetch every host or URL in inputs (URLs, or files with one host/URL per line; missing files are
+    skipped) once, fingerprint the responses and write a JSON report to output_file. Returns counters.
+    """
+    entries = []  # type: List[str]
+    for item in inputs:
+        if '://' in item:
+            entries.append(item)
+        elif storage.exists(item):
+            entries.extend(line for line in storage.iter_lines(item) if line.strip())
+    entries = list(dict.fromkeys(e.strip() for e in entries))
+    compiled = load_signatures(signatures)
+    processes = processes if processes is not None else (os.cpu_count() or 1)
+    pool = _shared_pool(signatures, processes) if processes > 1 and len(entries) >= POOL_THRESHOLD else None
+    client = HttpClient(timeout=timeout)
+
+    def analyze(response: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if pool is not None:
+            try:
+                return pool.submit(_analyze_in_worker, response).result()
+            except BrokenProcessPool:
+                pass  # a worker died; match in-process rather than lose the host
+        return compiled.analyze(response)
+
+    def fetch(entry: str) -> Dict[str, Any]:
+        error = 'no URL'
+        for url in _entry_urls(entry):
+            try:
+                resp = client.get(url)
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                continue
+            response = {'url': resp.url, 'headers': resp.raw_headers, 'body': resp.body[:MAX_BODY].decode('utf-8', 'replace')}
+            return {'input': entry, 'url': resp.url, 'status': resp.status, 'server': resp.headers.get('server'),
+                    'technologies': analyze(response)}
+        return {'input': entry, 'error': error}
+
+    # With a pool, fetch threads wait on the workers, so matching overlaps with the remaining fetches
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            hosts = list(executor.map(fetch, entries))
+    finally:
+        client.close()
+    summary = {}  # type: Dict[str, int]
+    for host in hosts:
+        for tech in host.get('technologies', ()):
+            summary[tech['name']] = summary.get(tech['name'], 0) + 1
+    report = {
+        'generated': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'signatures': len(compiled.technologies),
+        'hosts': hosts,
+        'technologies': dict(sorted(summary.items(), key=lambda kv: (-kv[1], kv[0]))),
+    }
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    with storage.open_text(output_file, 'w') as f:
+        json.dump(report, f, indent=2)
+    return {'hosts': len(hosts), 'reachable': sum(1 for h in hosts if 'error' not in h),
+            'technologies': len(summary), 'detections': sum(summary.values())}
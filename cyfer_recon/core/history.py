@@ -0,0 +1,123 @@
+"""
+Job duration history used to schedule long jobs first.
+
+Every finished command records its wall time under (tool, task, target features). Estimates are
+an exponentially weighted moving average, so they follow tools getting faster or slower over time.
+Unknown keys fall back to coarser keys (tool + task, then tool) and finally to a default.
+History is kept in ~/.cyfer_recon/history.json between runs.
+"""
+import ipaddress
+import json
+import math
+import os
+import threading
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from cyfer_recon.core import storage
+from cyfer_recon.core.config_utils import CONFIG_DIR
+
+DEFAULT_HISTORY_FILE = os.path.join(CONFIG_DIR, "history.json")
+DEFAULT_ESTIMATE = 60.0
+EWMA_ALPHA = 0.3
+
+_active = None  # type: Optional[DurationHistory]
+
+
+@lru_cache(maxsize=65536)
+def target_features(target: str, output_dir: Optional[str] = None) -> str:
+    """
+    Coarse size features of a target: its kind and, for domains seen before, a log2 bucket of the
+    number of subdomains the previous run found (bigger attack surface, longer scans).
+    """
+    try:
+        ipaddress.ip_address(target.strip('[]'))
+        return "ip"
+    except ValueError:
+        pass
+    bucket = 0
+    if output_dir:
+        known = os.path.join(output_dir, 'unique_subdomains.txt')
+        if storage.exists(known):
+            count = sum(1 for _ in storage.iter_lines(known))
+            bucket = int(math.log2(count)) + 1 if count else 0
+    return f"domain:{bucket}"
+
+
+class DurationHistory:
+    """EWMA of job durations keyed by tool, task and target features."""
+
+    def __init__(self, path: str = DEFAULT_HISTORY_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = {}  # type: Dict[str, Tuple[float, int]]  key -> (ewma seconds, samples)
+        self._dirty = False
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._data = {k: (float(v[0]), int(v[1])) for k, v in json.load(f).items()}
+        except (OSError, ValueError, TypeError, IndexError):
+            self._data = {}
+
+    @staticmethod
+    def _keys(tool: str, task: str, features: str) -> Tuple[str, str, str]:
+        return f"{tool}|{task}|{features}", f"{tool}|{task}|*", f"{tool}|*|*"
+
+    def record(self, tool: str, task: str, features: str, seconds: float) -> None:
+        with self._lock:
+            for key in self._keys(tool, task, features):
+                old = self._data.get(key)
+                if old is None:
+                    self._data[key] = (seconds, 1)
+                else:
+                    self._data[key] = (old[0] + EWMA_ALPHA * (seconds - old[0]), old[1] + 1)
+            self._dirty = True
+
+    def estimate(self, tool: str, task: str, features: str, default: float = DEFAULT_ESTIMATE) -> float:
+        with self._lock:
+            for key in self._keys(tool, task, features):
+                if key in self._data:
+                    return self._data[key][0]
+        return default
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = self.path + '.tmp'
+        with self._lock:
+            data = {k: [round(v[0], 3), v[1]] for k, v in self._data.items()}
+            self._dirty = False
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+def start(path: str = DEFAULT_HISTORY_FILE) -> DurationHistory:
+    """Load the run-wide history; jobs record into it and the scheduler reads estimates from it."""
+    global _active
+    _active = DurationHistory(path)
+    return _active
+
+
+def stop() -> None:
+    """Save and detach the run-wide history."""
+    global _active
+    if _active is not None:
+        _active.save()
+        _active = None
+
+
+def active() -> Optional[DurationHistory]:
+    return _active
+
+
+def estimate(tool: str, task: str, target: str, output_dir: Optional[str] = None) -> float:
+    """Estimated seconds for a job (DEFAULT_ESTIMATE without history)."""
+    if _active is None:
+        return DEFAULT_ESTIMATE
+    return _active.estimate(tool, task, target_features(target, output_dir))
+
+
+def record(tool: str, task: str, target: str, output_dir: Optional[str], seconds: float) -> None:
+    if _active is not None:
+        _active.record(tool, task, target_features(target, output_dir), seconds)
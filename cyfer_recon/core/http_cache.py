@@ -0,0 +1,294 @@
+"""
+Optional local caching forward proxy shared by the HTTP tools of a run.
+
+Plain-HTTP GET responses are stored in a size-bounded disk cache and served again until the
+per-run TTL expires, so httpx, nuclei, katana, curl, ... stop re-fetching the same pages.
+Entries are keyed by the method, the URL and every end-to-end request header (Cookie, Origin, a
+Host that differs from the URL, X-Forwarded-*, ...) except UNKEYED_HEADERS. A scanner probing with
+crafted headers therefore never gets the baseline response of the same URL back, while httpx,
+nuclei and katana share entries despite their different User-Agents. Responses with "Vary: *" or
+varying on an unkeyed header are not cached.
+HTTPS goes through CONNECT tunnels and is relayed as-is (it cannot be cached without
+intercepting TLS).
+
+Tools opt in through their tools.json entry:
+  "proxy": "-http-proxy {proxy}"   flag inserted after the tool name ({proxy_host} gives host:port)
+  "proxy": "env"                   HTTP_PROXY/HTTPS_PROXY are set for the command instead
+  "proxy_after": "file"            place the flag after this subcommand (or any of a list of them)
+An existing value of the flag in the command is replaced.
+"""
+import hashlib
+import json
+import os
+import re
+import select
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from cyfer_recon.core.config_utils import CONFIG_DIR
+from cyfer_recon.core.http_client import HttpClient
+from cyfer_recon.core.utils import set_tool_option
+
+DEFAULT_CACHE_DIR = os.path.join(CONFIG_DIR, "http_cache")
+CACHEABLE_STATUS = (200, 203, 204, 300, 301, 404, 410)
+HOP_BY_HOP = ('connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'proxy-connection',
+              'te', 'trailers', 'transfer-encoding', 'upgrade')
+# Request headers that differ between tools without changing the response; left out of cache keys
+UNKEYED_HEADERS = ('user-agent', 'accept-encoding', 'connection')
+
+_active_proxy = None  # type: Optional[CachingProxy]
+
+
+class DiskCache:
+    """Disk-backed response cache bounded by total size, evicting least recently used entries."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_DIR, max_bytes: int = 1024 * 1024 * 1024, ttl: float = 3600,
+                 max_entry_bytes: int = 5 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_entry_bytes = max_entry_bytes
+        self._lock = threading.Lock()
+        self._entries = {}  # type: Dict[str, Tuple[float, int]]  key -> (last use, size)
+        self._size = 0
+        os.makedirs(path, exist_ok=True)
+        for root, _, files in os.walk(path):
+            for name in files:
+                st = os.stat(os.path.join(root, name))
+                self._entries[name] = (st.st_mtime, st.st_size)
+                self._size += st.st_size
+
+    @staticmethod
+    def key(method: str, url: str, headers: Optional[Dict[str, str]] = None) -> str:
+        request = [method, url] + sorted(f"{k.lower()}: {v}" for k, v in (headers or {}).items()
+                                         if k.lower() not in UNKEYED_HEADERS)
+        return hashlib.sha256('\n'.join(request).encode('utf-8')).hexdigest()
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], key)
+
+    def get(self, key: str) -> Optional[Tuple[int, str, List[Tuple[str, str]], bytes]]:
+        """Return (status, reason, headers, body) if a fresh entry exists."""
+        path = self._file(key)
+        try:
+            with open(path, 'rb') as f:
+                meta = json.loads(f.readline().decode('utf-8'))
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        if time.time() - meta['stored'] > self.ttl:
+            return None
+        with self._lock:
+            if key in self._entries:
+                self._entries[key] = (time.time(), self._entries[key][1])
+        return meta['status'], meta['reason'], [tuple(h) for h in meta['headers']], body
+
+    def put(self, key: str, status: int, reason: str, headers: List[Tuple[str, str]], body: bytes) -> None:
+        if len(body) > self.max_entry_bytes:
+            return
+        meta = json.dumps({'stored': time.time(), 'status': status, 'reason': reason, 'headers': headers})
+        data = meta.encode('utf-8') + b'\n' + body
+        path = self._file(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            old = self._entries.get(key)
+            if old:
+                self._size -= old[1]
+            self._entries[key] = (time.time(), len(data))
+            self._size += len(data)
+            self._evict()
+
+    def _evict(self) -> None:
+        if self._size <= self.max_bytes:
+            return
+        for key, (_, size) in sorted(self._entries.items(), key=lambda kv: kv[1][0]):
+            if self._size <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(self._file(key))
+            except OSError:
+                pass
+            del self._entries[key]
+            self._size -= size
+
+
+class _ProxyHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server = None  # type: CachingProxy
+
+    def log_message(self, format, *args):
+        pass
+
+    def finish(self) -> None:
+        # Each client connection gets its own thread; drop its upstream connections with it
+        self.server.client.close_thread()
+        super().finish()
+
+    def _request_headers(self, url: str) -> Dict[str, str]:
+        # The proxy negotiates Accept-Encoding itself and caches/serves decoded bodies
+        skip = HOP_BY_HOP + ('accept-encoding',)
+        headers = {k: v for k, v in self.headers.items() if k.lower() not in skip}
+        for name in [k for k in headers if k.lower() == 'host']:
+            # Only a Host naming another site than the URL (host header tests) is sent as-is
+            if headers[name].lower() == urlsplit(url).netloc.lower():
+                del headers[name]
+        return headers
+
+    def _send(self, status: int, reason: str, headers: List[Tuple[str, str]], body: bytes) -> None:
+        self.send_response(status, reason)
+        for name, value in headers:
+            if name.lower() in HOP_BY_HOP or name.lower() in ('content-length', 'content-encoding'):
+                continue
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _forward(self) -> None:
+        url = self.path
+        if not url.startswith('http://'):
+            self.send_error(400, "Only absolute http:// URLs and CONNECT are supported")
+            return
+        proxy = self.server
+        headers = self._request_headers(url)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else None
+        cacheable = self.command == 'GET' and 'authorization' not in (k.lower() for k in headers)
+        key = DiskCache.key(self.command, url, headers)
+        if cacheable:
+            hit = proxy.cache.get(key)
+            if hit is not None:
+                proxy.count('hits')
+                self._send(*hit)
+                return
+        proxy.count('misses')
+        try:
+            resp = proxy.client.request(self.command, url, headers=headers, body=body)
+        except Exception as e:
+            self.send_error(502, f"Upstream error: {e}")
+            return
+        cache_control = resp.headers.get('cache-control', '').lower()
+        vary = {v.strip().lower() for v in resp.headers.get('vary', '').split(',')}
+        if cacheable and resp.status in CACHEABLE_STATUS and 'no-store' not in cache_control \
+                and '*' not in vary and not vary.intersection(UNKEYED_HEADERS):
+            proxy.cache.put(key, resp.status, resp.reason, resp.raw_headers, resp.body)
+        self._send(resp.status, resp.reason, resp.raw_headers, resp.body)
+
+    do_GET = do_HEAD = do_POST = do_PUT = do_DELETE = do_PATCH = do_OPTIONS = _forward
+
+    def do_CONNECT(self):
+        host, _, port = self.path.rpartition(':')
+        try:
+            upstream = socket.create_connection((host, int(port)), timeout=self.server.client.timeout)
+        except (OSError, ValueError) as e:
+            self.send_error(502, f"CONNECT failed: {e}")
+            return
+        self.server.count('tunnels')
+        self.send_response(200, 'Connection Established')
+        self.end_headers()
+        conns = [self.connection, upstream]
+        self.close_connection = True
+        try:
+            while True:
+                readable, _, errored = select.select(conns, [], conns, 60)
+                if errored or not readable:
+                    break
+                for sock in readable:
+                    data = sock.recv(65536)
+                    if not data:
+                        return
+                    (upstream if sock is self.connection else self.connection).sendall(data)
+        except OSError:
+            pass
+        finally:
+            upstream.close()
+
+
+class CachingProxy(ThreadingHTTPServer):
+    """Local forward proxy serving repeated GETs from a DiskCache."""
+    daemon_threads = True
+
+    def __init__(self, cache: DiskCache, host: str = '127.0.0.1', port: int = 0, timeout: float = 30.0):
+        super().__init__((host, port), _ProxyHandler)
+        self.cache = cache
+        self.client = HttpClient(timeout=timeout)
+        self.stats = {'hits': 0, 'misses': 0, 'tunnels': 0}
+        self._stats_lock = threading.Lock()
+        self._thread = None  # type: Optional[threading.Thread]
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def count(self, name: str) -> None:
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def start(self) -> 'CachingProxy':
+        self._thread = threading.Thread(target=self.serve_forever, name="cyfer-http-cache", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        self.client.close()
+
+
+def start_proxy(cache_dir: str = DEFAULT_CACHE_DIR, ttl: float = 3600, max_bytes: int = 1024 * 1024 * 1024) -> CachingProxy:
+    """Start the run-wide caching proxy; commands prepared afterwards are pointed at it."""
+    global _active_proxy
+    _active_proxy = CachingProxy(DiskCache(cache_dir, max_bytes=max_bytes, ttl=ttl)).start()
+    return _active_proxy
+
+
+def stop_proxy() -> Optional[Dict[str, int]]:
+    """Stop the run-wide proxy and return its hit/miss counters."""
+    global _active_proxy
+    if _active_proxy is None:
+        return None
+    proxy, _active_proxy = _active_proxy, None
+    proxy.stop()
+    return dict(proxy.stats)
+
+
+def active_proxy_url() -> Optional[str]:
+    return _active_proxy.url if _active_proxy is not None else None
+
+
+def apply_proxy(cmd: str, tools_config: Dict[str, Any], proxy_url: Optional[str] = None) -> Tuple[str, Optional[Dict[str, str]]]:
+    """
+    Point the proxy-capable tools of a command at the caching proxy.
+    Returns the rewritten command and, if a tool wants it via the environment, an env mapping.
+    """
+    proxy_url = proxy_url or active_proxy_url()
+    if not proxy_url or not tools_config:
+        return cmd, None
+    env = None
+    proxy_host = urlsplit(proxy_url).netloc
+    for tool, info in tools_config.items():
+        flag = info.get('proxy') if isinstance(info, dict) else None
+        if not flag:
+            continue
+        names = (tool, info.get('check') or tool)
+        if flag == 'env':
+            # Tool at the start of the command or of a pipeline stage / loop body
+            if not any(re.search(r'(^|[|;&]\s*|\bdo\s+)' + re.escape(n) + r'(?=\s|$)', cmd) for n in names):
+                continue
+            if env is None:
+                env = dict(os.environ)
+            for name in ('HTTP_PROXY', 'HTTPS_PROXY', 'http_proxy', 'https_proxy'):
+                env[name] = proxy_url
+            continue
+        rendered = flag.replace('{proxy}', proxy_url).replace('{proxy_host}', proxy_host)
+        cmd = set_tool_option(cmd, names, rendered, info.get('proxy_after'))
+    return cmd, env
@@ -0,0 +1,159 @@
+"""
+Small pooled HTTP client used by the built-in stages.
+
+Each thread keeps one keep-alive connection per (scheme, host, port), so a worker pool fetching
+many URLs from the same hosts reuses TCP/TLS connections instead of reconnecting per request.
+"""
+import gzip
+import http.client
+import ssl
+import threading
+import zlib
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (compatible; cyfer-recon)"
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+
+class Response:
+    """A fully read HTTP response."""
+
+    def __init__(self, url: str, status: int, reason: str, headers: Dict[str, str], body: bytes,
+                 raw_headers: Optional[List[Tuple[str, str]]] = None):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        # Lower-cased names; raw_headers keeps the original list including repeated headers
+        self.headers = headers
+        self.body = body
+        self.raw_headers = raw_headers or list(headers.items())
+
+    def text(self, encoding: str = 'utf-8') -> str:
+        return self.body.decode(encoding, 'replace')
+
+
+class HttpClient:
+    """
+    Thread-safe HTTP/1.1 client with per-thread connection pooling.
+    TLS certificates are not verified by default, as recon targets often have broken chains.
+    """
+
+    def __init__(self, timeout: float = 10.0, verify_tls: bool = False, user_agent: str = DEFAULT_USER_AGENT,
+                 max_redirects: int = 5, max_body: int = 10 * 1024 * 1024):
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.max_redirects = max_redirects
+        self.max_body = max_body
+        self._local = threading.local()
+        # Every thread's pool, so the owner can close them once its workers are done
+        self._pools = []  # type: List[Dict[Tuple[str, str, int], http.client.HTTPConnection]]
+        self._pools_lock = threading.Lock()
+        self._generation = 0  # bumped by close(); threads then start a fresh pool
+        if verify_tls:
+            self._ssl_context = ssl.create_default_context()
+        else:
+            self._ssl_context = ssl.create_default_context()
+            self._ssl_context.check_hostname = False
+            self._ssl_context.verify_mode = ssl.CERT_NONE
+
+    def _pool(self) -> Dict[Tuple[str, str, int], http.client.HTTPConnection]:
+        pool = getattr(self._local, 'pool', None)
+        if pool is None or self._local.generation != self._generation:
+            pool = self._local.pool = {}
+            with self._pools_lock:
+                self._local.generation = self._generation
+                self._pools.append(pool)
+        return pool
+
+    def _connection(self, scheme: str, host: str, port: int) -> http.client.HTTPConnection:
+        pool = self._pool()
+        key = (scheme, host, port)
+        conn = pool.get(key)
+        if conn is None:
+            if scheme == 'https':
+                conn = http.client.HTTPSConnection(host, port, timeout=self.timeout, context=self._ssl_context)
+            else:
+                conn = http.client.HTTPConnection(host, port, timeout=self.timeout)
+            pool[key] = conn
+        return conn
+
+    def _drop(self, scheme: str, host: str, port: int) -> None:
+        conn = self._pool().pop((scheme, host, port), None)
+        if conn is not None:
+            conn.close()
+
+    def request(self, method: str, url: str, headers: Optional[Dict[str, str]] = None, body: Optional[bytes] = None) -> Response:
+        """Send one request (no redirect handling). Retries once on a stale keep-alive connection."""
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower() or 'http'
+        if scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported URL scheme: {url}")
+        host = parts.hostname or ''
+        port = parts.port or (443 if scheme == 'https' else 80)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        req_headers = {'User-Agent': self.user_agent, 'Accept': '*/*', 'Accept-Encoding': 'gzip, deflate'}
+        if headers:
+            req_headers.update(headers)
+        for attempt in (0, 1):
+            conn = self._connection(scheme, host, port)
+            try:
+                conn.request(method, path, body=body, headers=req_headers)
+                resp = conn.getresponse()
+                data = resp.read(self.max_body + 1) if method != 'HEAD' else b''
+                if len(data) > self.max_body or resp.will_close:
+                    # Partially read or server-closed connections cannot be reused
+                    self._drop(scheme, host, port)
+                    data = data[:self.max_body]
+                break
+            except (http.client.RemoteDisconnected, http.client.CannotSendRequest, BrokenPipeError, ConnectionResetError):
+                self._drop(scheme, host, port)
+                if attempt:
+                    raise
+            except Exception:
+                self._drop(scheme, host, port)
+                raise
+        raw_headers = resp.getheaders()
+        resp_headers = {k.lower(): v for k, v in raw_headers}
+        encoding = resp_headers.get('content-encoding', '').lower()
+        try:
+            if encoding == 'gzip':
+                data = gzip.decompress(data)
+            elif encoding == 'deflate':
+                data = zlib.decompress(data)
+        except (OSError, EOFError, zlib.error):
+            pass
+        return Response(url, resp.status, resp.reason, resp_headers, data, raw_headers)
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> Response:
+        """GET a URL, following redirects up to max_redirects."""
+        for _ in range(self.max_redirects + 1):
+            resp = self.request('GET', url, headers)
+            location = resp.headers.get('location')
+            if resp.status not in REDIRECT_CODES or not location:
+                return resp
+            url = urljoin(url, location)
+        return resp
+
+    def close_thread(self) -> None:
+        """Close the calling thread's connections, e.g. before a short-lived thread exits."""
+        pool = getattr(self._local, 'pool', None)
+        if pool is None:
+            return
+        self._local.pool = None
+        with self._pools_lock:
+            self._pools = [p for p in self._pools if p is not pool]
+        for conn in pool.values():
+            conn.close()
+
+    def close(self) -> None:
+        """Close the connections of every thread. Call once no request is in flight."""
+        with self._pools_lock:
+            pools, self._pools = self._pools, []
+            self._generation += 1
+        for pool in pools:
+            for conn in list(pool.values()):
+                conn.close()
+            pool.clear()
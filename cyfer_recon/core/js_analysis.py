@@ -0,0 +1,168 @@
+"""
+Built-in JavaScript analysis: fetch each live JS file once and scan it in a single pass.
+
+Replaces the per-URL `linkfinder.py` loops and the repeated `xargs curl | grep` commands of the
+"Automated JavaScript Analysis" task while writing the same output files.
+"""
+import hashlib
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Set, Tuple
+
+from cyfer_recon.core import storage
+from cyfer_recon.core.http_client import HttpClient
+
+# Endpoint regex from LinkFinder (https://github.com/GerbenJavado/LinkFinder)
+ENDPOINT_REGEX = re.compile(r"""
+  (?:"|')                               # Start newline delimiter
+  (
+    ((?:[a-zA-Z]{1,10}://|//)           # Match a scheme [a-Z]*1-10 or //
+    [^"'/]{1,}\.                        # Match a domainname (any character + dot)
+    [a-zA-Z]{2,}[^"']{0,})              # The domainextension and/or path
+    |
+    ((?:/|\.\./|\./)                    # Start with /,../,./
+    [^"'><,;| *()(%$^/\\\[\]]           # Next character can't be...
+    [^"'><,;|()]{1,})                   # Rest of the characters can't be
+    |
+    ([a-zA-Z0-9_\-/]{1,}/               # Relative endpoint with /
+    [a-zA-Z0-9_\-/.]{1,}                # Resource name
+    \.(?:[a-zA-Z]{1,4}|action)          # Rest + extension (length 1-4 or action)
+    (?:[\?|#][^"|']{0,}|))              # ? or # mark with parameters
+    |
+    ([a-zA-Z0-9_\-/]{1,}/               # REST API (no extension) with /
+    [a-zA-Z0-9_\-/]{3,}                 # Proper REST endpoints usually have 3+ chars
+    (?:[\?|#][^"|']{0,}|))              # ? or # mark with parameters
+    |
+    ([a-zA-Z0-9_\-]{1,}                 # filename
+    \.(?:php|asp|aspx|jsp|json|
+         action|html|js|txt|xml)        # . + extension
+    (?:[\?|#][^"|']{0,}|))              # ? or # mark with parameters
+  )
+  (?:"|')                               # End newline delimiter
+""", re.VERBOSE)
+
+API_ENDPOINT_REGEX = re.compile(r'^/api/')
+SENSITIVE_ENDPOINT_REGEX = re.compile(r'(config|admin|auth|login|api|key|secret|token)')
+
+# One combined pattern so every body is scanned once for both kinds of line
+LINE_PATTERNS = re.compile(
+    r'(?P<secret>(?i:api[_-]?key|secret|token|password|auth|credential|access[_-]?token))'
+    r'|(?P<storage>localStorage|sessionStorage)'
+)
+
+OUTPUT_FILES = {
+    'endpoints': 'linkfinder_endpoints.txt',
+    'api': 'linkfinder_api_endpoints.txt',
+    'sensitive': 'linkfinder_sensitive_endpoints.txt',
+    'secret': 'manual_secrets.txt',
+    'storage': 'local_storage_refs.txt',
+}
+
+
+def extract_endpoints(body: str) -> List[str]:
+    """Return endpoints found in a JS body, in order of first appearance."""
+    seen = set()  # type: Set[str]
+    found = []
+    for m in ENDPOINT_REGEX.finditer(body):
+        endpoint = m.group(1)
+        if endpoint not in seen:
+            seen.add(endpoint)
+            found.append(endpoint)
+    return found
+
+
+def scan_lines(body: str) -> Dict[str, List[str]]:
+    """Return the body lines matching the secret and storage patterns, like `grep` on the body."""
+    hits = {'secret': [], 'storage': []}  # type: Dict[str, List[str]]
+    last_line = {'secret': -1, 'storage': -1}
+    for m in LINE_PATTERNS.finditer(body):
+        kind = m.lastgroup
+        start = body.rfind('\n', 0, m.start()) + 1
+        if start == last_line[kind]:
+            continue
+        last_line[kind] = start
+        end = body.find('\n', m.end())
+        hits[kind].append(body[start:end if end != -1 else len(body)].rstrip('\r'))
+    return hits
+
+
+def analyze_body(body: str) -> Dict[str, List[str]]:
+    """Run endpoint extraction and the secret/storage scan over one body."""
+    endpoints = extract_endpoints(body)
+    result = scan_lines(body)
+    result['endpoints'] = endpoints
+    result['api'] = [e for e in endpoints if API_ENDPOINT_REGEX.search(e)]
+    result['sensitive'] = [e for e in endpoints if SENSITIVE_ENDPOINT_REGEX.search(e)]
+    return result
+
+
+def _read_urls(path: str) -> List[str]:
+    urls = []
+    seen = set()  # type: Set[str]
+    with storage.open_text(path) as f:
+        for line in f:
+            # httpx style lines may carry extra columns ("url [200]")
+            url = line.strip().split(' ')[0]
+            if url and url not in seen:
+                seen.add(url)
+                urls.append(url)
+    return urls
+
+
+def analyze_js_urls(urls_file: str, out_dir: str, workers: int = 20, timeout: float = 15.0) -> Dict[str, int]:
+    """
+    Fetch every URL in urls_file concurrently, scan each distinct body once and write
+    linkfinder_endpoints.txt, linkfinder_api_endpoints.txt, linkfinder_sensitive_endpoints.txt,
+    manual_secrets.txt and local_storage_refs.txt into out_dir. Returns counters.
+    """
+    stats = {'fetched': 0, 'failed': 0, 'unique': 0, 'endpoints': 0, 'secrets': 0}
+    if not storage.exists(urls_file):
+        raise FileNotFoundError(f"JS URL list not found: {urls_file}")
+    urls = _read_urls(urls_file)
+    os.makedirs(out_dir, exist_ok=True)
+    client = HttpClient(timeout=timeout)
+    seen_bodies = set()  # type: Set[bytes]
+    lock = threading.Lock()
+
+    def fetch_and_scan(url: str) -> Tuple[bool, Dict[str, List[str]]]:
+        try:
+            resp = client.get(url)
+        except Exception:
+            return False, {}
+        if resp.status != 200:
+            return True, {}
+        digest = hashlib.sha256(resp.body).digest()
+        with lock:
+            if digest in seen_bodies:
+                return True, {}
+            seen_bodies.add(digest)
+        return True, analyze_body(resp.text())
+
+    results = {kind: [] for kind in OUTPUT_FILES}  # type: Dict[str, List[str]]
+    seen_lines = {kind: set() for kind in OUTPUT_FILES}  # type: Dict[str, Set[str]]
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = [executor.submit(fetch_and_scan, url) for url in urls]
+            for future in as_completed(futures):
+                ok, found = future.result()
+                stats['fetched' if ok else 'failed'] += 1
+                if found:
+                    stats['unique'] += 1
+                for kind, lines in found.items():
+                    for line in lines:
+                        if line not in seen_lines[kind]:
+                            seen_lines[kind].add(line)
+                            results[kind].append(line)
+    finally:
+        client.close()
+
+    # Appended, like the `>>` redirections of the commands this replaces
+    for kind, name in OUTPUT_FILES.items():
+        with storage.open_text(os.path.join(out_dir, name), 'a') as f:
+            for line in results[kind]:
+                f.write(f"{line}\n")
+    stats['endpoints'] = len(results['endpoints'])
+    stats['secrets'] = len(results['secret'])
+    return stats
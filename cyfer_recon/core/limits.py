@@ -0,0 +1,283 @@
+"""
+Per-tool resource limits, declared in tools.json:
+
+    "amass": {"check": "amass", "limits": {"memory_mb": 4096, "cpu_seconds": 7200,
+                                           "nofile": 4096, "nice": 10, "ionice": "idle"}}
+
+Limits are applied to the tool's process when it is spawned: setrlimit() in the child
+(RLIMIT_DATA for memory, RLIMIT_CPU, RLIMIT_NOFILE) plus nice, and `ionice` as a wrapper.
+Where a writable cgroup v2 with the memory controller is available (the process' own cgroup
+when it delegates to children, or CYFER_CGROUP_ROOT), memory is enforced by a per-process cgroup
+instead, which also catches everything the tool forks. Afterwards Sandbox.verdict() tells a
+limit kill apart from an ordinary failure. Limits are ignored on platforms without `resource` (Windows).
+"""
+import itertools
+import os
+import re
+import shutil
+import signal
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows: no rlimits, tools run unlimited
+    resource = None
+
+LIMIT_KEYS = ('memory_mb', 'cpu_seconds', 'nofile', 'nice', 'ionice')
+IONICE_CLASSES = {'realtime': 1, 'best-effort': 2, 'idle': 3}
+# RLIMIT_CPU sends SIGXCPU at the soft limit and SIGKILL this many seconds later
+CPU_GRACE_SECONDS = 5
+CGROUP_ROOT_ENV = 'CYFER_CGROUP_ROOT'
+
+_MEMORY_ERRORS = re.compile(r'out of memory|cannot allocate memory|memoryerror|bad_alloc|failed to allocate', re.I)
+_NOFILE_ERRORS = re.compile(r'too many open files', re.I)
+_cgroup_ids = itertools.count(1)
+_parsed = None  # type: Optional[Tuple[Any, Dict[str, ResourceLimits]]]  last (tools_config, limits)
+
+
+class ResourceLimits:
+    """Validated limits of one tool."""
+    __slots__ = ('memory_mb', 'cpu_seconds', 'nofile', 'nice', 'ionice')
+
+    def __init__(self, memory_mb: Optional[int] = None, cpu_seconds: Optional[int] = None, nofile: Optional[int] = None,
+                 nice: Optional[int] = None, ionice: Optional[str] = None):
+        self.memory_mb = memory_mb
+        self.cpu_seconds = cpu_seconds
+        self.nofile = nofile
+        self.nice = nice
+        self.ionice = ionice
+
+    @classmethod
+    def from_config(cls, tool: str, config: Dict[str, Any]) -> 'ResourceLimits':
+        """Build limits from a tools.json "limits" mapping; raises ValueError for unknown keys or bad values."""
+        unknown = sorted(set(config) - set(LIMIT_KEYS))
+        if unknown:
+            raise ValueError(f"{tool}: unknown limit(s) {', '.join(unknown)}")
+        values = {}
+        for key in ('memory_mb', 'cpu_seconds', 'nofile'):
+            if config.get(key) is not None:
+                if not isinstance(config[key], int) or config[key] <= 0:
+                    raise ValueError(f"{tool}: {key} must be a positive integer")
+                values[key] = config[key]
+        if config.get('nice') is not None:
+            if not isinstance(config['nice'], int) or not -20 <= config['nice'] <= 19:
+                raise ValueError(f"{tool}: nice must be an integer between -20 and 19")
+            values['nice'] = config['nice']
+        if config.get('ionice') is not None:
+            cls._ionice_args(tool, str(config['ionice']))
+            values['ionice'] = str(config['ionice'])
+        return cls(**values)
+
+    @staticmethod
+    def _ionice_args(tool: str, spec: str) -> List[str]:
+        """"idle", "best-effort" or "best-effort:7" -> ionice arguments."""
+        name, _, level = spec.partition(':')
+        if name not in IONICE_CLASSES or (level and (not level.isdigit() or int(level) > 7)):
+            raise ValueError(f"{tool}: ionice must be idle, best-effort[:0-7] or realtime[:0-7], not {spec!r}")
+        args = ['-c', str(IONICE_CLASSES[name])]
+        if level:
+            args += ['-n', level]
+        return args
+
+    def describe(self) -> str:
+        parts = []
+        if self.memory_mb:
+            parts.append(f"memory {self.memory_mb} MB")
+        if self.cpu_seconds:
+            parts.append(f"cpu {self.cpu_seconds}s")
+        if self.nofile:
+            parts.append(f"nofile {self.nofile}")
+        if self.nice is not None:
+            parts.append(f"nice {self.nice}")
+        if self.ionice:
+            parts.append(f"ionice {self.ionice}")
+        return ', '.join(parts)
+
+
+def tool_limits(tools_config: Optional[Dict[str, Any]]) -> Dict[str, ResourceLimits]:
+    """Tool name (and its check binary) -> limits, for every tools.json entry with a "limits" key."""
+    global _parsed
+    if _parsed is not None and _parsed[0] is tools_config:
+        return _parsed[1]
+    found = {}  # type: Dict[str, ResourceLimits]
+    if resource is None:
+        return found
+    for tool, info in (tools_config or {}).items():
+        if not isinstance(info, dict) or not info.get('limits'):
+            continue
+        limits = ResourceLimits.from_config(tool, info['limits'])
+        found[tool] = limits
+        if info.get('check'):
+            found.setdefault(info['check'], limits)
+    _parsed = (tools_config, found)
+    return found
+
+
+def limits_for_command(cmd: str, limits: Dict[str, ResourceLimits]) -> Optional[Tuple[str, ResourceLimits]]:
+    """(tool, limits) of the first limited tool appearing in a shell command (they then apply to the whole shell)."""
+    for tool, matched in limits.items():
+        if re.search(r'(^|[|;&(]\s*|\bdo\s+|\bthen\s+)' + re.escape(tool) + r'(?=\s|$)', cmd):
+            return tool, matched
+    return None
+
+
+@lru_cache(maxsize=1)
+def cgroup_parent() -> Optional[str]:
+    """A writable cgroup v2 directory whose children get the memory controller, or None."""
+    candidate = os.environ.get(CGROUP_ROOT_ENV)
+    if not candidate:
+        if not os.path.isfile('/sys/fs/cgroup/cgroup.controllers'):
+            return None  # cgroup v1 or hybrid layout
+        try:
+            with open('/proc/self/cgroup', 'r', encoding='utf-8') as f:
+                line = next((l for l in f if l.startswith('0::')), None)
+        except OSError:
+            return None
+        if line is None:
+            return None
+        candidate = os.path.join('/sys/fs/cgroup', line[3:].strip().lstrip('/'))
+    try:
+        with open(os.path.join(candidate, 'cgroup.subtree_control'), 'r', encoding='utf-8') as f:
+            controllers = f.read().split()
+    except OSError:
+        return None
+    if 'memory' not in controllers or not os.access(candidate, os.W_OK):
+        return None
+    return candidate
+
+
+def _write(path: str, value: str) -> bool:
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(value)
+        return True
+    except OSError:
+        return False
+
+
+class Sandbox:
+    """Applies one tool's limits to one spawned process and judges how it ended."""
+
+    def __init__(self, tool: str, limits: ResourceLimits):
+        self.tool = tool
+        self.limits = limits
+        self.cgroup = None  # type: Optional[str]
+        self.started = 0.0
+        self._rlimits = []  # type: List[tuple]
+        if limits.memory_mb:
+            self.cgroup = self._make_cgroup(limits.memory_mb * 1024 * 1024)
+            if self.cgroup is None:
+                self._add_rlimit(resource.RLIMIT_DATA, limits.memory_mb * 1024 * 1024)
+        if limits.cpu_seconds:
+            self._add_rlimit(resource.RLIMIT_CPU, limits.cpu_seconds, limits.cpu_seconds + CPU_GRACE_SECONDS)
+        if limits.nofile:
+            self._add_rlimit(resource.RLIMIT_NOFILE, limits.nofile)
+
+    def _add_rlimit(self, which: int, soft: int, hard: Optional[int] = None) -> None:
+        # Computed here, in the parent, so the child only has to call setrlimit()
+        _, current_hard = resource.getrlimit(which)
+        hard = soft if hard is None else hard
+        if current_hard != resource.RLIM_INFINITY:
+            soft, hard = min(soft, current_hard), min(hard, current_hard)
+        self._rlimits.append((which, (soft, hard)))
+
+    def _make_cgroup(self, memory_bytes: int) -> Optional[str]:
+        parent = cgroup_parent()
+        if parent is None:
+            return None
+        path = os.path.join(parent, f"cyfer-{os.getpid()}-{next(_cgroup_ids)}")
+        try:
+            os.mkdir(path)
+        except OSError:
+            return None
+        if not _write(os.path.join(path, 'memory.max'), str(memory_bytes)):
+            self._remove_cgroup(path)
+            return None
+        _write(os.path.join(path, 'memory.swap.max'), '0')
+        return path
+
+    def argv(self, argv: List[str]) -> List[str]:
+        """argv wrapped in `ionice` when an I/O class is configured and ionice is installed."""
+        if self.limits.ionice and shutil.which('ionice'):
+            return ['ionice'] + ResourceLimits._ionice_args(self.tool, self.limits.ionice) + list(argv)
+        return list(argv)
+
+    def popen_kwargs(self) -> Dict[str, Callable[[], None]]:
+        self.started = time.monotonic()
+        procs = os.path.join(self.cgroup, 'cgroup.procs').encode() if self.cgroup else None
+        rlimits = self._rlimits
+        nice = self.limits.nice
+
+        def preexec() -> None:
+            # Runs in the forked child: only plain system calls, no locks
+            if procs is not None:
+                fd = os.open(procs, os.O_WRONLY)
+                try:
+                    os.write(fd, b'0')
+                finally:
+                    os.close(fd)
+            for which, values in rlimits:
+                resource.setrlimit(which, values)
+            if nice:
+                os.nice(nice)
+        return {'preexec_fn': preexec}
+
+    def verdict(self, returncode: int, stderr: str = '') -> Optional[str]:
+        """Which limit ended the process ("memory limit (2048 MB)", ...), or None for an ordinary exit."""
+        if returncode == 0:
+            return None
+        limits = self.limits
+        if self.cgroup and self._oom_kills() > 0:
+            return f"memory limit ({limits.memory_mb} MB)"
+        if limits.cpu_seconds:
+            if returncode == -signal.SIGXCPU:
+                return f"cpu limit ({limits.cpu_seconds}s)"
+            # SIGKILL after the grace period; only plausible if it could have used that much CPU
+            elapsed = time.monotonic() - self.started
+            if returncode == -signal.SIGKILL and elapsed * (os.cpu_count() or 1) >= limits.cpu_seconds:
+                return f"cpu limit ({limits.cpu_seconds}s)"
+        if limits.memory_mb and _MEMORY_ERRORS.search(stderr or ''):
+            return f"memory limit ({limits.memory_mb} MB)"
+        if limits.nofile and _NOFILE_ERRORS.search(stderr or ''):
+            return f"open files limit ({limits.nofile})"
+        return None
+
+    def _oom_kills(self) -> int:
+        try:
+            with open(os.path.join(self.cgroup, 'memory.events'), 'r', encoding='utf-8') as f:
+                for line in f:
+                    key, _, value = line.partition(' ')
+                    if key == 'oom_kill':
+                        return int(value)
+        except (OSError, ValueError):
+            pass
+        return 0
+
+    def close(self) -> None:
+        """Kill leftovers of the tool and remove its cgroup."""
+        if self.cgroup:
+            self._remove_cgroup(self.cgroup)
+            self.cgroup = None
+
+    @staticmethod
+    def _remove_cgroup(path: str) -> None:
+        _write(os.path.join(path, 'cgroup.kill'), '1')
+        for _ in range(20):
+            try:
+                os.rmdir(path)
+                return
+            except FileNotFoundError:
+                return
+            except OSError:
+                time.sleep(0.05)
+
+
+def sandbox_for(argv: List[str], limits: Optional[Dict[str, ResourceLimits]]) -> Optional[Sandbox]:
+    """A Sandbox for argv's program when it has configured limits."""
+    if not limits or not argv:
+        return None
+    tool = os.path.basename(argv[0])
+    matched = limits.get(tool)
+    return Sandbox(tool, matched) if matched is not None else None
@@ -0,0 +1,205 @@
+"""
+Pre-flight liveness gate and per-target circuit breaker for active jobs.
+
+A job is active when it runs a tool that talks to the target itself (scanners, fuzzers, crawlers,
+built-ins) and hands it {target} as a host or URL (`nuclei -u https://{target}`, `cyfer-portscan
+{target}`). Tools marked `"passive": true` in tools.json (subdomain sources, archives, dorking,
+local analysis), passive built-ins (cyfer-urlnorm) and local utilities (cat, sort, grep, ...) are
+never gated. Neither are list-driven jobs (`nuclei -l {shard}{output}/{target}_alive_subs.txt`)
+and built-ins registered with reads_lists (cyfer-techscan, cyfer-favicon): their hosts come from a
+file, so an unreachable apex domain says nothing about them.
+
+With --preflight, every target of a run is probed before its jobs start. The probe resolves the
+target and tries a TCP connection to its ports (PREFLIGHT_PORTS, or the port in the target). A
+refused connection counts as reachable, because it fails fast. Targets that do not resolve or
+only time out have their active jobs skipped.
+
+The circuit breaker counts consecutive active jobs of a target that failed with a connection-type
+error (refused, reset, timed out, unresolvable, ...). After --breaker-threshold of them the
+breaker opens, and the target's remaining active jobs are skipped. BREAKER_COOLDOWN seconds later
+the target is probed again. If it answers, the breaker closes and jobs run again.
+"""
+import os
+import re
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from cyfer_recon.core.builtins import is_builtin, is_passive_builtin, reads_lists
+
+PREFLIGHT_PORTS = (443, 80)
+PREFLIGHT_TIMEOUT = 3.0
+BREAKER_COOLDOWN = 300.0
+DEFAULT_BREAKER_THRESHOLD = 3
+
+_CONNECTION_ERRORS = re.compile(
+    r'connection refused|connection reset|connection timed out|\btimed out\b|i/o timeout|deadline exceeded|'
+    r'no route to host|(?:network|host) is unreachable|could not resolve|name or service not known|no such host|'
+    r'temporary failure in name resolution|unable to connect|failed to connect|couldn\'t connect|'
+    r'max retries exceeded|connection aborted|remote end closed connection', re.I)
+_STAGE_SPLIT_RE = re.compile(r'\|\||&&|[|;&]')
+# {target} as the whole argument or as the host of a URL ("{target}:8443", "https://{target}/api")
+_TARGET_HOST_RE = re.compile(r'^(?:[a-z][a-z0-9+.-]*://)?\{target\}(?:[:/?#].*)?$', re.I)
+# Flags whose value is an input file, never a host
+FILE_INPUT_FLAGS = ('-l', '-list', '--list', '-iL', '-w', '-wordlist', '--wordlist', '-f', '--file', '-i', '-input', '--input')
+
+_active = None  # type: Optional[Liveness]
+
+
+def probe(target: str, ports: Tuple[int, ...] = PREFLIGHT_PORTS, timeout: float = PREFLIGHT_TIMEOUT) -> Tuple[bool, str]:
+    """(reachable, detail) for a target: it resolves and some port accepts or refuses a connection."""
+    host = target.strip('[]')
+    if target.count(':') == 1 and not target.startswith('['):
+        host, _, port = target.partition(':')
+        if port.isdigit():
+            ports = (int(port),)
+    try:
+        addresses = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError, OSError):
+        return False, "does not resolve"
+    if not addresses:
+        return False, "does not resolve"
+    family, _, _, _, sockaddr = addresses[0]
+    for port in ports:
+        try:
+            with socket.socket(family, socket.SOCK_STREAM) as sock:
+                sock.settimeout(timeout)
+                sock.connect((sockaddr[0], port) + tuple(sockaddr[2:]))
+            return True, f"port {port} open"
+        except ConnectionRefusedError:
+            return True, f"port {port} refused"
+        except OSError:
+            continue
+    return False, f"no answer on port(s) {', '.join(str(p) for p in ports)}"
+
+
+def is_connection_error(text: str) -> bool:
+    return bool(_CONNECTION_ERRORS.search(text or ''))
+
+
+def targets_host(words: List[str]) -> bool:
+    """
+    Whether the arguments hand {target} to the tool as a host or URL (not as part of a file path).
+    List-driven invocations ({shard} lists, -l/-w/-f files written by earlier jobs) never count.
+    """
+    found = False
+    for prev, word in zip([''] + words, words):
+        if '{shard}' in word or (prev in FILE_INPUT_FLAGS and '{output}' in word):
+            return False
+        if prev in FILE_INPUT_FLAGS:
+            continue
+        if word.startswith('-') and '=' in word:
+            word = word.split('=', 1)[1]
+        found = found or bool(_TARGET_HOST_RE.match(word.strip('\'"')))
+    return found
+
+
+def is_active(command: str, tools_config: Optional[Dict[str, Any]]) -> bool:
+    """Whether a command runs a non-passive tool or built-in that is given {target} as a host or URL."""
+    passive = {}  # type: Dict[str, bool]
+    for name, info in (tools_config or {}).items():
+        if isinstance(info, dict):
+            passive[name] = bool(info.get('passive'))
+            passive.setdefault(info.get('check') or name, bool(info.get('passive')))
+    for segment in _STAGE_SPLIT_RE.split(command):
+        words = segment.split()
+        if not words:
+            continue
+        name = os.path.basename(words[0])
+        if is_builtin(name):
+            contacts = not is_passive_builtin(name) and not reads_lists(name)
+        else:
+            contacts = passive.get(name) is False
+        if contacts and targets_host(words[1:]):
+            return True
+    return False
+
+
+class Liveness:
+    """Per-target reachability: pre-flight results and the circuit breaker."""
+
+    def __init__(self, preflight: bool = False, threshold: int = DEFAULT_BREAKER_THRESHOLD,
+                 cooldown: float = BREAKER_COOLDOWN):
+        self.preflight = preflight
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = {}  # type: Dict[str, int]
+        self._open = {}  # type: Dict[str, Tuple[float, str]]  target -> (opened at, reason)
+        self._probing = set()
+        self._active_cache = {}  # type: Dict[Tuple[str, int], bool]
+
+    def active(self, command: str, tools_config: Optional[Dict[str, Any]]) -> bool:
+        key = (command, id(tools_config))
+        found = self._active_cache.get(key)
+        if found is None:
+            found = self._active_cache[key] = is_active(command, tools_config)
+        return found
+
+    def check(self, targets: Iterable[str], workers: int = 32) -> List[Tuple[str, str]]:
+        """Probe targets concurrently; opens the breaker of every unreachable one. Returns [(target, detail)] of those."""
+        targets = list(dict.fromkeys(targets))
+        if not targets:
+            return []
+        with ThreadPoolExecutor(max_workers=min(workers, len(targets))) as pool:
+            results = list(pool.map(probe, targets))
+        dead = []
+        for target, (reachable, detail) in zip(targets, results):
+            if not reachable:
+                self.trip(target, f"pre-flight: {detail}")
+                dead.append((target, detail))
+        return dead
+
+    def trip(self, target: str, reason: str) -> None:
+        with self._lock:
+            self._open[target] = (time.monotonic(), reason)
+
+    def blocked(self, target: str) -> Optional[str]:
+        """Why the target's active jobs are skipped right now, or None. Re-probes it once the cooldown is over."""
+        with self._lock:
+            state = self._open.get(target)
+            if state is None:
+                return None
+            if time.monotonic() - state[0] < self.cooldown or target in self._probing:
+                return state[1]
+            self._probing.add(target)
+        try:
+            reachable, detail = probe(target)
+        finally:
+            with self._lock:
+                self._probing.discard(target)
+                if reachable:
+                    self._open.pop(target, None)
+                    self._failures.pop(target, None)
+                else:
+                    reason = state[1].split('; re-probe:')[0]
+                    self._open[target] = (time.monotonic(), f"{reason}; re-probe: {detail}")
+        return None if reachable else self._open[target][1]
+
+    def record(self, target: str, ok: bool, output: str = '') -> Optional[str]:
+        """Count the outcome of an active job; returns the reason if this failure opened the breaker."""
+        with self._lock:
+            if ok:
+                self._failures.pop(target, None)
+                return None
+            if self.threshold <= 0 or not is_connection_error(output):
+                return None
+            count = self._failures[target] = self._failures.get(target, 0) + 1
+            if count < self.threshold or target in self._open:
+                return None
+            reason = f"{count} consecutive connection failures"
+            self._open[target] = (time.monotonic(), reason)
+            return reason
+
+
+def configure(preflight: bool = False, threshold: int = DEFAULT_BREAKER_THRESHOLD) -> Optional[Liveness]:
+    """Set up the run-wide gate (None when both the pre-flight and the breaker are off)."""
+    global _active
+    _active = Liveness(preflight, threshold) if preflight or threshold > 0 else None
+    return _active
+
+
+def active() -> Optional[Liveness]:
+    return _active
@@ -0,0 +1,192 @@
+"""
+Artifact manifest for make-style incremental re-runs (--incremental).
+
+Every successful command records an entry in its target folder's `.cyfer_manifest.json`. The
+entry holds the rendered command (with the folder written as {output}), a fingerprint of the tool
+executable, and SHA-256 hashes of the files under the folder that the command reads and writes,
+plus of files outside it the command names (wordlists, fingerprint files, ...). Hashes are taken
+over the logical content, so compressing an artifact does not change them. With --incremental, a
+command is skipped when its entry matches: same command, same tool binary, byte-identical inputs,
+and outputs still present. An upstream stage producing different output changes the input hashes
+of the stages that read it, so only those re-run.
+
+Commands that read no files (`nuclei -u https://{target}`) depend on the live target only, so
+nothing tells whether their result is stale: they are skipped only with --incremental-max-age,
+while their entry is younger than that. The max age applies to every other entry as well.
+"""
+import hashlib
+import json
+import os
+import shlex
+import shutil
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from cyfer_recon import __version__
+from cyfer_recon.core import storage
+from cyfer_recon.core.builtins import is_builtin
+
+MANIFEST_NAME = '.cyfer_manifest.json'
+
+_incremental = False
+_max_age = None  # type: Optional[float]
+_lock = threading.Lock()
+_manifests = {}  # type: Dict[str, Manifest]  target folder -> manifest
+_hashes = {}  # type: Dict[Tuple[str, int, int], str]  (path, size, mtime_ns) -> sha256
+
+
+def configure(incremental: bool, max_age: Optional[float] = None) -> None:
+    """
+    Skip commands whose manifest entry is still up to date (entries are recorded either way).
+    max_age (seconds) lets entries expire; commands without input files are only skipped with it.
+    """
+    global _incremental, _max_age
+    _incremental = incremental
+    _max_age = max_age if max_age and max_age > 0 else None
+
+
+def file_hash(path: str) -> Optional[str]:
+    """SHA-256 of a file's logical (decompressed) content, or None if it does not exist."""
+    actual = storage.resolve(path)
+    if actual is None:
+        return None
+    st = os.stat(actual)
+    key = (actual, st.st_size, st.st_mtime_ns)
+    cached = _hashes.get(key)
+    if cached is not None:
+        return cached
+    digest = hashlib.sha256()
+    with storage.open_binary(path) as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    _hashes[key] = digest.hexdigest()
+    return _hashes[key]
+
+
+def tool_version(tool: str) -> str:
+    """Fingerprint of the tool: its executable's path, size and mtime, so upgrades invalidate entries."""
+    if is_builtin(tool):
+        return f"builtin:{__version__}"
+    path = shutil.which(tool)
+    if path is None:
+        return 'missing'
+    st = os.stat(path)
+    return f"{os.path.realpath(path)}:{st.st_size}:{int(st.st_mtime)}"
+
+
+def external_inputs(command: str, root: str) -> List[str]:
+    """Existing files outside root named by a command (wordlists, resolver lists, ...), as absolute paths."""
+    try:
+        words = shlex.split(command)
+    except ValueError:
+        words = command.split()
+    inside = os.path.abspath(root) + os.sep
+    found = []  # type: List[str]
+    for word in words:
+        if word.startswith('-') and '=' in word:
+            word = word.split('=', 1)[1]
+        path = os.path.abspath(os.path.expanduser(word))
+        if not path.startswith(inside) and path not in found and os.path.isfile(path):
+            found.append(path)
+    return found
+
+
+class Manifest:
+    """The manifest of one target folder."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.path = os.path.join(root, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)  # type: Dict[str, Dict[str, Any]]
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self.entries.get(key)
+
+    def put(self, key: str, entry: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            if entry is None:
+                if self.entries.pop(key, None) is None:
+                    return
+            else:
+                self.entries[key] = entry
+            os.makedirs(self.root, exist_ok=True)
+            with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, indent=1, sort_keys=True)
+            os.replace(self.path + '.tmp', self.path)
+
+
+def manifest_for(root: str) -> Manifest:
+    with _lock:
+        manifest = _manifests.get(root)
+        if manifest is None:
+            manifest = _manifests[root] = Manifest(root)
+        return manifest
+
+
+class JobRecord:
+    """A command about to run in a target folder, with the state of its inputs before it runs."""
+
+    def __init__(self, command: str, tool: str, root: str):
+        self.manifest = manifest_for(root)
+        self.key = command.replace(root, '{output}')
+        self.tool = tool
+        self.version = tool_version(tool)
+        inputs = []  # type: List[str]
+        self.outputs = []  # type: List[str]
+        for path, is_write in storage.command_paths(command, root):
+            rel = os.path.relpath(path, root)
+            if is_write:
+                self.outputs.append(rel)
+            elif rel not in inputs:
+                inputs.append(rel)
+        # Files a command appends to or rewrites are outputs, not inputs
+        self.inputs = {rel: file_hash(os.path.join(root, rel)) for rel in inputs if rel not in self.outputs}
+        for path in external_inputs(command, root):
+            self.inputs[path] = file_hash(path)
+
+    def up_to_date(self) -> bool:
+        """
+        True if the last successful run had the same command, tool, inputs and its outputs still exist.
+        Without input files, only within the configured max age.
+        """
+        entry = self.manifest.get(self.key)
+        if entry is None or not self.outputs:
+            return False
+        if _max_age is not None:
+            if time.time() - entry.get('finished', 0) > _max_age:
+                return False
+        elif not self.inputs:
+            return False
+        if entry.get('version') != self.version or entry.get('inputs') != self.inputs:
+            return False
+        return all(storage.exists(os.path.join(self.manifest.root, rel)) for rel in self.outputs)
+
+    def record(self) -> None:
+        """Store the entry after a successful run."""
+        self.manifest.put(self.key, {
+            'tool': self.tool,
+            'version': self.version,
+            'inputs': self.inputs,
+            'outputs': {rel: file_hash(os.path.join(self.manifest.root, rel)) for rel in self.outputs},
+            'finished': time.time(),
+        })
+
+    def forget(self) -> None:
+        """Drop the entry after a failed run so the command runs again next time."""
+        self.manifest.put(self.key, None)
+
+
+def prepare(command: str, tool: str, root: str) -> JobRecord:
+    return JobRecord(command, tool, root)
+
+
+def skip(record: JobRecord) -> bool:
+    """Whether --incremental lets this command be skipped."""
+    return _incremental and record.up_to_date()
@@ -0,0 +1,572 @@
+"""
+Shell-less execution of simple command pipelines.
+
+Most commands in tasks.json are plain chains such as ``cat a | uro | sort -u | httpx > b``.
+parse_pipeline() turns such a string into stages: cat, echo, tee, sort -u, anew and grep run
+in-process as streaming stages, everything else is started directly from an argv list and
+connected to its neighbours through OS pipes. Commands using anything the parser does not
+understand (loops, variables, &&, subshells, ...) are handed to the shell as before.
+"""
+import glob
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from cyfer_recon.core import storage
+from cyfer_recon.core.limits import ResourceLimits, Sandbox, limits_for_command, sandbox_for
+from cyfer_recon.core.builtins import is_builtin, run_builtin
+
+# (kind, value, is_glob) where kind is 'word' or 'op'
+Token = Tuple[str, str, bool]
+
+_ENCODING = 'utf-8'
+_ERRORS = 'surrogateescape'
+_GLOB_CHARS = '*?['
+
+
+def tokenize(cmd: str) -> Optional[List[Token]]:
+    """
+    Split a command line into words and pipeline operators using POSIX quoting rules.
+    Returns None if the command uses shell features the pipeline executor does not support.
+    """
+    tokens = []  # type: List[Token]
+    word = []  # type: List[str]
+    in_word = False
+    is_glob = False
+    quoted = False
+    i = 0
+    n = len(cmd)
+
+    def flush():
+        nonlocal word, in_word, is_glob, quoted
+        if in_word:
+            tokens.append(('word', ''.join(word), is_glob))
+        word, in_word, is_glob, quoted = [], False, False, False
+
+    while i < n:
+        c = cmd[i]
+        if c in ' \t':
+            flush()
+        elif c == "'":
+            end = cmd.find("'", i + 1)
+            if end == -1:
+                return None
+            word.append(cmd[i + 1:end])
+            in_word = quoted = True
+            i = end
+        elif c == '"':
+            i += 1
+            while i < n and cmd[i] != '"':
+                if cmd[i] in '$`':
+                    return None
+                if cmd[i] == '\\' and i + 1 < n and cmd[i + 1] in '$`"\\':
+                    i += 1
+                word.append(cmd[i])
+                i += 1
+            if i >= n:
+                return None
+            in_word = quoted = True
+        elif c == '\\':
+            if i + 1 >= n:
+                return None
+            word.append(cmd[i + 1])
+            in_word = True
+            i += 1
+        elif c in '$`;&()<\n#~':
+            if c == '#' and in_word:
+                word.append(c)
+            elif c == '~' and in_word:
+                word.append(c)
+            else:
+                return None
+        elif c == '|':
+            if cmd[i + 1:i + 2] == '|':
+                return None
+            flush()
+            tokens.append(('op', '|', False))
+        elif c == '>':
+            op = '>'
+            if in_word and not quoted and word == ['2']:
+                word, in_word = [], False
+                op = '2>'
+            flush()
+            if cmd[i + 1:i + 2] == '>':
+                op += '>'
+                i += 1
+            if cmd[i + 1:i + 2] in ('&', '|'):
+                return None
+            tokens.append(('op', op, False))
+        else:
+            if c in _GLOB_CHARS:
+                is_glob = True
+            word.append(c)
+            in_word = True
+        i += 1
+    flush()
+    return tokens
+
+
+class Stage:
+    """One command of a pipeline with its argv and redirections."""
+
+    def __init__(self, words: List[Tuple[str, bool]]):
+        self.words = words
+        self.stdout_path = None  # type: Optional[str]
+        self.stdout_append = False
+        self.stderr_path = None  # type: Optional[str]
+        self.stderr_append = False
+
+    @property
+    def argv(self) -> List[str]:
+        return [w for w, _ in self.words]
+
+    def expand(self, cwd: Optional[str] = None) -> List[str]:
+        """Return argv with glob words expanded the way sh does (sorted, literal if no match)."""
+        argv = []
+        for value, is_glob in self.words:
+            if not is_glob:
+                argv.append(value)
+                continue
+            pattern = value if os.path.isabs(value) or not cwd else os.path.join(cwd, value)
+            # Compressed artifacts match under their logical name (a.txt.gz matches *.txt)
+            found = set(glob.glob(pattern))
+            for suffix in storage.SUFFIXES.values():
+                found.update(m[:-len(suffix)] for m in glob.glob(pattern + suffix))
+            matches = sorted(found)
+            if not matches:
+                argv.append(value)
+            elif pattern is value:
+                argv.extend(matches)
+            else:
+                argv.extend(os.path.relpath(m, cwd) for m in matches)
+        return argv
+
+
+def parse_tokens(tokens: List[Token]) -> Optional[List[Stage]]:
+    """Group tokens into pipeline stages. Returns None for unsupported layouts."""
+    stages = []
+    current = []  # type: List[Tuple[str, bool]]
+    redirects = []  # type: List[Tuple[str, str]]
+    i = 0
+    while i <= len(tokens):
+        tok = tokens[i] if i < len(tokens) else ('op', '|', False)
+        kind, value, is_glob = tok
+        if kind == 'word':
+            current.append((value, is_glob))
+        elif value == '|':
+            # Empty commands and `VAR=value cmd` prefixes need a real shell
+            if not current or re.match(r'[A-Za-z_][A-Za-z0-9_]*=', current[0][0]):
+                return None
+            stage = Stage(current)
+            for op, path in redirects:
+                if op.startswith('2'):
+                    stage.stderr_path, stage.stderr_append = path, op == '2>>'
+                else:
+                    stage.stdout_path, stage.stdout_append = path, op == '>>'
+            stages.append(stage)
+            current, redirects = [], []
+        else:
+            if i + 1 >= len(tokens) or tokens[i + 1][0] != 'word' or tokens[i + 1][2]:
+                return None
+            redirects.append((value, tokens[i + 1][1]))
+            i += 1
+        i += 1
+    # Only the last stage may redirect stdout, otherwise the pipe would be starved
+    if any(s.stdout_path for s in stages[:-1]):
+        return None
+    return stages
+
+
+def parse_pipeline(cmd: str) -> Optional[List[Stage]]:
+    """Parse a command string into pipeline stages, or None if it needs a real shell."""
+    tokens = tokenize(cmd)
+    if not tokens:
+        return None
+    return parse_tokens(tokens)
+
+
+def _resolve(path: str, cwd: Optional[str]) -> str:
+    if cwd and not os.path.isabs(path):
+        return os.path.join(cwd, path)
+    return path
+
+
+def _read_lines(path: str) -> Iterator[str]:
+    with storage.open_text(path, encoding=_ENCODING, errors=_ERRORS, newline='') as f:
+        for line in f:
+            yield line
+
+
+def _with_newline(line: str) -> str:
+    return line if line.endswith('\n') else line + '\n'
+
+
+class BuiltinStage:
+    """Base class for in-process stages. run() consumes and yields text lines."""
+    name = ''
+
+    def __init__(self, args: List[str], cwd: Optional[str]):
+        self.args = args
+        self.cwd = cwd
+        self.returncode = 0
+        self.errors = []  # type: List[str]
+
+    def run(self, lines: Iterable[str]) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class CatStage(BuiltinStage):
+    name = 'cat'
+
+    def run(self, lines):
+        if not self.args:
+            yield from lines
+            return
+        for path in self.args:
+            full = _resolve(path, self.cwd)
+            if not storage.exists(full):
+                self.errors.append(f"cat: {path}: No such file or directory\n")
+                self.returncode = 1
+                continue
+            yield from _read_lines(full)
+
+
+class EchoStage(BuiltinStage):
+    name = 'echo'
+
+    def run(self, lines):
+        yield ' '.join(self.args) + '\n'
+
+
+class TeeStage(BuiltinStage):
+    name = 'tee'
+
+    def run(self, lines):
+        append = self.args[:1] == ['-a']
+        paths = self.args[1:] if append else self.args
+        handles = [storage.open_text(_resolve(p, self.cwd), 'a' if append else 'w', encoding=_ENCODING, errors=_ERRORS, newline='')
+                   for p in paths]
+        try:
+            for line in lines:
+                for h in handles:
+                    h.write(line)
+                yield line
+        finally:
+            for h in handles:
+                h.close()
+
+
+class SortUniqueStage(BuiltinStage):
+    name = 'sort'
+
+    def run(self, lines):
+        for line in sorted(set(_with_newline(l) for l in lines)):
+            yield line
+
+
+class AnewStage(BuiltinStage):
+    name = 'anew'
+
+    def run(self, lines):
+        quiet = self.args[0] == '-q'
+        path = _resolve(self.args[-1], self.cwd)
+        seen = set()
+        if storage.exists(path):
+            seen.update(l.rstrip('\r\n') for l in _read_lines(path))
+        with storage.open_text(path, 'a', encoding=_ENCODING, errors=_ERRORS, newline='') as out:
+            for line in lines:
+                key = line.rstrip('\r\n')
+                if key in seen:
+                    continue
+                seen.add(key)
+                out.write(key + '\n')
+                if not quiet:
+                    yield key + '\n'
+
+
+_BRE_SPECIAL = '(){}|+?'
+
+
+def _bre_to_python(pattern: str) -> str:
+    """Translate a POSIX basic regex into Python syntax (\\( is a group, ( is literal)."""
+    out = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\' and i + 1 < len(pattern):
+            nxt = pattern[i + 1]
+            out.append(nxt if nxt in _BRE_SPECIAL else c + nxt)
+            i += 2
+            continue
+        out.append('\\' + c if c in _BRE_SPECIAL else c)
+        i += 1
+    return ''.join(out)
+
+
+class GrepStage(BuiltinStage):
+    name = 'grep'
+
+    def __init__(self, args, cwd):
+        super().__init__(args, cwd)
+        flags = set(''.join(a[1:] for a in args[:-1]))
+        pattern = args[-1]
+        if 'F' in flags:
+            pattern = re.escape(pattern)
+        elif 'E' not in flags:
+            pattern = _bre_to_python(pattern)
+        self.invert = 'v' in flags
+        self.regex = re.compile(pattern, re.IGNORECASE if 'i' in flags else 0)
+
+    def run(self, lines):
+        matched = False
+        search = self.regex.search
+        for line in lines:
+            if bool(search(line.rstrip('\r\n'))) != self.invert:
+                matched = True
+                yield _with_newline(line)
+        self.returncode = 0 if matched else 1
+
+
+def _builtin_for(argv: List[str], cwd: Optional[str]) -> Optional[BuiltinStage]:
+    """Return an in-process replacement for argv, or None if it must run as a real process."""
+    name, args = argv[0], argv[1:]
+    if name == 'cat' and not any(a.startswith('-') and a != '-' for a in args):
+        return CatStage([a for a in args if a != '-'], cwd)
+    if name == 'echo' and not (args and args[0].startswith('-')):
+        return EchoStage(args, cwd)
+    if name == 'tee' and not any(a.startswith('-') for a in (args[1:] if args[:1] == ['-a'] else args)):
+        return TeeStage(args, cwd)
+    if name == 'sort' and args == ['-u']:
+        return SortUniqueStage(args, cwd)
+    if name == 'anew' and args and args[-1] != '-q' and all(a == '-q' for a in args[:-1]) and len(args) <= 2:
+        return AnewStage(args, cwd)
+    if name == 'grep' and args and not args[-1].startswith('-') and '[[:' not in args[-1]:
+        opts = args[:-1]
+        if all(re.fullmatch(r'-[viEF]+', o) for o in opts):
+            try:
+                return GrepStage(args, cwd)
+            except re.error:
+                return None
+    return None
+
+
+def _compressed_sink(path: str, append: bool) -> bool:
+    """True if a redirect to path must go through storage (compression on, or appending to a compressed file)."""
+    if storage.enabled() and storage.is_compressible(path) and not (append and os.path.isfile(path)):
+        return True
+    return append and storage.resolve(path) not in (None, path)
+
+
+def _feed(lines: Iterable[str], pipe: Any) -> None:
+    """Write lines into a child's stdin; keep draining after the reader went away."""
+    broken = False
+    for line in lines:
+        if broken:
+            continue
+        try:
+            pipe.write(line.encode(_ENCODING, _ERRORS))
+        except (BrokenPipeError, OSError):
+            broken = True
+    try:
+        pipe.close()
+    except (BrokenPipeError, OSError):
+        pass
+
+
+def _iter_pipe(pipe: Any) -> Iterator[str]:
+    for raw in pipe:
+        yield raw.decode(_ENCODING, _ERRORS)
+
+
+def run_pipeline(stages: List[Stage], cmd: str = '', cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None,
+                 limits: Optional[Dict[str, ResourceLimits]] = None) -> subprocess.CompletedProcess:
+    """
+    Run parsed stages and return a CompletedProcess like subprocess.run(..., capture_output=True, text=True).
+    The return code is that of the last stage, as with sh.
+    Stages whose program has configured limits run sandboxed; the result's limit_exceeded
+    names the tool and limit when one of them was killed for it (None otherwise).
+    """
+    procs = []  # type: List[subprocess.Popen]
+    sandboxes = []  # type: List[Tuple[subprocess.Popen, Sandbox]]
+    threads = []  # type: List[threading.Thread]
+    builtins = []  # type: List[BuiltinStage]
+    opened = []  # type: List[Any]
+    stderr_buf = tempfile.TemporaryFile()
+    upstream = None  # type: Optional[Tuple[str, Any]]
+    last = None  # type: Any
+    sink = None  # type: Any
+    try:
+        for idx, stage in enumerate(stages):
+            is_last = idx == len(stages) - 1
+            argv = stage.expand(cwd)
+            builtin = _builtin_for(argv, cwd)
+            if builtin is not None:
+                # A lone `cat file` feeding a real process becomes that process' stdin
+                nxt_external = not is_last and _builtin_for(stages[idx + 1].expand(cwd), cwd) is None
+                if isinstance(builtin, CatStage) and upstream is None and nxt_external and len(builtin.args) == 1 \
+                        and os.path.isfile(_resolve(builtin.args[0], cwd)):
+                    fh = open(_resolve(builtin.args[0], cwd), 'rb')
+                    opened.append(fh)
+                    upstream = ('file', fh)
+                    last = builtin
+                    continue
+                if upstream is None:
+                    source = iter(())  # type: Iterable[str]
+                elif upstream[0] == 'iter':
+                    source = upstream[1]
+                else:
+                    source = _iter_pipe(upstream[1].stdout if upstream[0] == 'proc' else upstream[1])
+                builtins.append(builtin)
+                upstream = ('iter', builtin.run(source))
+                last = builtin
+                continue
+
+            if upstream is None:
+                stdin = None
+            elif upstream[0] == 'proc':
+                stdin = upstream[1].stdout
+            elif upstream[0] == 'file':
+                stdin = upstream[1]
+            else:
+                stdin = subprocess.PIPE
+            if is_last and stage.stdout_path and _compressed_sink(_resolve(stage.stdout_path, cwd), stage.stdout_append):
+                # Output is compressed on the fly, so it has to pass through this process
+                sink = storage.open_binary(_resolve(stage.stdout_path, cwd), 'ab' if stage.stdout_append else 'wb')
+                stdout = subprocess.PIPE
+            elif is_last and stage.stdout_path:
+                stdout = open(_resolve(stage.stdout_path, cwd), 'ab' if stage.stdout_append else 'wb')
+                opened.append(stdout)
+            else:
+                stdout = subprocess.PIPE
+            if stage.stderr_path == '/dev/null':
+                stderr = subprocess.DEVNULL
+            elif stage.stderr_path:
+                stderr = open(_resolve(stage.stderr_path, cwd), 'ab' if stage.stderr_append else 'wb')
+                opened.append(stderr)
+            else:
+                stderr = stderr_buf
+            sandbox = sandbox_for(argv, limits)
+            if sandbox is None:
+                proc = subprocess.Popen(argv, stdin=stdin, stdout=stdout, stderr=stderr, cwd=cwd, env=env)
+            else:
+                try:
+                    proc = subprocess.Popen(sandbox.argv(argv), stdin=stdin, stdout=stdout, stderr=stderr, cwd=cwd,
+                                            env=env, **sandbox.popen_kwargs())
+                except BaseException:
+                    sandbox.close()
+                    raise
+                sandboxes.append((proc, sandbox))
+            procs.append(proc)
+            if upstream is not None and upstream[0] == 'proc':
+                # Let the upstream process receive SIGPIPE if this one exits early
+                upstream[1].stdout.close()
+            elif upstream is not None and upstream[0] == 'iter':
+                t = threading.Thread(target=_feed, args=(upstream[1], proc.stdin), daemon=True)
+                t.start()
+                threads.append(t)
+            upstream = ('proc', proc)
+            last = proc
+
+        stdout_text = ''
+        tail = stages[-1]
+        if upstream[0] == 'iter':
+            if tail.stdout_path:
+                mode = 'a' if tail.stdout_append else 'w'
+                with storage.open_text(_resolve(tail.stdout_path, cwd), mode, encoding=_ENCODING, errors=_ERRORS, newline='') as out:
+                    for line in upstream[1]:
+                        out.write(line)
+            else:
+                stdout_text = ''.join(upstream[1])
+        elif upstream[0] == 'proc' and sink is not None:
+            shutil.copyfileobj(upstream[1].stdout, sink, 64 * 1024)
+            upstream[1].stdout.close()
+        elif upstream[0] == 'proc' and upstream[1].stdout is not None:
+            stdout_text = upstream[1].stdout.read().decode(_ENCODING, 'replace')
+            upstream[1].stdout.close()
+        elif upstream[0] == 'file':
+            stdout_text = upstream[1].read().decode(_ENCODING, 'replace')
+        for proc in procs:
+            proc.wait()
+        for t in threads:
+            t.join()
+    except BaseException:
+        for proc in procs:
+            if proc.poll() is None:
+                proc.kill()
+        raise
+    finally:
+        for fh in opened:
+            fh.close()
+        if sink is not None:
+            sink.close()
+        for _, sandbox in sandboxes:
+            sandbox.close()
+
+    stderr_buf.seek(0)
+    stderr_text = stderr_buf.read().decode(_ENCODING, 'replace')
+    stderr_buf.close()
+    stderr_text += ''.join(e for b in builtins for e in b.errors)
+    returncode = last.returncode
+    result = subprocess.CompletedProcess(cmd or [s.argv for s in stages], returncode, stdout_text, stderr_text)
+    result.limit_exceeded = None
+    for proc, sandbox in sandboxes:
+        verdict = sandbox.verdict(proc.returncode, stderr_text)
+        if verdict:
+            result.limit_exceeded = f"{sandbox.tool}: {verdict}"
+            break
+    return result
+
+
+def run_command(cmd: str, cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None,
+                stages: Optional[List[Stage]] = None, limits: Optional[Dict[str, ResourceLimits]] = None) -> subprocess.CompletedProcess:
+    """
+    Run a command string, without a shell when the pipeline parser supports it.
+    Built-in stages (see builtins.py) are dispatched in-process.
+    Falls back to `/bin/sh -c` for anything else. Output is captured as text either way.
+    Already parsed stages (e.g. from a rendered template) can be passed to skip parsing cmd.
+    limits maps tool names to resource limits (see limits.py); a shell command gets the limits
+    of the first limited tool it runs. Built-in stages run in-process and are not limited.
+    """
+    if stages is None:
+        stages = parse_pipeline(cmd)
+    if stages is None:
+        return _run_shell(cmd, cwd, env, limits)
+    if any(is_builtin(s.argv[0]) for s in stages):
+        return _run_builtin_stage(stages, cmd, cwd)
+    return run_pipeline(stages, cmd, cwd=cwd, env=env, limits=limits)
+
+
+def _run_shell(cmd: str, cwd: Optional[str], env: Optional[Dict[str, str]],
+               limits: Optional[Dict[str, ResourceLimits]]) -> subprocess.CompletedProcess:
+    matched = limits_for_command(cmd, limits) if limits else None
+    if matched is None:
+        return subprocess.run(cmd, shell=True, capture_output=True, text=True, cwd=cwd, env=env)
+    sandbox = Sandbox(*matched)
+    try:
+        result = subprocess.run(sandbox.argv(['/bin/sh', '-c', cmd]), capture_output=True, text=True, cwd=cwd, env=env,
+                                **sandbox.popen_kwargs())
+        verdict = sandbox.verdict(result.returncode, result.stderr)
+    finally:
+        sandbox.close()
+    result.args = cmd
+    result.limit_exceeded = f"{sandbox.tool}: {verdict}" if verdict else None
+    return result
+
+
+def _run_builtin_stage(stages: List[Stage], cmd: str, cwd: Optional[str]) -> subprocess.CompletedProcess:
+    """Built-in stages (cyfer-*) run in-process and must be the whole command."""
+    if len(stages) > 1:
+        return subprocess.CompletedProcess(cmd, 2, '', f"{stages[0].argv[0]}: built-in stages cannot be part of a pipeline\n")
+    stage = stages[0]
+    result = run_builtin(stage.expand(cwd), cwd=cwd)
+    if stage.stdout_path:
+        mode = 'a' if stage.stdout_append else 'w'
+        with storage.open_text(_resolve(stage.stdout_path, cwd), mode, encoding=_ENCODING, errors=_ERRORS) as out:
+            out.write(result.stdout)
+        result.stdout = ''
+    result.args = cmd
+    return result
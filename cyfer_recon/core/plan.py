@@ -0,0 +1,316 @@
+"""
+Dry-run plans: every job a run would start, with its dependencies and estimated cost.
+
+A plan renders every job for every target exactly as run_tasks would. It uses the same
+compiled and coalesced templates and the same concurrent and sequential passes. Each job
+records the files it reads and writes under the target folder. A job depends on an earlier
+job that writes a file it reads.
+
+Durations come from the recorded history (see history.py), or DEFAULT_ESTIMATE for jobs
+never seen before. The projected schedule replays the scheduler's dispatch rule on a
+simulated clock, for a given number of workers. The critical path is the longest chain of
+jobs that have to finish one after another. That chain is made of data dependencies plus
+the ordering the runner imposes: a target's sequential jobs start after its concurrent jobs,
+and sequential jobs run one at a time.
+"""
+import fnmatch
+import heapq
+import json
+import os
+import re
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from cyfer_recon import __version__
+from cyfer_recon.core import history, manifest, storage
+from cyfer_recon.core.builtins import is_builtin
+from cyfer_recon.core.templates import CommandTemplate
+from cyfer_recon.core.utils import TemplateError
+
+Plan = List[Tuple[str, List[CommandTemplate], bool]]
+
+# Scanners with at least this memory limit in tools.json count as memory-heavy
+MEMORY_HEAVY_MB = 2048
+_STAGE_SPLIT_RE = re.compile(r'\|\||&&|[|;&]')
+
+
+class PlannedJob:
+    """One rendered command of a plan."""
+    __slots__ = ('id', 'target', 'task', 'tool', 'command', 'concurrent', 'resource_class', 'estimate',
+                 'estimate_source', 'reads', 'writes', 'depends_on', 'start', 'end', 'up_to_date', 'error')
+
+    def __init__(self, job_id: int, target: str, task: str, tool: str, concurrent: bool):
+        self.id = job_id
+        self.target = target
+        self.task = task
+        self.tool = tool
+        self.concurrent = concurrent
+        self.command = ''
+        self.resource_class = 'local'
+        self.estimate = 0.0
+        self.estimate_source = 'default'
+        self.reads = []  # type: List[str]
+        self.writes = []  # type: List[str]
+        self.depends_on = []  # type: List[int]
+        self.start = 0.0
+        self.end = 0.0
+        self.up_to_date = False
+        self.error = None  # type: Optional[str]
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            'id': self.id,
+            'target': self.target,
+            'task': self.task,
+            'tool': self.tool,
+            'command': self.command,
+            'mode': 'concurrent' if self.concurrent else 'sequential',
+            'resource_class': self.resource_class,
+            'estimate_seconds': round(self.estimate, 1),
+            'estimate_source': self.estimate_source,
+            'depends_on': self.depends_on,
+            'start': round(self.start, 1),
+            'end': round(self.end, 1),
+        }
+        if self.up_to_date:
+            data['up_to_date'] = True
+        if self.error:
+            data['error'] = self.error
+        return data
+
+
+def resource_class(command: str, tools_config: Optional[Dict[str, Any]]) -> str:
+    """
+    "memory" for scanners with a large memory limit, "network" for scanners from tools.json and
+    built-ins, "local" for commands made only of local utilities (cat, sort, grep, ...).
+    """
+    checks = {}  # type: Dict[str, Dict[str, Any]]
+    for name, info in (tools_config or {}).items():
+        if isinstance(info, dict):
+            checks[name] = info
+            checks.setdefault(info.get('check') or name, info)
+    found = 'local'
+    for segment in _STAGE_SPLIT_RE.split(command):
+        words = segment.split()
+        if not words:
+            continue
+        name = os.path.basename(words[0])
+        if is_builtin(name):
+            found = 'network'
+        elif name in checks:
+            if (checks[name].get('limits') or {}).get('memory_mb', 0) >= MEMORY_HEAVY_MB:
+                return 'memory'
+            found = 'network'
+    return found
+
+
+def _reads_from(read: str, write: str) -> bool:
+    """Whether reading `read` (a file, directory or glob) sees what was written to `write`."""
+    if read == write or fnmatch.fnmatchcase(write, read):
+        return True
+    return write.startswith(read.rstrip('/') + '/') or read.startswith(write.rstrip('/') + '/')
+
+
+class _Estimator:
+    def __init__(self):
+        self.history = history.active() or history.DurationHistory()
+
+    def __call__(self, tool: str, task: str, target: str, output_dir: str) -> Tuple[float, str]:
+        seconds = self.history.estimate(tool, task, history.target_features(target, output_dir), default=None)
+        if seconds is None:
+            return history.DEFAULT_ESTIMATE, 'default'
+        return seconds, 'history'
+
+
+def _simulate(jobs: List[PlannedJob], workers: int) -> float:
+    """Replay run_tasks' dispatch of all jobs on a simulated clock; returns the time the run ends."""
+    from cyfer_recon.core.task_runner import SCHEDULER_LOOKAHEAD, pick_group
+    pending = iter(jobs)
+    window = {}  # type: Dict[Tuple[str, str], deque]
+    window_size = 0
+    lookahead = workers * SCHEDULER_LOOKAHEAD
+    reserve = max(1, workers // 4)
+    unfinished = {}  # type: Dict[str, int]  target -> its concurrent jobs read but not finished
+    held = {}  # type: Dict[str, deque]  target -> its sequential jobs, waiting for its concurrent ones
+    ready = deque()  # type: deque
+    chained = False
+    running = []  # type: List[Tuple[float, int, float]]  heap of (end, job id, estimate)
+    clock = 0.0
+    exhausted = False
+
+    def start(job: PlannedJob) -> None:
+        job.start, job.end = clock, clock + job.estimate
+        heapq.heappush(running, (job.end, job.id, job.estimate))
+
+    while True:
+        while not exhausted and window_size < lookahead:
+            job = next(pending, None)
+            if job is None:
+                exhausted = True
+                break
+            if job.concurrent:
+                window.setdefault((job.target, job.task), deque()).append((job.estimate, job))
+                unfinished[job.target] = unfinished.get(job.target, 0) + 1
+            else:
+                held.setdefault(job.target, deque()).append(job)
+            window_size += 1
+        for target in [t for t in held if t not in unfinished]:
+            ready.extend(held.pop(target))
+        if ready and not chained and len(running) < workers:
+            window_size -= 1
+            chained = True
+            start(ready.popleft())
+        while window and len(running) < workers:
+            key = pick_group(window, [est for _, _, est in running], workers, reserve)
+            _, job = window[key].popleft()
+            if not window[key]:
+                del window[key]
+            window_size -= 1
+            start(job)
+        if not running:
+            return clock
+        clock = running[0][0]
+        while running and running[0][0] == clock:
+            job = jobs[heapq.heappop(running)[1]]
+            if not job.concurrent:
+                chained = False
+            else:
+                unfinished[job.target] -= 1
+                if not unfinished[job.target]:
+                    del unfinished[job.target]
+
+
+def build(targets: Iterable[Tuple[str, str]], plan: Plan, workers: int, wordlists: Optional[dict] = None,
+          tools_config: Optional[Dict[str, Any]] = None, incremental: bool = False) -> Dict[str, Any]:
+    """
+    Explain a run. targets lists (target, output_dir) in the order run_tasks reads them.
+    With incremental, jobs --incremental would skip cost nothing.
+    """
+    estimate = _Estimator()
+    jobs = []  # type: List[PlannedJob]
+    warnings = []  # type: List[str]
+    for target, output_dir in targets:
+        target_jobs = []  # type: List[PlannedJob]
+        # run_tasks reads a target's concurrent jobs first, then its sequential ones
+        for concurrent_pass in (True, False):
+            for task, templates, task_concurrent in plan:
+                if task_concurrent != concurrent_pass:
+                    continue
+                for template in templates:
+                    job = PlannedJob(len(jobs), target, task, template.tool, task_concurrent)
+                    _render(job, template, output_dir, wordlists, tools_config, incremental)
+                    if job.error is None and not job.up_to_date:
+                        job.estimate, job.estimate_source = estimate(template.tool, task, target, output_dir)
+                    jobs.append(job)
+                    target_jobs.append(job)
+        _link(target_jobs, jobs, warnings)
+    clock = _simulate(jobs, workers)
+    path, length = critical_path(jobs)
+    total = sum(j.estimate for j in jobs)
+    by_tool = {}  # type: Dict[str, List[float]]
+    by_class = {}  # type: Dict[str, List[float]]
+    for job in jobs:
+        by_tool.setdefault(job.tool, [0, 0.0])
+        by_tool[job.tool][0] += 1
+        by_tool[job.tool][1] += job.estimate
+        by_class.setdefault(job.resource_class, [0, 0.0])
+        by_class[job.resource_class][0] += 1
+        by_class[job.resource_class][1] += job.estimate
+    return {
+        'version': __version__,
+        'generated': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'workers': workers,
+        'job_count': len(jobs),
+        'total_work_seconds': round(total, 1),
+        'makespan_seconds': round(clock, 1),
+        'utilization': round(total / (clock * workers), 3) if clock else 0.0,
+        'critical_path': {'seconds': round(length, 1), 'jobs': path},
+        'by_tool': [{'tool': t, 'jobs': n, 'seconds': round(s, 1)}
+                    for t, (n, s) in sorted(by_tool.items(), key=lambda kv: -kv[1][1])],
+        'by_resource_class': {c: {'jobs': n, 'seconds': round(s, 1)} for c, (n, s) in sorted(by_class.items())},
+        'warnings': warnings,
+        'jobs': [j.to_dict() for j in jobs],
+    }
+
+
+def _render(job: PlannedJob, template: CommandTemplate, output_dir: str, wordlists: Optional[dict],
+            tools_config: Optional[Dict[str, Any]], incremental: bool) -> None:
+    try:
+        rendered = template.render(target=job.target, output=output_dir,
+                                   wordlist=(wordlists or {}).get(template.tool) or '')
+    except TemplateError as e:
+        job.command, job.error = template.source, str(e)
+        return
+    job.command = rendered.command
+    job.resource_class = resource_class(rendered.command, tools_config)
+    for path, is_write in storage.command_paths(rendered.command, output_dir):
+        (job.writes if is_write else job.reads).append(path)
+    if incremental and job.writes:
+        job.up_to_date = manifest.prepare(rendered.command, template.tool, output_dir).up_to_date()
+
+
+def _link(target_jobs: List[PlannedJob], jobs: List[PlannedJob], warnings: List[str]) -> None:
+    """Fill depends_on from reads and writes of one target's jobs, and warn about inputs the runner may read too early."""
+    written = []  # type: List[int]  ids of earlier jobs writing in the target's folder
+    for job in target_jobs:
+        deps = []
+        for earlier in written:
+            source = jobs[earlier]
+            if any(_reads_from(r, w) for r in job.reads for w in source.writes):
+                deps.append(earlier)
+                # The concurrent pass only orders when jobs start, not when they finish
+                message = (f"{job.target}: {job.tool} ({job.task}) may start before {source.tool} "
+                           f"({source.task}) has finished writing its input")
+                if job.concurrent and source.concurrent and message not in warnings:
+                    warnings.append(message)
+        job.depends_on = deps
+        if job.writes:
+            written.append(job.id)
+
+
+def critical_path(jobs: List[PlannedJob]) -> Tuple[List[int], float]:
+    """
+    The longest chain (job ids, seconds) through data dependencies, the start of a target's sequential
+    jobs after its concurrent ones, and the one-at-a-time order sequential jobs ran in the simulated
+    schedule (see _simulate, which must have run first).
+    """
+    finish = {}  # type: Dict[int, float]
+    via = {}  # type: Dict[int, Optional[int]]
+    concurrent_end = {}  # type: Dict[str, Tuple[float, Optional[int]]]  target -> (finish, job) of its last concurrent job
+    sequential = sorted((j for j in jobs if not j.concurrent), key=lambda j: (j.start, j.id))
+    previous = (0.0, None)  # type: Tuple[float, Optional[int]]  (finish, job) of the sequential job that ran before
+    # Concurrent jobs only wait on earlier jobs of their target; sequential ones also on the chain before them
+    for job in [j for j in jobs if j.concurrent] + sequential:
+        candidates = [(finish[d], d) for d in job.depends_on]
+        candidates.append((0.0, None))
+        if not job.concurrent:
+            candidates += [concurrent_end.get(job.target, (0.0, None)), previous]
+        start, parent = max(candidates, key=lambda c: c[0])
+        finish[job.id] = start + job.estimate
+        via[job.id] = parent
+        if job.concurrent:
+            if finish[job.id] > concurrent_end.get(job.target, (0.0, None))[0]:
+                concurrent_end[job.target] = (finish[job.id], job.id)
+        else:
+            previous = (finish[job.id], job.id)
+    if not finish:
+        return [], 0.0
+    end = max(finish, key=lambda j: finish[j])
+    path = []
+    node = end  # type: Optional[int]
+    while node is not None:
+        path.append(node)
+        node = via[node]
+    return path[::-1], finish[end]
+
+
+def write(plan_data: Dict[str, Any], path: str) -> None:
+    """Write the plan as JSON ('-' writes to stdout)."""
+    text = json.dumps(plan_data, indent=2)
+    if path == '-':
+        print(text)
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text + '\n')
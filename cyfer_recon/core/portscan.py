@@ -0,0 +1,86 @@
+"""
+Result-driven port scanning: a fast rustscan sweep finds open ports, then `nmap -sC -sV`
+only looks at those ports, one nmap process per host in parallel.
+"""
+import os
+import re
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set
+
+from cyfer_recon.core import storage
+
+_RUSTSCAN_GREPPABLE = re.compile(r'^\s*(\S+)\s*->\s*\[([\d,\s]*)\]')
+_RUSTSCAN_OPEN = re.compile(r'^Open\s+(\S+):(\d+)')
+_NMAP_GREPPABLE = re.compile(r'^Host:\s+(\S+).*?\tPorts:\s+(.*)$')
+
+
+def parse_open_ports(path: str) -> Dict[str, Set[int]]:
+    """
+    Collect open ports per host from rustscan greppable output (`host -> [80,443]`),
+    rustscan's `Open host:port` lines or nmap -oG output.
+    """
+    found = {}  # type: Dict[str, Set[int]]
+    if not storage.exists(path):
+        return found
+    with storage.open_text(path) as f:
+        for line in f:
+            m = _RUSTSCAN_GREPPABLE.match(line)
+            if m:
+                ports = {int(p) for p in m.group(2).replace(' ', '').split(',') if p}
+                found.setdefault(m.group(1), set()).update(ports)
+                continue
+            m = _RUSTSCAN_OPEN.match(line)
+            if m:
+                found.setdefault(m.group(1), set()).add(int(m.group(2)))
+                continue
+            m = _NMAP_GREPPABLE.match(line.rstrip('\n'))
+            if m:
+                for entry in m.group(2).split(','):
+                    fields = entry.strip().split('/')
+                    if len(fields) > 1 and fields[1] == 'open':
+                        found.setdefault(m.group(1), set()).add(int(fields[0]))
+    return found
+
+
+def run_rustscan(target: str, output_file: str, ulimit: int = 5000, extra_args: Optional[List[str]] = None) -> subprocess.CompletedProcess:
+    """Run rustscan in greppable mode (no nmap stage) and save its output."""
+    argv = ['rustscan', '-a', target, '--ulimit', str(ulimit), '-g'] + (extra_args or [])
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    with open(output_file, 'wb') as out:
+        return subprocess.run(argv, stdout=out, stderr=subprocess.PIPE)
+
+
+def run_targeted_nmap(open_ports: Dict[str, Set[int]], output_file: str, workers: int = 4,
+                      nmap_args: Optional[List[str]] = None) -> List[str]:
+    """
+    Run `nmap -sC -sV -p <open ports>` per host in parallel and merge the normal output of all
+    hosts into output_file. Returns the hosts whose nmap run failed.
+    """
+    nmap_args = nmap_args if nmap_args is not None else ['-Pn', '-n', '-T4', '--open']
+    hosts = sorted(h for h, ports in open_ports.items() if ports)
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    failed = []
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(output_file) or None) as tmp:
+        def scan(idx: int) -> int:
+            host = hosts[idx]
+            ports = ','.join(str(p) for p in sorted(open_ports[host]))
+            argv = ['nmap', '-sC', '-sV'] + nmap_args + ['-p', ports, '-oN', os.path.join(tmp, f"{idx}.txt"), host]
+            return subprocess.run(argv, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE).returncode
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            codes = list(executor.map(scan, range(len(hosts))))
+        with open(output_file, 'w', encoding='utf-8') as out:
+            if not hosts:
+                out.write("# No open ports found by rustscan\n")
+            for idx, (host, code) in enumerate(zip(hosts, codes)):
+                part = os.path.join(tmp, f"{idx}.txt")
+                out.write(f"# ===== {host} =====\n")
+                if code != 0:
+                    failed.append(host)
+                if os.path.isfile(part):
+                    with open(part, 'r', encoding='utf-8', errors='replace') as f:
+                        out.write(f.read())
+                out.write("\n")
+    return failed
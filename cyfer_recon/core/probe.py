@@ -0,0 +1,466 @@
+"""
+Built-in HTTP prober (cyfer-probe): one asyncio engine shared by every task of a run.
+
+Replaces the separate httpx processes of the live check and the JavaScript analysis, security
+headers and API recon tasks. All requests of a run go through one event loop thread:
+
+- Connections are pooled per (scheme, host, port) and kept alive (HTTP/1.1).
+- At most PER_HOST_LIMIT requests per host are in flight.
+- New TLS connections to a host already seen resume its last TLS session.
+
+Each URL is fetched once per run (per RESULT_TTL). Status, title, server, content type and length,
+redirect location and security headers all come from that single response. Each task writes the
+view it needs (--format), and concurrent tasks asking for the same URL share one request. Bare
+hosts are tried over https, then http. Redirects are reported, not followed, as with httpx.
+
+Technology hints (see fingerprint.py) are only computed for the views showing them (tech, json),
+on a few matching threads of the engine's own, and cached apart from the base results. A URL first
+probed without them is fetched once more when a later task asks for them.
+"""
+import asyncio
+import html
+import json
+import os
+import queue
+import re
+import ssl
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from cyfer_recon.core import storage
+from cyfer_recon.core.http_client import DEFAULT_USER_AGENT
+
+DEFAULT_CONCURRENCY = 50
+PER_HOST_LIMIT = 4
+DEFAULT_TIMEOUT = 10.0
+# Bytes of a body that are read; larger responses are cut and their connection is not reused
+MAX_BODY = 512 * 1024
+MAX_HEADERS = 64 * 1024
+# Idle keep-alive connections older than this are not reused
+IDLE_SECONDS = 30.0
+RESULT_TTL = 600.0
+# Threads fingerprinting responses, apart from the loop's default executor (used for getaddrinfo)
+MATCH_THREADS = 2
+SECURITY_HEADERS = ('strict-transport-security', 'content-security-policy', 'x-frame-options',
+                    'x-content-type-options', 'referrer-policy', 'permissions-policy')
+FORMATS = ('urls', 'live', 'headers', 'tech', 'json')
+TECH_FORMATS = ('tech', 'json')
+
+_TITLE_RE = re.compile(rb'<title[^>]*>(.*?)</title', re.I | re.S)
+
+_lock = threading.Lock()
+_loop = None  # type: Optional[asyncio.AbstractEventLoop]
+_engine = None  # type: Optional[Prober]
+
+
+class ProbeResult:
+    """What one response told about a URL (error is set instead when nothing answered)."""
+
+    def __init__(self, url: str, status: Optional[int] = None, error: Optional[str] = None):
+        self.url = url
+        self.status = status
+        self.error = error
+        self.title = ''
+        self.server = ''
+        self.content_type = ''
+        self.content_length = 0
+        self.location = ''
+        self.security = {}  # type: Dict[str, str]
+        self.tech = []  # type: List[str]
+
+    def with_tech(self, tech: List[str]) -> 'ProbeResult':
+        """A copy of this result carrying the given technology hints."""
+        result = ProbeResult(self.url, self.status, self.error)
+        result.__dict__.update(self.__dict__, tech=list(tech))
+        return result
+
+    def missing_security(self) -> List[str]:
+        return [h for h in SECURITY_HEADERS if h not in self.security]
+
+    def to_dict(self) -> Dict[str, Any]:
+        if self.error is not None:
+            return {'url': self.url, 'error': self.error}
+        return {'url': self.url, 'status': self.status, 'title': self.title, 'server': self.server,
+                'content_type': self.content_type, 'content_length': self.content_length, 'location': self.location or None,
+                'security_headers': self.security, 'missing_security_headers': self.missing_security(), 'tech': self.tech}
+
+    def format(self, fmt: str) -> str:
+        """The result as a line of the given FORMATS view, httpx style for the text ones."""
+        if fmt == 'json':
+            return json.dumps(self.to_dict())
+        if fmt == 'urls':
+            return self.url
+        line = f"{self.url} [{self.status}]"
+        if fmt == 'headers':
+            missing = self.missing_security()
+            line += f" [{self.title}] [{self.server}] [missing: {','.join(missing) if missing else 'none'}]"
+        elif fmt == 'tech':
+            line += f" [{self.title}] [{','.join(self.tech)}]"
+        return line
+
+
+class _SessionContext(ssl.SSLContext):
+    """Client context that resumes the last TLS session of the same host on new connections."""
+
+    def wrap_bio(self, incoming, outgoing, server_side=False, server_hostname=None, session=None):
+        if session is None and server_hostname:
+            session = self.sessions.get(server_hostname)
+        return super().wrap_bio(incoming, outgoing, server_side, server_hostname, session)
+
+
+def _ssl_context() -> _SessionContext:
+    ctx = _SessionContext(ssl.PROTOCOL_TLS_CLIENT)
+    ctx.check_hostname = False
+    ctx.verify_mode = ssl.CERT_NONE  # recon targets often have broken chains
+    ctx.set_alpn_protocols(['http/1.1'])
+    ctx.sessions = {}
+    return ctx
+
+
+class _Connection:
+    __slots__ = ('reader', 'writer', 'idle_since')
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.idle_since = time.monotonic()
+
+    def close(self) -> None:
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+
+
+def _split(url: str) -> Tuple[str, str, int, str]:
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in ('http', 'https') or not parts.hostname:
+        raise ValueError(f"unsupported URL: {url}")
+    port = parts.port or (443 if scheme == 'https' else 80)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    return scheme, parts.hostname, port, path
+
+
+def _decode(body: bytes, encoding: str) -> bytes:
+    if encoding in ('gzip', 'x-gzip', 'deflate'):
+        try:
+            return zlib.decompressobj(32 + zlib.MAX_WBITS if encoding != 'deflate' else zlib.MAX_WBITS).decompress(body, MAX_BODY)
+        except zlib.error:
+            try:
+                return zlib.decompressobj(-zlib.MAX_WBITS).decompress(body, MAX_BODY)
+            except zlib.error:
+                return body
+    return body
+
+
+class Prober:
+    """Connection pools, per-host limits, TLS sessions and results of a run; used on the engine's loop only."""
+
+    def __init__(self):
+        self.ssl = _ssl_context()
+        self.idle = {}  # type: Dict[Tuple[str, str, int], List[_Connection]]
+        self.limits = {}  # type: Dict[Tuple[str, str, int, int], asyncio.Semaphore]
+        self.results = {}  # type: Dict[str, Tuple[float, ProbeResult]]
+        self.techs = {}  # type: Dict[str, List[str]]  url -> hints for its cached result
+        self.inflight = {}  # type: Dict[Tuple[str, bool], asyncio.Future]
+        self.matchers = ThreadPoolExecutor(max_workers=MATCH_THREADS, thread_name_prefix='cyfer-probe-match')
+        self.stats = {'requests': 0, 'connections': 0, 'reused': 0, 'tls_resumed': 0, 'cached': 0}
+
+    async def _connect(self, scheme: str, host: str, port: int) -> _Connection:
+        tls = self.ssl if scheme == 'https' else None
+        reader, writer = await asyncio.open_connection(host, port, ssl=tls, server_hostname=host if tls else None,
+                                                       limit=MAX_HEADERS)
+        self.stats['connections'] += 1
+        ssl_object = writer.get_extra_info('ssl_object')
+        if ssl_object is not None and ssl_object.session_reused:
+            self.stats['tls_resumed'] += 1
+        return _Connection(reader, writer)
+
+    def _take(self, key: Tuple[str, str, int]) -> Optional[_Connection]:
+        idle = self.idle.get(key)
+        while idle:
+            conn = idle.pop()
+            if time.monotonic() - conn.idle_since < IDLE_SECONDS and not conn.reader.at_eof():
+                return conn
+            conn.close()
+        return None
+
+    def _remember_session(self, host: str, conn: _Connection) -> None:
+        ssl_object = conn.writer.get_extra_info('ssl_object')
+        if ssl_object is not None and ssl_object.session is not None:
+            # Taken after a response, so TLS 1.3 session tickets have arrived
+            self.ssl.sessions[host] = ssl_object.session
+
+    def _release(self, key: Tuple[str, str, int], conn: _Connection, per_host: int) -> None:
+        idle = self.idle.setdefault(key, [])
+        if len(idle) >= per_host:
+            conn.close()
+            return
+        conn.idle_since = time.monotonic()
+        idle.append(conn)
+
+    async def _exchange(self, conn: _Connection, host: str, port: int, scheme: str,
+                        path: str) -> Tuple[int, List[Tuple[str, str]], bytes, bool]:
+        """One GET on conn: (status, headers, body, whether the connection can be reused)."""
+        default_port = 443 if scheme == 'https' else 80
+        host_header = f"[{host}]" if ':' in host else host
+        if port != default_port:
+            host_header += f":{port}"
+        conn.writer.write((f"GET {path} HTTP/1.1\r\nHost: {host_header}\r\nUser-Agent: {DEFAULT_USER_AGENT}\r\n"
+                           f"Accept: */*\r\nAccept-Encoding: gzip, deflate\r\nConnection: keep-alive\r\n\r\n").encode('utf-8'))
+        await conn.writer.drain()
+        reader = conn.reader
+        while True:
+            head = await reader.readuntil(b'\r\n\r\n')
+            lines = head.decode('latin-1').split('\r\n')
+            version, _, rest = lines[0].partition(' ')
+            status = int(rest.split(' ', 1)[0])
+            if not 100 <= status < 200 or status == 101:
+                break
+        headers = []  # type: List[Tuple[str, str]]
+        for line in lines[1:]:
+            name, sep, value = line.partition(':')
+            if sep:
+                headers.append((name.strip(), value.strip()))
+        fields = {name.lower(): value for name, value in headers}
+        reusable = version == 'HTTP/1.1' and fields.get('connection', '').lower() != 'close' or \
+            fields.get('connection', '').lower() == 'keep-alive'
+        body = b''
+        if status in (204, 304):
+            pass
+        elif 'chunked' in fields.get('transfer-encoding', '').lower():
+            parts = []
+            size_read = 0
+            while True:
+                size = int((await reader.readuntil(b'\r\n')).split(b';')[0].strip() or b'0', 16)
+                if size == 0:
+                    # Optional trailer fields, then the empty line ending the message
+                    while await reader.readuntil(b'\r\n') != b'\r\n':
+                        pass
+                    break
+                parts.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+                size_read += size
+                if size_read >= MAX_BODY:
+                    reusable = False
+                    break
+            body = b''.join(parts)
+        elif 'content-length' in fields and fields['content-length'].isdigit():
+            length = int(fields['content-length'])
+            body = await reader.readexactly(min(length, MAX_BODY))
+            reusable = reusable and length <= MAX_BODY
+        else:
+            body = await reader.read(MAX_BODY)
+            reusable = False
+        return status, headers, _decode(body[:MAX_BODY], fields.get('content-encoding', '').lower()), reusable
+
+    async def _request(self, url: str, timeout: float, per_host: int) -> Tuple[int, List[Tuple[str, str]], bytes]:
+        scheme, host, port, path = _split(url)
+        key = (scheme, host, port)
+        limit = self.limits.get(key + (per_host,))
+        if limit is None:
+            limit = self.limits[key + (per_host,)] = asyncio.Semaphore(per_host)
+        async with limit:
+            while True:
+                conn = self._take(key)
+                reused = conn is not None
+                if conn is None:
+                    conn = await asyncio.wait_for(self._connect(scheme, host, port), timeout)
+                self.stats['requests'] += 1
+                try:
+                    status, headers, body, reusable = await asyncio.wait_for(
+                        self._exchange(conn, host, port, scheme, path), timeout)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    conn.close()
+                    if reused:
+                        continue  # the server closed an idle keep-alive connection; retry on another
+                    raise
+                except BaseException:
+                    conn.close()
+                    raise
+                if reused:
+                    self.stats['reused'] += 1
+                self._remember_session(host, conn)
+                if reusable:
+                    self._release(key, conn, per_host)
+                else:
+                    conn.close()
+                return status, headers, body
+
+    async def _fetch(self, url: str, timeout: float, per_host: int, tech: bool) -> Tuple[ProbeResult, Optional[List[str]]]:
+        """(base result, technology hints if tech is set and something answered)."""
+        try:
+            status, headers, body = await self._request(url, timeout, per_host)
+        except asyncio.TimeoutError:
+            return ProbeResult(url, error='timed out'), None
+        except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.LimitOverrunError) as e:
+            return ProbeResult(url, error=str(e) or type(e).__name__), None
+        result = ProbeResult(url, status)
+        fields = {}  # type: Dict[str, str]
+        for name, value in headers:
+            fields.setdefault(name.lower(), value)
+        result.server = fields.get('server', '')
+        result.content_type = fields.get('content-type', '').split(';')[0].strip()
+        result.content_length = len(body)
+        result.location = fields.get('location', '')
+        result.security = {h: fields[h] for h in SECURITY_HEADERS if h in fields}
+        match = _TITLE_RE.search(body)
+        if match:
+            result.title = ' '.join(html.unescape(match.group(1).decode('utf-8', 'replace')).split())[:200]
+        if not tech:
+            return result, None
+        # Matching is CPU work; keep it off the loop so other requests progress
+        response = {'url': url, 'headers': headers, 'body': body.decode('utf-8', 'replace')}
+        techs = await asyncio.get_event_loop().run_in_executor(self.matchers, _analyze, response)
+        return result, [f"{t['name']}:{t['version']}" if t['version'] else t['name'] for t in techs]
+
+    async def probe(self, url: str, timeout: float, per_host: int, tech: bool = False) -> ProbeResult:
+        """
+        The result for url, fetched at most once per RESULT_TTL however many tasks ask for it.
+        With tech, the result carries technology hints (fetched again if the cached one has none).
+        """
+        cached = self.results.get(url)
+        if cached is not None and time.monotonic() - cached[0] < RESULT_TTL:
+            if not tech:
+                self.stats['cached'] += 1
+                return cached[1]
+            if url in self.techs:
+                self.stats['cached'] += 1
+                return cached[1].with_tech(self.techs[url])
+        key = (url, tech)
+        pending = self.inflight.get(key)
+        if pending is not None:
+            self.stats['cached'] += 1
+            return await asyncio.shield(pending)
+        future = self.inflight[key] = asyncio.get_event_loop().create_future()
+        try:
+            result, techs = await self._fetch(url, timeout, per_host, tech)
+            if result.error is None:
+                self.results[url] = (time.monotonic(), result)
+                if techs is None:
+                    self.techs.pop(url, None)  # hints of an older response
+                else:
+                    self.techs[url] = techs
+                    result = result.with_tech(techs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # retrieved, so an unwaited failure is not logged
+            raise
+        finally:
+            self.inflight.pop(key, None)
+
+    async def probe_entry(self, entry: str, timeout: float, per_host: int, tech: bool = False) -> ProbeResult:
+        """Probe a URL, or a bare host (host[:port]) over https then http."""
+        if '://' in entry:
+            return await self.probe(entry, timeout, per_host, tech)
+        result = None
+        for scheme in ('https', 'http'):
+            result = await self.probe(f"{scheme}://{entry}", timeout, per_host, tech)
+            if result.error is None:
+                break
+        return result
+
+    async def probe_all(self, entries: List[str], out: 'queue.Queue', timeout: float, concurrency: int,
+                        per_host: int, tech: bool = False) -> None:
+        """Probe entries with at most concurrency requests, putting results on out as they complete, then None."""
+        gate = asyncio.Semaphore(max(1, concurrency))
+
+        async def one(entry: str) -> None:
+            async with gate:
+                try:
+                    out.put(await self.probe_entry(entry, timeout, per_host, tech))
+                except Exception as e:
+                    out.put(ProbeResult(entry, error=str(e) or type(e).__name__))
+        try:
+            await asyncio.gather(*(one(e) for e in entries))
+        finally:
+            out.put(None)
+
+
+def _analyze(response: Dict[str, Any]) -> List[Dict[str, Any]]:
+    from cyfer_recon.core.fingerprint import load_signatures
+    return load_signatures().analyze(response)
+
+
+def _engine_loop() -> Tuple[asyncio.AbstractEventLoop, Prober]:
+    """The run-wide loop thread and prober, started on first use."""
+    global _loop, _engine
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _engine = Prober()
+            threading.Thread(target=_loop.run_forever, name='cyfer-probe', daemon=True).start()
+        return _loop, _engine
+
+
+def probe_iter(entries: Iterable[str], timeout: float = DEFAULT_TIMEOUT, concurrency: int = DEFAULT_CONCURRENCY,
+               per_host: int = PER_HOST_LIMIT, tech: bool = False) -> Iterator[ProbeResult]:
+    """Probe URLs and bare hosts on the shared engine, yielding results as they complete (with tech, fingerprinted)."""
+    entries = list(dict.fromkeys(e for e in entries if e))
+    if not entries:
+        return
+    loop, engine = _engine_loop()
+    out = queue.Queue()  # type: queue.Queue
+    done = asyncio.run_coroutine_threadsafe(engine.probe_all(entries, out, timeout, concurrency, per_host, tech), loop)
+    while True:
+        result = out.get()
+        if result is None:
+            break
+        yield result
+    done.result()
+
+
+def stats() -> Dict[str, int]:
+    """Counters of the run's engine (empty before the first probe)."""
+    return dict(_engine.stats) if _engine is not None else {}
+
+
+def _entries(inputs: List[str]) -> List[str]:
+    entries = []  # type: List[str]
+    for item in inputs:
+        if '://' in item:
+            entries.append(item)
+        elif storage.exists(item):
+            # Lines may be bare hosts (dnsx) or httpx style "url [200] ..."
+            entries.extend(line.split()[0] for line in storage.iter_lines(item) if line.strip())
+        elif '/' not in item:
+            entries.append(item)
+    return entries
+
+
+def probe_to_file(inputs: List[str], output_file: str, fmt: str = 'live', match_codes: Optional[List[int]] = None,
+                  timeout: float = DEFAULT_TIMEOUT, concurrency: int = DEFAULT_CONCURRENCY,
+                  per_host: int = PER_HOST_LIMIT) -> Dict[str, int]:
+    """
+    Probe every URL or host in inputs (URLs, bare hosts, or files with one per line; missing files are
+    skipped) and write one line per answering URL in the given format, as results come in. Results
+    whose status is not in match_codes are left out (all are kept without it). Returns counters.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format {fmt!r} (expected one of {', '.join(FORMATS)})")
+    counts = {'probed': 0, 'answered': 0, 'written': 0}
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    with storage.open_text(output_file, 'w') as f:
+        for result in probe_iter(_entries(inputs), timeout=timeout, concurrency=concurrency, per_host=per_host,
+                                 tech=fmt in TECH_FORMATS):
+            counts['probed'] += 1
+            if result.error is not None:
+                if fmt == 'json':
+                    f.write(result.format(fmt) + '\n')
+                continue
+            counts['answered'] += 1
+            if match_codes and result.status not in match_codes:
+                continue
+            f.write(result.format(fmt) + '\n')
+            f.flush()
+            counts['written'] += 1
+    return counts
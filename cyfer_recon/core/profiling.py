@@ -0,0 +1,132 @@
+"""
+Opt-in profiling of a run (--profile).
+
+Orchestration code wraps its phases in `with phase("name"):`. Without an active profiler this is a
+no-op; with one, wall time is accumulated per phase from every thread. cProfile optionally records the
+Python side of the main thread and tracemalloc the peak and largest allocation sites. write_report() puts
+per-phase timings, the top functions and the top allocation sites into one text file.
+"""
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+_active = None  # type: Optional[Profiler]
+
+
+class _PhaseStats:
+    __slots__ = ('calls', 'total', 'max')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class Profiler:
+    """Collects per-phase timings and, optionally, cProfile and tracemalloc data."""
+
+    def __init__(self, cpu: bool = True, memory: bool = True):
+        self.phases = {}  # type: Dict[str, _PhaseStats]
+        self.order = []  # type: List[str]
+        self._lock = threading.Lock()
+        self._cpu = cProfile.Profile() if cpu else None
+        self.memory = memory
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self.peak_memory = 0
+        self.snapshot = None  # type: Optional[tracemalloc.Snapshot]
+
+    def start(self) -> 'Profiler':
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+        if self._cpu is not None:
+            self._cpu.enable()
+        self.started = time.perf_counter()
+        return self
+
+    def stop(self) -> None:
+        self.elapsed = time.perf_counter() - self.started
+        if self._cpu is not None:
+            self._cpu.disable()
+        if self.memory and tracemalloc.is_tracing():
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            self.snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            stats = self.phases.get(name)
+            if stats is None:
+                stats = self.phases[name] = _PhaseStats()
+                self.order.append(name)
+            stats.calls += 1
+            stats.total += seconds
+            stats.max = max(stats.max, seconds)
+
+    def report(self, top: int = 25) -> str:
+        out = io.StringIO()
+        out.write(f"Cyfer Recon profile - total wall time {self.elapsed:.2f}s\n")
+        if self.memory:
+            out.write(f"Peak traced Python memory: {self.peak_memory / (1024 * 1024):.1f} MB\n")
+        out.write("\n== Phases (wall time, summed over threads) ==\n")
+        out.write(f"{'phase':<48} {'calls':>6} {'total s':>10} {'max s':>9} {'% run':>6}\n")
+        for name in self.order:
+            s = self.phases[name]
+            share = 100 * s.total / self.elapsed if self.elapsed else 0.0
+            out.write(f"{name[:48]:<48} {s.calls:>6} {s.total:>10.3f} {s.max:>9.3f} {share:>6.1f}\n")
+        if self._cpu is not None:
+            out.write(f"\n== Top {top} functions by cumulative time (main thread) ==\n")
+            pstats.Stats(self._cpu, stream=out).sort_stats('cumulative').print_stats(top)
+        if self.snapshot is not None:
+            out.write(f"\n== Top {top} allocation sites still held at the end of the run ==\n")
+            for stat in self.snapshot.statistics('lineno')[:top]:
+                out.write(f"{stat}\n")
+        return out.getvalue()
+
+    def write_report(self, directory: str) -> str:
+        """Write cyfer_profile_<timestamp>.txt (and .prof for cProfile viewers) into directory; returns the text path."""
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(directory, f"cyfer_profile_{stamp}.txt")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.report())
+        if self._cpu is not None:
+            self._cpu.dump_stats(os.path.join(directory, f"cyfer_profile_{stamp}.prof"))
+        return path
+
+
+def start(cpu: bool = True, memory: bool = True) -> Profiler:
+    """Start the run-wide profiler; phase() calls are recorded from now on."""
+    global _active
+    _active = Profiler(cpu=cpu, memory=memory).start()
+    return _active
+
+
+def stop() -> Optional[Profiler]:
+    """Stop and return the run-wide profiler (None if profiling was not started)."""
+    global _active
+    if _active is None:
+        return None
+    profiler, _active = _active, None
+    profiler.stop()
+    return profiler
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time the enclosed block under name when profiling is active."""
+    profiler = _active
+    if profiler is None:
+        yield
+        return
+    began = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.record(name, time.perf_counter() - began)
@@ -0,0 +1,251 @@
+"""
+Input-list sharding for list-consuming scanners (--shards).
+
+A command marks the list it consumes by putting the {shard} marker in front of its path:
+
+    nuclei -l {shard}{output}/{target}_alive_subs.txt -tags cve -o {output}/vuln/{target}_nuclei.txt
+
+With sharding enabled and a long enough list, the runner splits the list into contiguous chunks,
+runs one copy of the command per chunk with its outputs sent to per-chunk files, and appends those
+to the real outputs in chunk order. Chunks run on the job's own thread plus helper threads that are
+only recruited while fewer commands than workers are running, so sharding fills idle workers
+without raising the run's concurrency. Commands that need /bin/sh are never sharded.
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from cyfer_recon.core import storage, tracing
+from cyfer_recon.core.pipeline import Stage, parse_pipeline
+
+# Lists shorter than this many lines per chunk are not worth splitting
+MIN_SHARD_LINES = 100
+# Options whose value is a file the command writes to
+OUTPUT_FLAGS = ('-o', '-oN', '-oG', '-output', '--output')
+
+_shards = 1
+_capacity = 1
+_busy = 0
+_lock = threading.Lock()
+
+
+def configure(shards: int) -> None:
+    """Split marked input lists into up to `shards` chunks (1 disables sharding)."""
+    global _shards
+    _shards = max(1, shards)
+
+
+def set_capacity(workers: int) -> None:
+    """Number of commands allowed to run at once, shard helpers included."""
+    global _capacity
+    _capacity = max(1, workers)
+
+
+def enabled() -> bool:
+    return _shards > 1
+
+
+@contextmanager
+def busy() -> Iterator[None]:
+    """Count the enclosed command as running (helpers are only recruited below capacity)."""
+    global _busy
+    with _lock:
+        _busy += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _busy -= 1
+
+
+def _claim() -> bool:
+    global _busy
+    with _lock:
+        if _busy >= _capacity:
+            return False
+        _busy += 1
+        return True
+
+
+def _release() -> None:
+    global _busy
+    with _lock:
+        _busy -= 1
+
+
+def split_list(path: str, parts: int, directory: str) -> List[str]:
+    """
+    Split the non-empty lines of path into at most `parts` contiguous chunk files in directory,
+    keeping at least MIN_SHARD_LINES lines per chunk. Returns [] when the list is too short to split.
+    """
+    total = sum(1 for line in storage.iter_lines(path) if line.strip())
+    parts = min(parts, total // MIN_SHARD_LINES)
+    if parts < 2:
+        return []
+    per_chunk = -(-total // parts)
+    chunks = []  # type: List[str]
+    out = None
+    written = 0
+    try:
+        for line in storage.iter_lines(path):
+            if not line.strip():
+                continue
+            if out is None or written == per_chunk:
+                if out is not None:
+                    out.close()
+                chunks.append(os.path.join(directory, f"chunk{len(chunks)}-{os.path.basename(path)}"))
+                out = open(chunks[-1], 'w', encoding='utf-8')
+                written = 0
+            out.write(line if line.endswith('\n') else line + '\n')
+            written += 1
+    finally:
+        if out is not None:
+            out.close()
+    return chunks
+
+
+def output_paths(stages: List[Stage]) -> List[Tuple[str, bool]]:
+    """(path, append) for every file the stages write: stdout redirects and OUTPUT_FLAGS values."""
+    found = []  # type: List[Tuple[str, bool]]
+    for stage in stages:
+        argv = stage.argv
+        for idx, word in enumerate(argv[:-1]):
+            if word in OUTPUT_FLAGS:
+                found.append((argv[idx + 1], False))
+        if stage.stdout_path:
+            found.append((stage.stdout_path, stage.stdout_append))
+    return found
+
+
+def substitute(stages: List[Stage], mapping: Dict[str, str]) -> List[Stage]:
+    """Copies of stages with every word and redirection in mapping replaced; redirected outputs are rewritten, not appended."""
+    copies = []
+    for stage in stages:
+        copy = Stage([(mapping.get(word, word), is_glob) for word, is_glob in stage.words])
+        copy.stdout_path = mapping.get(stage.stdout_path, stage.stdout_path) if stage.stdout_path else None
+        copy.stdout_append = False if stage.stdout_path in mapping else stage.stdout_append
+        copy.stderr_path, copy.stderr_append = stage.stderr_path, stage.stderr_append
+        copies.append(copy)
+    return copies
+
+
+def merge(outputs: List[Tuple[str, bool]], chunk_outputs: List[Dict[str, str]]) -> None:
+    """
+    Concatenate each (path, append) output from its per-chunk copies (chunk_outputs: path -> copy),
+    in chunk order, appending when append is set. Directory outputs get the chunks' files moved in.
+    """
+    for path, append in outputs:
+        parts = [c[path] for c in chunk_outputs if os.path.exists(c[path]) or storage.exists(c[path])]
+        if not parts:
+            continue
+        if any(os.path.isdir(p) for p in parts):
+            os.makedirs(path, exist_ok=True)
+            for part in parts:
+                for name in os.listdir(part):
+                    shutil.move(os.path.join(part, name), os.path.join(path, name))
+            continue
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with storage.open_binary(path, 'ab' if append else 'wb') as out:
+            for part in parts:
+                with storage.open_binary(part) as src:
+                    shutil.copyfileobj(src, out, 1024 * 1024)
+
+
+def run_sharded(cmd: str, stages: Optional[List[Stage]], shard_input: Optional[str],
+                run: Callable[[str, List[Stage]], subprocess.CompletedProcess]) -> Optional[subprocess.CompletedProcess]:
+    """
+    Run cmd once per chunk of shard_input through run(cmd, stages) and merge the outputs.
+    Returns None when the command is not sharded (disabled, no marker, list too short, needs a
+    shell or does not reference the list); the caller then runs it as usual.
+    """
+    if not enabled() or not shard_input or not storage.exists(shard_input):
+        return None
+    if stages is None:
+        stages = parse_pipeline(cmd)
+    if stages is None or not any(shard_input in s.argv for s in stages):
+        return None
+    with busy():
+        # Splitting only pays off if at least one chunk can run next to this one right away
+        if not _claim():
+            return None
+        try:
+            return _run_chunks(cmd, stages, shard_input, run)
+        finally:
+            _release()
+
+
+def _run_chunks(cmd: str, stages: List[Stage], shard_input: str,
+                run: Callable[[str, List[Stage]], subprocess.CompletedProcess]) -> Optional[subprocess.CompletedProcess]:
+    outputs = [o for o in output_paths(stages) if o[0] != shard_input]
+    workdir = tempfile.mkdtemp(prefix='.cyfer-shards-', dir=os.path.dirname(outputs[0][0]) if outputs else None)
+    try:
+        chunks = split_list(shard_input, _shards, workdir)
+        if not chunks:
+            return None
+        chunk_outputs = []  # type: List[Dict[str, str]]
+        for idx in range(len(chunks)):
+            os.makedirs(os.path.join(workdir, str(idx)))
+            # Indexed names: two outputs may share a file name in different folders
+            chunk_outputs.append({path: os.path.join(workdir, str(idx), f"{i}-{os.path.basename(path)}")
+                                  for i, (path, _) in enumerate(outputs)})
+        results = [None] * len(chunks)  # type: List[Optional[subprocess.CompletedProcess]]
+        errors = []  # type: List[BaseException]
+        pending = deque(range(len(chunks)))
+        pending_lock = threading.Lock()
+
+        def work(recruiting: bool) -> None:
+            while True:
+                with pending_lock:
+                    if not pending or errors:
+                        return
+                    idx = pending.popleft()
+                mapping = dict(chunk_outputs[idx])
+                mapping[shard_input] = chunks[idx]
+                try:
+                    with tracing.span(f"{stages[0].argv[0]} chunk {idx + 1}/{len(chunks)}", 'shard', input=chunks[idx]):
+                        results[idx] = run(cmd, substitute(stages, mapping))
+                except BaseException as e:
+                    errors.append(e)
+                if recruiting:
+                    recruit()
+
+        def helper(release: bool) -> None:
+            try:
+                work(False)
+            finally:
+                if release:
+                    _release()
+
+        # The slot claimed by run_sharded() goes to the first helper; more join as workers free up
+        helpers = [threading.Thread(target=helper, args=(False,), daemon=True)]
+        helpers[0].start()
+
+        def recruit() -> None:
+            while len(helpers) < len(chunks) - 1 and pending and _claim():
+                t = threading.Thread(target=helper, args=(True,), daemon=True)
+                t.start()
+                helpers.append(t)
+
+        # The job's own thread works through chunks too
+        recruit()
+        work(True)
+        for t in helpers:
+            t.join()
+        if errors:
+            raise errors[0]
+        merge(outputs, chunk_outputs)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    failed = [r for r in results if r.returncode != 0]
+    combined = subprocess.CompletedProcess(cmd, failed[0].returncode if failed else 0,
+                                           ''.join(r.stdout or '' for r in results),
+                                           ''.join(r.stderr or '' for r in results))
+    combined.limit_exceeded = next((getattr(r, 'limit_exceeded', None) for r in results
+                                    if getattr(r, 'limit_exceeded', None)), None)
+    return combined
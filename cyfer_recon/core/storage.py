@@ -0,0 +1,332 @@
+"""
+Transparent compressed storage for bulky outputs.
+
+With compression enabled (--compress), outputs written by the runner itself (pipeline redirects,
+tee/anew, built-in stages) start out as plain files and switch to gzip or zstd once they grow past
+min_size; files written directly by tools are compacted when a target is finished. A compressed
+artifact lives next to its logical name (`urls/all.txt` -> `urls/all.txt.gz`).
+
+Readers never need to know: open_text()/iter_lines() accept either form and detect the codec
+from the file's magic bytes, and plain_views() hands external tools a FIFO that streams the
+decompressed content under a plain-looking path.
+"""
+import errno
+import gzip
+import io
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import IO, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # optional dependency, gzip is used instead
+    zstandard = None
+
+SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+MAGIC = {b'\x1f\x8b': 'gzip', b'\x28\xb5\x2f\xfd': 'zstd'}
+COMPRESSIBLE_EXTENSIONS = ('.txt', '.json', '.jsonl', '.csv', '.xml', '.log', '.gnmap', '.nmap', '.out')
+DEFAULT_MIN_SIZE = 1024 * 1024
+
+_codec = None  # type: Optional[str]
+_min_size = DEFAULT_MIN_SIZE
+
+
+def configure(codec: Optional[str], min_size: int = DEFAULT_MIN_SIZE) -> Optional[str]:
+    """
+    Enable compression for this process ("gzip", "zstd" or None to disable).
+    zstd needs the optional zstandard package and falls back to gzip without it.
+    Returns the codec actually in use.
+    """
+    global _codec, _min_size
+    if codec not in (None, 'gzip', 'zstd'):
+        raise ValueError(f"Unknown compression codec: {codec}")
+    if codec == 'zstd' and zstandard is None:
+        codec = 'gzip'
+    _codec = codec
+    _min_size = min_size
+    return _codec
+
+
+def enabled() -> bool:
+    return _codec is not None
+
+
+def is_compressible(path: str) -> bool:
+    return path.lower().endswith(COMPRESSIBLE_EXTENSIONS)
+
+
+def resolve(path: str) -> Optional[str]:
+    """Return the file holding path's content: path itself or a compressed sibling, else None."""
+    if os.path.isfile(path):
+        return path
+    for suffix in SUFFIXES.values():
+        if os.path.isfile(path + suffix):
+            return path + suffix
+    return None
+
+
+def exists(path: str) -> bool:
+    return resolve(path) is not None
+
+
+def logical_path(path: str) -> str:
+    """Strip a compression suffix: `a.txt.gz` -> `a.txt`."""
+    for suffix in SUFFIXES.values():
+        if path.endswith(suffix):
+            return path[:-len(suffix)]
+    return path
+
+
+def detect(path: str) -> Optional[str]:
+    """Codec of a file from its magic bytes, or None for plain files."""
+    with open(path, 'rb') as f:
+        head = f.read(4)
+    for magic, codec in MAGIC.items():
+        if head.startswith(magic):
+            return codec
+    return None
+
+
+def _reader(path: str) -> IO[bytes]:
+    codec = detect(path)
+    if codec == 'gzip':
+        return gzip.open(path, 'rb')
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError(f"{path} is zstd-compressed; install the 'zstandard' package to read it")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True, read_across_frames=True))
+    return open(path, 'rb')
+
+
+def _writer(path: str, codec: str, append: bool = False) -> IO[bytes]:
+    if codec == 'zstd':
+        raw = open(path, 'ab' if append else 'wb')
+        return zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=True)
+    return gzip.open(path, 'ab' if append else 'wb', compresslevel=6)
+
+
+class _SpillWriter(io.RawIOBase):
+    """Buffers the first min_size bytes and writes a plain file, or switches to a compressed one past that."""
+
+    def __init__(self, path: str, codec: str, min_size: int):
+        super().__init__()
+        self.path = path
+        self.codec = codec
+        self.min_size = min_size
+        self._buffer = bytearray()  # type: Optional[bytearray]
+        self._out = None  # type: Optional[IO[bytes]]
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if self._out is not None:
+            self._out.write(data)
+            return len(data)
+        self._buffer.extend(data)
+        if len(self._buffer) >= self.min_size:
+            self._out = _writer(self.path + SUFFIXES[self.codec], self.codec)
+            self._out.write(bytes(self._buffer))
+            self._buffer = None
+            if os.path.isfile(self.path):
+                os.remove(self.path)
+        return len(data)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        if self._out is not None:
+            self._out.close()
+        else:
+            with open(self.path, 'wb') as f:
+                f.write(bytes(self._buffer))
+            _remove_siblings(self.path)
+        super().close()
+
+
+def _remove_siblings(path: str) -> None:
+    for suffix in SUFFIXES.values():
+        if os.path.isfile(path + suffix):
+            os.remove(path + suffix)
+
+
+def open_binary(path: str, mode: str = 'rb') -> IO[bytes]:
+    """
+    Open path for reading ('rb') or writing ('wb'/'ab') with transparent compression.
+    Reads accept the plain file or a compressed sibling. Writes compress once the output grows
+    past min_size when compression is enabled; appends keep the form the file already has.
+    """
+    if mode == 'rb':
+        actual = resolve(path)
+        if actual is None:
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), path)
+        return _reader(actual)
+    if mode not in ('wb', 'ab'):
+        raise ValueError(f"Unsupported mode: {mode}")
+    actual = resolve(path)
+    if mode == 'ab' and actual is not None:
+        codec = detect(actual)
+        if codec is None:
+            return open(actual, 'ab')
+        # gzip members and zstd frames can simply be concatenated
+        return _writer(actual, codec, append=True)
+    if _codec is None or not is_compressible(path):
+        if mode == 'wb':
+            _remove_siblings(path)
+        return open(path, mode)
+    return io.BufferedWriter(_SpillWriter(path, _codec, _min_size))
+
+
+def open_text(path: str, mode: str = 'r', encoding: str = 'utf-8', errors: str = 'replace', newline: Optional[str] = None) -> IO[str]:
+    """Text counterpart of open_binary(), accepting 'r', 'w' and 'a'."""
+    return io.TextIOWrapper(open_binary(path, mode.replace('t', '').rstrip('b') + 'b'), encoding=encoding, errors=errors, newline=newline)
+
+
+def iter_lines(path: str, encoding: str = 'utf-8', errors: str = 'replace') -> Iterator[str]:
+    """Yield the lines of a plain or compressed file; missing files yield nothing."""
+    if not exists(path):
+        return
+    with open_text(path, encoding=encoding, errors=errors) as f:
+        for line in f:
+            yield line
+
+
+def compress_file(path: str, force: bool = False) -> Optional[str]:
+    """
+    Compress a finished plain file in place (path -> path.gz/.zst) if compression is enabled and
+    the file is compressible and at least min_size bytes. Returns the compressed path, or None.
+    """
+    if _codec is None or not os.path.isfile(path) or not is_compressible(path):
+        return None
+    if not force and os.path.getsize(path) < _min_size:
+        return None
+    if detect(path) is not None:
+        return None
+    target = path + SUFFIXES[_codec]
+    tmp = target + '.tmp'
+    with open(path, 'rb') as src, _writer(tmp, _codec) as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    shutil.copystat(path, tmp)
+    os.replace(tmp, target)
+    os.remove(path)
+    return target
+
+
+def restore_file(path: str) -> None:
+    """Decompress path's compressed sibling back to a plain file (for tools that modify it in place)."""
+    if os.path.isfile(path):
+        return
+    actual = resolve(path)
+    if actual is None:
+        return
+    tmp = path + '.tmp'
+    with _reader(actual) as src, open(tmp, 'wb') as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.replace(tmp, path)
+    os.remove(actual)
+
+
+def compact_tree(root: str) -> Tuple[int, int]:
+    """Compress every large compressible file under root. Returns (files compressed, bytes saved)."""
+    count = saved = 0
+    if _codec is None or not os.path.isdir(root):
+        return count, saved
+    for dirpath, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(dirpath, name)
+            if name.startswith('.'):
+                continue
+            try:
+                before = os.path.getsize(path)
+                target = compress_file(path)
+            except OSError:
+                continue
+            if target:
+                count += 1
+                saved += before - os.path.getsize(target)
+    return count, saved
+
+
+# Words after which a path is written to rather than read from
+_WRITE_PREFIX = re.compile(r'(?:>>?|-o[NGAJ]?|\btee(?:\s+-a)?|\banew(?:\s+-q)?)\s*["\']?$')
+
+
+def command_paths(cmd: str, root: str) -> List[Tuple[str, bool]]:
+    """
+    (path, is_write) for every path under root referenced by cmd, in command order.
+    A path is a write when it follows a redirection, -o style flag, tee or anew.
+    """
+    found = []
+    for match in re.finditer(re.escape(root) + r'[/\\][^\s"\'<>|;&]*', cmd):
+        found.append((match.group(0), bool(_WRITE_PREFIX.search(cmd[:match.start()]))))
+    return found
+
+
+def _serve_fifo(fifo: str, source: str, stop: threading.Event) -> None:
+    """Stream source's decompressed content once the command opens fifo (gives up when stop is set)."""
+    import fcntl
+    while not stop.is_set():
+        try:
+            fd = os.open(fifo, os.O_WRONLY | os.O_NONBLOCK)
+        except OSError as e:
+            if e.errno != errno.ENXIO:  # ENXIO: no reader has opened the FIFO yet
+                return
+            time.sleep(0.05)
+            continue
+        fcntl.fcntl(fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) & ~os.O_NONBLOCK)
+        try:
+            with os.fdopen(fd, 'wb') as out, _reader(source) as src:
+                shutil.copyfileobj(src, out, 64 * 1024)
+        except (BrokenPipeError, OSError):
+            pass
+        return
+
+
+@contextmanager
+def plain_views(cmd: str, root: str) -> Iterator[str]:
+    """
+    Make a command work on compressed artifacts under root.
+    Inputs that only exist compressed are replaced by FIFOs streaming the decompressed data
+    (temporary plain copies where FIFOs are unavailable); outputs the command appends to or
+    rewrites are decompressed back in place first. Yields the command to run.
+    """
+    reads = []  # type: List[Tuple[str, str]]
+    for path, is_write in command_paths(cmd, root):
+        if os.path.isfile(path):
+            continue
+        actual = resolve(path)
+        if actual is None:
+            continue
+        if is_write:
+            restore_file(path)
+        else:
+            reads.append((path, actual))
+    if not reads:
+        yield cmd
+        return
+    tmpdir = tempfile.mkdtemp(prefix='cyfer-views-')
+    stop = threading.Event()
+    threads = []
+    try:
+        for idx, (path, actual) in enumerate(reads):
+            view = os.path.join(tmpdir, f"{idx}-{os.path.basename(path)}")
+            if hasattr(os, 'mkfifo'):
+                os.mkfifo(view)
+                t = threading.Thread(target=_serve_fifo, args=(view, actual, stop), daemon=True)
+                t.start()
+                threads.append(t)
+            else:
+                with _reader(actual) as src, open(view, 'wb') as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+            cmd = re.sub(re.escape(path) + r'(?=$|[\s"\'<>|;&])', lambda m: view, cmd)
+        yield cmd
+    finally:
+        stop.set()
+        for t in threads:
+            t.join(timeout=1)
+        shutil.rmtree(tmpdir, ignore_errors=True)
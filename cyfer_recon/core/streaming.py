@@ -0,0 +1,304 @@
+"""
+Cross-task streaming (--stream): consumers start on the partial output of the job producing their list.
+
+A consumer is a command whose input list carries the {shard} marker (see shards.py):
+
+    gowitness file -f {shard}{output}/{target}_alive_subs.txt --threads 50 -P {output}/screenshots/{target}/
+
+Without streaming it waits until its task's turn, after the producer of that list has finished.
+With --stream, link() detaches every consumer whose list is written by exactly one other command of the
+plan. When that producer starts for a target, its consumers start too, on their own threads. Each tails
+the list as it grows and runs the command on micro-batches of new lines (every --stream-batch lines or
+--stream-interval seconds, whichever comes first). Each batch writes to its own files, which are
+appended to the real outputs as soon as the batch finishes, so findings show up while enumeration is
+still running. Consumers whose outputs other commands read are not streamed, because nothing could wait
+for them. Neither are commands that need /bin/sh, nor the commands of sequential tasks, which keep
+their place in their task's order. A consumer whose producer never wrote to the list (skipped, failed
+early) runs once on the whole list, as without streaming.
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from cyfer_recon.core import shards, storage, tracing
+from cyfer_recon.core.pipeline import Stage, parse_pipeline
+from cyfer_recon.core.templates import CommandTemplate
+from cyfer_recon.core.utils import TemplateError
+
+DEFAULT_BATCH_LINES = 50
+DEFAULT_BATCH_SECONDS = 15.0
+# How often a consumer looks for new lines
+POLL_SECONDS = 1.0
+# Placeholder values used to compare the paths commands read and write
+_PROBE_TARGET = 'stream.invalid'
+_PROBE_ROOT = os.path.join(os.sep, 'cyfer-stream-probe')
+
+Plan = List[Tuple[str, List[CommandTemplate], bool]]
+Consumers = Dict[CommandTemplate, List[Tuple[str, CommandTemplate]]]
+
+_enabled = False
+_batch_lines = DEFAULT_BATCH_LINES
+_batch_seconds = DEFAULT_BATCH_SECONDS
+_lock = threading.Lock()
+_consumers = {}  # type: Consumers
+_launch = None  # type: Optional[Callable[[str, str, CommandTemplate], None]]
+_launched = set()  # type: Set[Tuple[str, int]]
+_threads = {}  # type: Dict[str, List[threading.Thread]]
+_streams = {}  # type: Dict[str, Stream]
+
+
+def configure(enabled: bool, batch_lines: int = DEFAULT_BATCH_LINES, batch_seconds: float = DEFAULT_BATCH_SECONDS) -> None:
+    """Turn streaming on or off for the run."""
+    global _enabled, _batch_lines, _batch_seconds
+    _enabled = enabled
+    _batch_lines = max(1, batch_lines)
+    _batch_seconds = max(0.0, batch_seconds)
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def _probe(template: CommandTemplate, wordlists: Optional[dict]) -> Optional[Tuple[str, Optional[str]]]:
+    """(command, shard input) of template rendered with placeholder values, or None if it cannot be."""
+    try:
+        rendered = template.render(target=_PROBE_TARGET, output=_PROBE_ROOT,
+                                   wordlist=(wordlists or {}).get(template.tool) or 'wordlist.txt')
+    except TemplateError:
+        return None
+    return rendered.command, rendered.shard_input
+
+
+def link(plan: Plan, wordlists: Optional[dict] = None) -> Tuple[Plan, Consumers]:
+    """
+    Split the plan into the commands run as usual and, per producer, the (task, consumer) pairs that
+    start with it instead.
+    """
+    probed = {}  # type: Dict[CommandTemplate, Tuple[str, Optional[str]]]
+    every = [t for _, templates, _ in plan for t in templates]
+    for template in every:
+        found = _probe(template, wordlists)
+        if found is not None:
+            probed[template] = found
+    writes = {t: {p for p, w in storage.command_paths(cmd, _PROBE_ROOT) if w} for t, (cmd, _) in probed.items()}
+    consumers = {}  # type: Consumers
+    detached = set()  # type: Set[CommandTemplate]
+    for task, templates, concurrent in plan:
+        # Sequential tasks run their commands in order; none of them may jump ahead on its own thread
+        if not concurrent:
+            continue
+        for template in templates:
+            if template not in probed or template.needs_shell:
+                continue
+            source = probed[template][1]
+            if source is None or source in writes[template]:
+                continue
+            producers = [t for t in every if t is not template and source in writes.get(t, ())]
+            if len(producers) != 1 or producers[0] in detached:
+                continue
+            # Nothing may wait for a detached command's outputs
+            if any(t is not template and any(p in probed[t][0] for p in writes[template]) for t in probed):
+                continue
+            consumers.setdefault(producers[0], []).append((task, template))
+            detached.add(template)
+    # A producer that is itself detached would start its consumers late; keep those consumers in place
+    for producer in [p for p in consumers if p in detached]:
+        detached.difference_update(t for _, t in consumers.pop(producer))
+    if not detached:
+        return plan, {}
+    kept = [(task, [t for t in templates if t not in detached], conc) for task, templates, conc in plan]
+    return kept, consumers
+
+
+def attach(consumers: Consumers, launch: Optional[Callable[[str, str, CommandTemplate], None]]) -> None:
+    """Register the consumers of a run and how to run one: launch(target, task, template)."""
+    global _consumers, _launch
+    with _lock:
+        _consumers = consumers
+        _launch = launch
+        _launched.clear()
+        _threads.clear()
+
+
+def settle(target: str) -> List[Tuple[str, CommandTemplate]]:
+    """
+    Wait for the consumers started for a target whose jobs are all done; returns (task, consumer) of
+    those whose producer never started for it.
+    """
+    with _lock:
+        threads = _threads.pop(target, [])
+    for t in threads:
+        t.join()
+    with _lock:
+        left = [(task, template) for pairs in _consumers.values() for task, template in pairs
+                if (target, id(template)) not in _launched]
+        _launched.difference_update((target, id(template)) for pairs in _consumers.values() for _, template in pairs)
+    return left
+
+
+def finish() -> None:
+    """Wait for any consumer still running and detach the run's consumers."""
+    with _lock:
+        threads = [t for started in _threads.values() for t in started]
+    for t in threads:
+        t.join()
+    attach({}, None)
+
+
+class Stream:
+    """A list being written by a running producer, read back in micro-batches of new lines."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.closed = threading.Event()
+        self._baseline = self._stat()
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def batches(self, size: int, interval: float) -> Iterator[List[str]]:
+        """New unique lines, once the producer has touched the file (stale content is never fed)."""
+        started = False
+        offset = 0
+        partial = b''
+        seen = set()  # type: Set[str]
+        pending = []  # type: List[str]
+        first = None  # type: Optional[float]
+        while True:
+            # Checked before reading, so the producer's last write is always picked up
+            closed = self.closed.is_set()
+            if not started:
+                stat = self._stat()
+                started = stat is not None and stat != self._baseline
+            if started:
+                try:
+                    with open(self.path, 'rb') as f:
+                        if os.fstat(f.fileno()).st_size < offset:
+                            offset, partial = 0, b''  # rewritten from scratch
+                        f.seek(offset)
+                        data = f.read()
+                except OSError:
+                    data = b''
+                offset += len(data)
+                lines = (partial + data).split(b'\n')
+                partial = lines.pop()
+                if closed and partial:
+                    lines.append(partial)
+                    partial = b''
+                for raw in lines:
+                    line = raw.decode('utf-8', 'replace').strip()
+                    if line and line not in seen:
+                        seen.add(line)
+                        pending.append(line)
+            if pending and first is None:
+                first = time.monotonic()
+            if pending and (closed or len(pending) >= size or time.monotonic() - first >= interval):
+                while pending:
+                    yield pending[:size]
+                    pending = pending[size:]
+                first = None
+            if closed:
+                return
+            self.closed.wait(POLL_SECONDS)
+
+
+@contextmanager
+def producing(template: CommandTemplate, target: str, output_dir: str, wordlists: Optional[dict] = None) -> Iterator[None]:
+    """Start the consumers of template's output for target while the enclosed producer runs."""
+    with _lock:
+        pairs = _consumers.get(template, []) if _launch is not None else []
+        launch = _launch
+    opened = []  # type: List[Stream]
+    for task, consumer in pairs:
+        with _lock:
+            if (target, id(consumer)) in _launched:
+                continue
+            _launched.add((target, id(consumer)))
+        try:
+            path = consumer.render(target=target, output=output_dir,
+                                   wordlist=(wordlists or {}).get(consumer.tool) or '').shard_input
+        except TemplateError:
+            path = None
+        with _lock:
+            if path and path not in _streams:
+                stream = _streams[path] = Stream(path)
+                opened.append(stream)
+        t = threading.Thread(target=launch, args=(target, task, consumer), name=f"cyfer-stream-{consumer.tool}", daemon=True)
+        t.start()
+        with _lock:
+            _threads.setdefault(target, []).append(t)
+    try:
+        yield
+    finally:
+        for stream in opened:
+            with _lock:
+                _streams.pop(stream.path, None)
+            stream.closed.set()
+
+
+def stream_for(path: Optional[str]) -> Optional[Stream]:
+    """The open stream of a list a running producer is writing, if any."""
+    if not path:
+        return None
+    with _lock:
+        return _streams.get(path)
+
+
+def run_streamed(cmd: str, stages: Optional[List[Stage]], stream: Stream,
+                 run: Callable[[str, List[Stage]], subprocess.CompletedProcess]) -> Optional[subprocess.CompletedProcess]:
+    """
+    Run cmd through run(cmd, stages) on each micro-batch of the stream, appending every batch's
+    outputs to the real ones right away. Returns None when nothing was streamed (the command needs a
+    shell, does not reference the list, or the producer never wrote to it); the caller then runs
+    it as usual.
+    """
+    if stages is None:
+        stages = parse_pipeline(cmd)
+    if stages is None or not any(stream.path in s.argv for s in stages):
+        # Running as usual must not start on a half-written list
+        stream.closed.wait()
+        return None
+    outputs = [o for o in shards.output_paths(stages) if o[0] != stream.path]
+    workdir = tempfile.mkdtemp(prefix='.cyfer-stream-', dir=os.path.dirname(outputs[0][0]) if outputs else None)
+    results = []  # type: List[subprocess.CompletedProcess]
+    written = set()  # type: Set[str]
+    try:
+        for idx, batch in enumerate(stream.batches(_batch_lines, _batch_seconds)):
+            batch_dir = os.path.join(workdir, str(idx))
+            os.makedirs(batch_dir)
+            batch_input = os.path.join(batch_dir, f"input-{os.path.basename(stream.path)}")
+            with open(batch_input, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(batch) + '\n')
+            mapping = {path: os.path.join(batch_dir, os.path.basename(path)) for path, _ in outputs}
+            batch_outputs = dict(mapping)
+            mapping[stream.path] = batch_input
+            with tracing.span(f"{stages[0].argv[0]} batch {idx + 1}", 'stream', input=stream.path, lines=len(batch)), shards.busy():
+                results.append(run(cmd, shards.substitute(stages, mapping)))
+            for path, append in outputs:
+                part = batch_outputs[path]
+                if not (os.path.exists(part) or storage.exists(part)):
+                    continue
+                # The first batch that produces an output replaces it (unless the command appends), later ones append
+                shards.merge([(path, append or path in written)], [batch_outputs])
+                written.add(path)
+            shutil.rmtree(batch_dir, ignore_errors=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    if not results:
+        return None
+    failed = [r for r in results if r.returncode != 0]
+    combined = subprocess.CompletedProcess(cmd, failed[0].returncode if failed else 0,
+                                           ''.join(r.stdout or '' for r in results),
+                                           ''.join(r.stderr or '' for r in results))
+    combined.limit_exceeded = next((getattr(r, 'limit_exceeded', None) for r in results
+                                    if getattr(r, 'limit_exceeded', None)), None)
+    return combined
@@ -0,0 +1,173 @@
+"""
+Streaming target ingestion.
+
+Targets can come from inline lists, files or stdin ("-"). They are read lazily, CIDR blocks and
+IP ranges are expanded on demand, entries are normalized (case, trailing dot, scheme/path),
+deduplicated and filtered through include/exclude scope rules before any job is created.
+"""
+import fnmatch
+import hashlib
+import ipaddress
+import os
+import re
+import sys
+from typing import Iterable, Iterator, List, Optional, Set
+
+_HOST_RE = re.compile(r'^[a-z0-9_.\-:\[\]]+$')
+_RANGE_RE = re.compile(r'^(\d{1,3}(?:\.\d{1,3}){3})-(\d{1,3}(?:\.\d{1,3}){3}|\d{1,3})$')
+
+
+def iter_raw_entries(sources: Iterable[str]) -> Iterator[str]:
+    """
+    Yield raw entries from each source: "-" reads stdin, an existing path is read line by line,
+    anything else is treated as a comma/space separated list.
+    """
+    for source in sources:
+        if source == '-':
+            for line in sys.stdin:
+                yield from _split_line(line)
+        elif os.path.isfile(source):
+            with open(source, 'r', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    yield from _split_line(line)
+        else:
+            yield from source.replace(',', ' ').split()
+
+
+def _split_line(line: str) -> List[str]:
+    line = line.split('#', 1)[0]
+    return line.replace(',', ' ').split()
+
+
+def expand_entry(entry: str) -> Iterator[str]:
+    """Expand a CIDR block or IP range lazily; other entries are yielded unchanged."""
+    if '/' in entry and not entry.startswith(('http://', 'https://')):
+        try:
+            network = ipaddress.ip_network(entry, strict=False)
+        except ValueError:
+            pass
+        else:
+            if network.num_addresses == 1:
+                yield str(network.network_address)
+            else:
+                for host in network.hosts():
+                    yield str(host)
+            return
+    match = _RANGE_RE.match(entry)
+    if match:
+        start = ipaddress.ip_address(match.group(1))
+        end_text = match.group(2)
+        if '.' not in end_text:
+            end_text = match.group(1).rsplit('.', 1)[0] + '.' + end_text
+        try:
+            end = ipaddress.ip_address(end_text)
+        except ValueError:
+            return
+        for value in range(int(start), int(end) + 1):
+            yield str(ipaddress.ip_address(value))
+        return
+    yield entry
+
+
+def normalize_target(entry: str) -> Optional[str]:
+    """
+    Canonical form of a target: lower-case, no scheme, path or trailing dot, no leading "*.".
+    Returns None for entries that cannot be a host.
+    """
+    target = entry.strip().lower()
+    if '://' in target:
+        target = target.split('://', 1)[1]
+    target = target.split('/', 1)[0].split('?', 1)[0]
+    if target.startswith('*.'):
+        target = target[2:]
+    target = target.rstrip('.')
+    if not target or not _HOST_RE.match(target):
+        return None
+    return target
+
+
+class ScopeRules:
+    """
+    Include/exclude rules applied to normalized targets.
+    Rules are CIDR blocks/IPs (matched against IP targets), wildcard patterns (fnmatch)
+    or plain domains, which match the domain itself and its subdomains.
+    """
+
+    def __init__(self, include: Optional[List[str]] = None, exclude: Optional[List[str]] = None):
+        self.include = [self._compile(r) for r in (include or [])]
+        self.exclude = [self._compile(r) for r in (exclude or [])]
+
+    @staticmethod
+    def _compile(rule: str):
+        rule = rule.strip().lower()
+        try:
+            return ('net', ipaddress.ip_network(rule, strict=False))
+        except ValueError:
+            pass
+        if any(c in rule for c in '*?['):
+            return ('glob', rule)
+        return ('domain', rule.rstrip('.'))
+
+    @staticmethod
+    def _matches(rule, target: str) -> bool:
+        kind, value = rule
+        if kind == 'net':
+            try:
+                return ipaddress.ip_address(target) in value
+            except ValueError:
+                return False
+        if kind == 'glob':
+            return fnmatch.fnmatchcase(target, value)
+        return target == value or target.endswith('.' + value)
+
+    @classmethod
+    def from_options(cls, include: Optional[str] = None, exclude: Optional[str] = None) -> 'ScopeRules':
+        """Build rules from CLI values: comma separated rules or a path to a file with one rule per line."""
+        return cls(list(iter_raw_entries([include])) if include else None,
+                   list(iter_raw_entries([exclude])) if exclude else None)
+
+    def __bool__(self) -> bool:
+        return bool(self.include or self.exclude)
+
+    def allows(self, target: str) -> bool:
+        if self.include and not any(self._matches(r, target) for r in self.include):
+            return False
+        return not any(self._matches(r, target) for r in self.exclude)
+
+
+class Deduplicator:
+    """Remembers seen targets as 64-bit digests instead of full strings."""
+
+    def __init__(self):
+        self._seen = set()  # type: Set[int]
+
+    def add(self, target: str) -> bool:
+        """Return True if target has not been seen before."""
+        digest = int.from_bytes(hashlib.blake2b(target.encode('utf-8'), digest_size=8).digest(), 'big')
+        if digest in self._seen:
+            return False
+        self._seen.add(digest)
+        return True
+
+
+def iter_targets(sources: Iterable[str], scope: Optional[ScopeRules] = None) -> Iterator[str]:
+    """Stream normalized, expanded, deduplicated and in-scope targets from the given sources."""
+    dedup = Deduplicator()
+    for entry in iter_raw_entries(sources):
+        for expanded in expand_entry(entry):
+            target = normalize_target(expanded)
+            if target is None:
+                continue
+            if scope and not scope.allows(target):
+                continue
+            if dedup.add(target):
+                yield target
+
+
+def record_targets(targets: Iterable[str], path: str) -> Iterator[str]:
+    """Pass targets through while writing each one to path (used for --save-targets)."""
+    with open(path, 'w', encoding='utf-8') as f:
+        for target in targets:
+            f.write(f"{target}\n")
+            f.flush()
+            yield target
@@ -1,70 +1,120 @@
+import itertools
 import subprocess
 import os
-import re
-from typing import List, Dict, Any, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import shlex
+import time
+from collections import deque
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple, Union
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from rich.progress import Progress, BarColumn, TextColumn, TimeElapsedColumn, SpinnerColumn, TimeRemainingColumn
-from cyfer_recon.core.utils import ToolNotFoundError, TaskExecutionError, send_discord_notification
+from cyfer_recon.core import coalesce, history, liveness, manifest, shards, storage, streaming, tracing
+from cyfer_recon.core.profiling import phase
+from cyfer_recon.core.builtins import is_builtin
+from cyfer_recon.core.dns_cache import apply_resolver
+from cyfer_recon.core.http_cache import apply_proxy
+from cyfer_recon.core.limits import tool_limits
+from cyfer_recon.core.pipeline import run_command
+from cyfer_recon.core.templates import CommandTemplate, Rendered, compile_command
+from cyfer_recon.core.utils import ToolNotFoundError, ResourceLimitError, TaskExecutionError, TemplateError, send_discord_notification, ensure_output_dirs, prepare_output_dirs
 
-def get_tool_and_ext(cmd: str) -> Tuple[str, str]:
-    """Extract tool name and output file extension from a command string."""
-    tool = cmd.split()[0]
-    # Try to guess extension from command (default to .txt)
-    match = re.search(r'-o(?:N|G)?\s+([^\s]+)', cmd)
-    if match:
-        out_file = match.group(1)
-        ext = os.path.splitext(out_file)[1] or '.txt'
-    elif '>' in cmd:
-        # e.g. tool ... > file.ext
-        parts = cmd.split('>')
-        if len(parts) > 1:
-            ext = os.path.splitext(parts[1].strip())[1] or '.txt'
-        else:
-            ext = '.txt'
-    else:
-        ext = '.txt'
-    return tool, ext
+# Jobs estimated to run at least this long count as long jobs for slot reservation
+LONG_JOB_SECONDS = 300.0
+# Jobs looked ahead per worker when choosing what to start next
+SCHEDULER_LOOKAHEAD = 8
 
-def run_task_for_target(target: str, task: str, commands: List[str], output_dir: str, console: Any, progress: Progress = None, parent_task_id: int = None, discord_webhook: str = None) -> None:
+def run_task_for_target(target: str, task: str, commands: List[Union[str, CommandTemplate]], output_dir: str, console: Any, progress: Progress = None, parent_task_id: int = None, discord_webhook: str = None, tools_config: Dict[str, Any] = None, wordlists: dict = None) -> None:
     """
     Run all commands for a given target and task, saving output and logs.
     Shows a progress bar for each tool.
     Improved error handling: logs tool, command, exit code, stdout, stderr for each failure.
     Now prints concise error info to the console instead of writing log files.
+    Commands are compiled templates (plain strings are compiled on the fly) rendered with
+    {target}, {output} and, from the wordlists mapping, {wordlist}.
     """
     task_dir = output_dir
     # logs_dir = os.path.join(task_dir, 'logs')
     # os.makedirs(logs_dir, exist_ok=True)
-    total_cmds = len(commands)
     failed_cmds = []
-    for idx, cmd in enumerate(commands):
-        tool, ext = get_tool_and_ext(cmd)
-        result_file = os.path.join(task_dir, f"{tool}_{task.replace(' ', '_').lower()}_{idx+1}{ext}")
-        # Ensure the output directory exists for redirected files
-        os.makedirs(os.path.dirname(result_file), exist_ok=True)
-        cmd_fmt = cmd.replace('{target}', target).replace('{output}', task_dir)
-        def output_repl(m):
-            return m.group(1) + result_file
-        cmd_fmt = re.sub(r'(-o(?:N|G)?\s+)[^\s]+', output_repl, cmd_fmt)
-        if '>' in cmd_fmt:
-            def redir_repl(match):
-                return f'> "{result_file}"'
-            cmd_fmt = re.sub(r'>\s*[^\s]+', redir_repl, cmd_fmt)
+    for cmd in commands:
+        template = cmd if isinstance(cmd, CommandTemplate) else compile_command(cmd, task)
+        tool = template.tool
+        try:
+            rendered = template.render(target=target, output=task_dir, wordlist=(wordlists or {}).get(tool) or '')
+        except TemplateError as e:
+            console.print(f"[red]{e}")
+            failed_cmds.append({'tool': tool, 'cmd': template.source, 'exit_code': None, 'stdout': '', 'stderr': str(e)})
+            continue
+        cmd_fmt = rendered.command
+        # With --stream, a consumer started together with its producer reads the list while it grows
+        stream = streaming.stream_for(rendered.shard_input)
+        # With --incremental, commands whose inputs, command and tool are unchanged since their last run are skipped
+        job = manifest.prepare(cmd_fmt, tool, task_dir)
+        if stream is None and manifest.skip(job):
+            console.print(f"[cyan]Skipping {tool} for {target}: inputs unchanged since the last run")
+            continue
+        # Jobs that contact the target are skipped while it is unreachable (pre-flight or circuit breaker)
+        gate = liveness.active()
+        gated = gate is not None and gate.active(template.text, tools_config)
+        if gated:
+            reason = gate.blocked(target)
+            if reason:
+                console.print(f"[yellow]Skipping {tool} for {target}: target unreachable ({reason})")
+                continue
+        # Output folders are created lazily, only for commands that actually run
+        ensure_output_dirs(cmd_fmt, task_dir)
+        cmd_fmt = apply_resolver(cmd_fmt, tools_config)
+        cmd_fmt, env = apply_proxy(cmd_fmt, tools_config)
 
         import shutil
-        if shutil.which(tool) is None:
+        if not is_builtin(tool) and shutil.which(tool) is None:
             error_msg = f"Tool '{tool}' not found in PATH."
             console.print(f"[red]{error_msg}")
             if discord_webhook:
                 send_discord_notification(discord_webhook, f"[ERROR] {error_msg}")
             raise ToolNotFoundError(error_msg)
 
+        limits = tool_limits(tools_config)
         try:
-            process = subprocess.run(cmd_fmt, shell=True, capture_output=True, text=True)
+            began = time.monotonic()
+            with phase(f"tool: {tool}"), tracing.span(tool, 'job', target=target, task=task, command=cmd_fmt) as trace, \
+                    streaming.producing(template, target, task_dir, wordlists):
+                stages = rendered.stages if cmd_fmt == rendered.command else None
+                process = None
+                if stream is not None:
+                    # Micro-batches of the lines the producer has written so far
+                    process = streaming.run_streamed(cmd_fmt, stages, stream, lambda c, s: run_command(c, env=env, stages=s, limits=limits))
+                if process is None:
+                    # Long {shard}-marked input lists are split and run in parallel chunks
+                    process = shards.run_sharded(cmd_fmt, stages, rendered.shard_input,
+                                                 lambda c, s: run_command(c, env=env, stages=s, limits=limits))
+                if process is None:
+                    with storage.plain_views(cmd_fmt, task_dir) as cmd_run, shards.busy():
+                        # Unchanged commands run from the template's pre-built stages, without re-parsing
+                        stages = rendered.stages if cmd_run == rendered.command else None
+                        process = run_command(cmd_run, env=env, stages=stages, limits=limits)
+                trace['exit_code'] = process.returncode
+                trace['limit'] = getattr(process, 'limit_exceeded', None)
+            if getattr(process, 'limit_exceeded', None):
+                raise ResourceLimitError(tool, cmd_fmt, process.returncode, process.stdout, process.stderr, process.limit_exceeded)
             if process.returncode != 0:
                 raise TaskExecutionError(tool, cmd_fmt, process.returncode, process.stdout, process.stderr)
+            if isinstance(template, coalesce.CoalescedTemplate):
+                # One merged run stands in for several tasks' commands: hand each its share of the results
+                template.split(target=target, output=task_dir)
+            if stream is None:
+                history.record(tool, task, target, task_dir, time.monotonic() - began)
+            else:
+                # The list was still growing when the job was prepared; record it as it ended up
+                job = manifest.prepare(rendered.command, tool, task_dir)
+            job.record()
+            if gated:
+                gate.record(target, True)
         except TaskExecutionError as e:
+            job.forget()
             console.print(f"[red]{e}")
+            tripped = gate.record(target, False, f"{e.stderr}\n{e.stdout}") if gated else None
+            if tripped:
+                console.print(f"[magenta]Circuit breaker open for {target} ({tripped}): skipping its remaining active jobs")
             if discord_webhook:
                 send_discord_notification(discord_webhook, f"[ERROR] {e}")
             failed_cmds.append({
@@ -72,9 +122,11 @@ def run_task_for_target(target: str, task: str, commands: List[str], output_dir:
                 'cmd': e.cmd,
                 'exit_code': e.exit_code,
                 'stdout': e.stdout,
-                'stderr': e.stderr
+                'stderr': e.stderr,
+                'limit': getattr(e, 'limit', None)
             })
         except Exception as e:
+            job.forget()
             console.print(f"[red]Unexpected error: {e}")
             if discord_webhook:
                 send_discord_notification(discord_webhook, f"[ERROR] Unexpected error: {e}")
@@ -97,168 +149,372 @@ def run_task_for_target(target: str, task: str, commands: List[str], output_dir:
     if failed_cmds:
         console.print(f"[red]Failed commands for {target} - {task}:")
         for fc in failed_cmds:
+            if fc.get('limit'):
+                console.print(f"[magenta]  Tool: {fc['tool']} | Exit code: {fc['exit_code']} | Killed by {fc['limit']}")
+                continue
             console.print(f"[red]  Tool: {fc['tool']} | Exit code: {fc['exit_code']} | Error: {fc['stderr'].strip().splitlines()[-1] if fc['stderr'].strip() else 'No stderr output.'}")
 
-def run_tasks(targets: List[str], selected_tasks: List[str], tasks_config: Dict[str, Any], output_dir: str, concurrent: bool, console: Any, wordlists: dict = None, dry_run: bool = False, discord_webhook: str = None) -> None:
+def _task_plan(selected_tasks: List[str], tasks_config: Dict[str, Any], concurrent: bool, wordlists: dict) -> List[Tuple[str, List[CommandTemplate], bool]]:
+    """Per selected task: (task, compiled templates to run, whether its jobs run concurrently)."""
+    plan = []
+    for task in selected_tasks:
+        task_config = tasks_config.get(task, [])
+        
+        # Handle both old format (list) and new format (dict with commands and run_mode)
+        if isinstance(task_config, list):
+            commands = task_config
+            run_mode = "both"  # Default for old format
+        else:
+            commands = task_config.get("commands", [])
+            run_mode = task_config.get("run_mode", "both")
+        
+        # Determine if this task should run concurrently
+        task_concurrent = concurrent
+        if run_mode == "sequential":
+            task_concurrent = False
+        elif run_mode == "concurrent":
+            task_concurrent = True
+        # If run_mode == "both", use the user's choice (task_concurrent = concurrent)
+        
+        # Templates are compiled once per command and cached across targets
+        templates = []
+        for cmd in commands:
+            template = compile_command(cmd, task)
+            # Commands needing a wordlist are skipped when none is configured for the tool
+            if 'wordlist' in template.placeholders and not wordlists.get(template.tool):
+                continue
+            templates.append(template)
+        plan.append((task, templates, task_concurrent))
+    return plan
+
+def build_plan(selected_tasks: List[str], tasks_config: Dict[str, Any], concurrent: bool, wordlists: dict, tools_config: Dict[str, Any] = None) -> List[Tuple[str, List[CommandTemplate], bool]]:
+    """The plan run_tasks executes: compiled templates per task, with compatible invocations coalesced."""
+    plan = _task_plan(selected_tasks, tasks_config, concurrent, wordlists)
+    # Compatible invocations of tools with a "coalesce" entry in tools.json run once for all their tasks
+    return coalesce.optimize(plan, tools_config)
+
+def default_workers() -> int:
+    """Worker threads run_tasks uses when max_workers is not given."""
+    return min(32, (os.cpu_count() or 1) + 4)
+
+def iter_jobs(targets: Iterable[str], plan: List[Tuple[str, List[CommandTemplate], bool]], concurrent_jobs: Optional[bool] = None) -> Iterator[Tuple[str, str, List[CommandTemplate], bool]]:
+    """
+    Lazily yield (target, task, [template], concurrent) jobs, one per command.
+    With concurrent_jobs set, only jobs of that concurrency mode are yielded.
+    """
+    for target in targets:
+        for task, templates, task_concurrent in plan:
+            if concurrent_jobs is not None and task_concurrent != concurrent_jobs:
+                continue
+            for template in templates:
+                yield (target, task, [template], task_concurrent)
+
+def pick_group(window: Dict[Tuple[str, str], deque], running: List[float], workers: int, reserve: int) -> Tuple[str, str]:
+    """
+    The (target, task) group whose next job starts now: the longest remaining estimated chain, or the
+    shortest next job once long jobs occupy all but `reserve` of the workers.
+    """
+    long_running = sum(1 for est in running if est >= LONG_JOB_SECONDS)
+    if long_running >= workers - reserve:
+        return min(window, key=lambda k: window[k][0][0])
+    return max(window, key=lambda k: sum(est for est, _ in window[k]))
+
+def _run_scheduled(executor: ThreadPoolExecutor, jobs: Iterator[Tuple[str, str, List[CommandTemplate], bool]], workers: int, submit: Callable, console: Any, output_dir: Callable[[str], str] = None, on_done: Callable = None) -> None:
+    """
+    Dispatch jobs longest-first using history estimates, looking ahead a bounded window of jobs.
+    Commands of one (target, task) are started in config order (later ones may read earlier
+    outputs); among those groups, the one with the longest remaining estimated chain goes first, while
+    some worker slots stay reserved for short jobs so they keep flowing past long scans.
+    Sequential jobs (yielded after their target's concurrent ones) are held until those are done,
+    then run one at a time in order. on_done(job, error) is called as each job finishes.
+    """
+    window = {}  # (target, task) -> deque of (estimate, job); dicts keep insertion order
+    window_size = 0
+    lookahead = workers * SCHEDULER_LOOKAHEAD
+    reserve = max(1, workers // 4)
+    in_flight = {}  # future -> (key, estimate, job)
+    pending = {}  # target -> its concurrent jobs read but not finished
+    held = {}  # target -> its sequential jobs, waiting for its concurrent ones
+    ready = deque()  # sequential jobs free to run, in order
+    chained = None  # the running sequential job
+    exhausted = False
+
+    def estimate(job):
+        return history.estimate(job[2][0].tool, job[1], job[0], output_dir(job[0]) if output_dir else None)
+
+    while True:
+        while not exhausted and window_size < lookahead:
+            job = next(jobs, None)
+            if job is None:
+                exhausted = True
+                break
+            if job[3]:
+                window.setdefault((job[0], job[1]), deque()).append((estimate(job), job))
+                pending[job[0]] = pending.get(job[0], 0) + 1
+            else:
+                held.setdefault(job[0], deque()).append(job)
+            window_size += 1
+        for target in [t for t in held if t not in pending]:
+            ready.extend(held.pop(target))
+        if ready and chained is None and len(in_flight) < workers:
+            job = ready.popleft()
+            window_size -= 1
+            chained = submit(executor, job)
+            in_flight[chained] = ((job[0], job[1]), estimate(job), job)
+        while window and len(in_flight) < workers:
+            key = pick_group(window, [est for _, est, _ in in_flight.values()], workers, reserve)
+            est, job = window[key].popleft()
+            if not window[key]:
+                del window[key]
+            window_size -= 1
+            in_flight[submit(executor, job)] = (key, est, job)
+        if not in_flight:
+            return
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            key, _, job = in_flight.pop(future)
+            if future is chained:
+                chained = None
+            else:
+                pending[job[0]] -= 1
+                if not pending[job[0]]:
+                    del pending[job[0]]
+            error = None
+            try:
+                future.result()
+            except Exception as e:
+                error = e
+                console.print(f"[red]Error in task {key}: {e}")
+            if on_done is not None:
+                on_done(job, error)
+
+def _preflighted(targets: Iterable[str], gate: Any, workers: int, console: Any) -> Iterator[str]:
+    """Yield targets as they are read, pre-flight checking them a batch of `workers` at a time."""
+    targets = iter(targets)
+    while True:
+        batch = list(itertools.islice(targets, workers))
+        if not batch:
+            return
+        with phase("preflight"), tracing.span("pre-flight", 'preflight'):
+            for target, detail in gate.check(batch, workers):
+                console.print(f"[yellow]Pre-flight: {target} {detail}, skipping its active jobs")
+        yield from batch
+
+def run_tasks(targets: Iterable[str], selected_tasks: List[str], tasks_config: Dict[str, Any], output_dir: Union[str, Callable[[str], str]], concurrent: bool, console: Any, wordlists: dict = None, dry_run: bool = False, discord_webhook: str = None, tools_config: Dict[str, Any] = None, max_workers: int = None, executor: ThreadPoolExecutor = None, on_target_done: Callable[[str, Optional[str]], None] = None) -> None:
     """
     Run all selected tasks for all targets, respecting individual task run_mode settings.
     For commands with {wordlist}, use the tool-specific wordlist from the mapping.
     If dry_run is True, print commands instead of executing them.
+    Targets are read once, lazily, and their jobs fed to the worker pool through a bounded window,
+    so memory does not grow with the number of targets. A target's sequential jobs run one at a
+    time after its concurrent ones. Within that window, jobs with the longest
+    estimated duration (see history.py) are started first. Commands of different tasks that
+    only differ in their selectors are merged into one invocation first (see coalesce.py).
 
     Args:
-        targets (List[str]): List of target domains/hosts.
+        targets (Iterable[str]): Target domains/hosts; any iterable, read once.
         selected_tasks (List[str]): List of task names to run.
         tasks_config (Dict[str, Any]): Task configuration dictionary.
-        output_dir (str): Output directory for results.
+        output_dir (str or callable): Output directory for results, or a function mapping each target to its
+            own output directory so the jobs of several targets share one worker pool.
         concurrent (bool): Whether to run tasks concurrently (can be overridden by task run_mode).
         console (Any): Rich console for output.
         wordlists (dict, optional): Mapping of tool name to wordlist path. Defaults to None.
         dry_run (bool, optional): If True, print commands instead of running. Defaults to False.
         discord_webhook (str, optional): Discord webhook URL for notifications. Defaults to None.
+        tools_config (Dict[str, Any], optional): tools.json contents, used for per-tool settings such as proxy support. Defaults to None.
+        max_workers (int, optional): Worker threads for concurrent jobs. Defaults to ThreadPoolExecutor's default.
+        executor (ThreadPoolExecutor, optional): Existing pool to run concurrent jobs on (e.g. the daemon's warm pool)
+            instead of a new one per call; at most max_workers of this call's jobs are in flight at once. Defaults to None.
+        on_target_done (callable, optional): Called with each target and the first error raised by one of its jobs
+            (None if there was none) as soon as its last job has finished, e.g. to post-process it. Defaults to None.
 
     Returns:
         None
     """
     if wordlists is None:
         wordlists = {}
+    dir_for = output_dir if callable(output_dir) else (lambda _target: output_dir)
     
-    jobs = []
-    for target in targets:
-        for task in selected_tasks:
-            task_config = tasks_config.get(task, [])
-            
-            # Handle both old format (list) and new format (dict with commands and run_mode)
-            if isinstance(task_config, list):
-                commands = task_config
-                run_mode = "both"  # Default for old format
-            else:
-                commands = task_config.get("commands", [])
-                run_mode = task_config.get("run_mode", "both")
-            
-            # Determine if this task should run concurrently
-            task_concurrent = concurrent
-            if run_mode == "sequential":
-                task_concurrent = False
-            elif run_mode == "concurrent":
-                task_concurrent = True
-            # If run_mode == "both", use the user's choice (task_concurrent = concurrent)
-            
-            for cmd in commands:
-                if "{wordlist}" in cmd:
-                    tool = cmd.split()[0]
-                    wordlist = wordlists.get(tool)
-                    if wordlist:
-                        wl_name = os.path.splitext(os.path.basename(wordlist))[0]
-                        cmd_wl = cmd.replace("{wordlist}", wordlist)
-                        cmd_wl = re.sub(r'(ffuf|gobuster|kiterunner)([^>]*)(-o\s*|>\s*)([^\s]+)',
-                                        lambda m: f"{m.group(1)}{m.group(2)}{m.group(3)}{output_dir}/{m.group(1)}_{wl_name}.txt",
-                                        cmd_wl)
-                        jobs.append((target, task, [cmd_wl], task_concurrent))
-                else:
-                    jobs.append((target, task, [cmd], task_concurrent))
-    
+    with phase("run_tasks: compile plan"):
+        plan = build_plan(selected_tasks, tasks_config, concurrent, wordlists, tools_config)
+
     if dry_run:
         console.print("[yellow]Dry run mode: The following commands would be executed:")
-        for t, task, cmds, task_conc in jobs:
+        for t, task, cmds, task_conc in iter_jobs(targets, plan):
             mode = "concurrent" if task_conc else "sequential"
             console.print(f"[yellow]{t} - {task} ({mode}): {cmds}")
         return
 
-    with Progress(SpinnerColumn(), TextColumn("{task.description}"), BarColumn(), TimeElapsedColumn(), TimeRemainingColumn()) as progress:
-        parent_task_id = progress.add_task("Overall Progress", total=len(jobs))
-        
-        # Group jobs by concurrency mode
-        concurrent_jobs = [(t, task, cmds) for t, task, cmds, task_conc in jobs if task_conc]
-        sequential_jobs = [(t, task, cmds) for t, task, cmds, task_conc in jobs if not task_conc]
+    workers = max_workers or default_workers()
+    shards.set_capacity(workers)
+    # Pre-flight: unreachable targets keep their passive jobs only
+    gate = liveness.active()
+    if gate is not None and gate.preflight and any(gate.active(t.text, tools_config) for _, templates, _ in plan for t in templates):
+        targets = _preflighted(targets, gate, workers, console)
+    # With --stream, consumers of a {shard} list leave their pass and start with its producer (see streaming.py)
+    run_plan, consumers = streaming.link(plan, wordlists) if streaming.enabled() else (plan, {})
+    jobs_per_target = sum(len(templates) for _, templates, _ in plan)
+    run_jobs_per_target = sum(len(templates) for _, templates, _ in run_plan)
+    with Progress(SpinnerColumn(), TextColumn("{task.description}"), BarColumn(), TimeElapsedColumn(), TimeRemainingColumn(), console=console) as progress:
+        # The total grows as targets are read
+        parent_task_id = progress.add_task("Overall Progress", total=0)
+        total = 0
+        failures = {}  # type: Dict[str, str]
         
-        # Run concurrent jobs
-        if concurrent_jobs:
-            with ThreadPoolExecutor() as executor:
-                futures = {
-                    executor.submit(run_task_for_target, t, task, cmds, output_dir, console, progress, parent_task_id, discord_webhook): (t, task)
-                    for t, task, cmds in concurrent_jobs
-                }
-                for future in as_completed(futures):
-                    try:
-                        future.result()
-                    except Exception as e:
-                        console.print(f"[red]Error in task {futures[future]}: {e}")
-        
-        # Run sequential jobs
-        for t, task, cmds in sequential_jobs:
-            run_task_for_target(t, task, cmds, output_dir, console, progress, parent_task_id, discord_webhook)
+        def submit(executor, job):
+            t, task, cmds, _ = job
+            return executor.submit(run_task_for_target, t, task, cmds, dir_for(t), console, progress, parent_task_id, discord_webhook, tools_config, wordlists)
+
+        def launch(t, task, template):
+            try:
+                run_task_for_target(t, task, [template], dir_for(t), console, progress, parent_task_id, discord_webhook, tools_config, wordlists)
+            except Exception as e:
+                console.print(f"[red]Error in task {(t, task)}: {e}")
+                failures.setdefault(t, str(e))
+
+        def finish_target(t):
+            # Consumers whose producer never started run on the whole list
+            for task, template in streaming.settle(t):
+                launch(t, task, template)
+            if on_target_done is not None:
+                try:
+                    on_target_done(t, failures.pop(t, None))
+                except Exception as e:
+                    console.print(f"[red]Error finishing {t}: {e}")
+
+        def run(pool):
+            # Targets are read once; each is finished as soon as its last job is done
+            remaining = {}  # type: Dict[str, int]
+            finishing = set()
+
+            def release(t):
+                future = pool.submit(finish_target, t)
+                finishing.add(future)
+                future.add_done_callback(finishing.discard)
+
+            def on_done(job, error):
+                if error is not None:
+                    failures.setdefault(job[0], str(error))
+                remaining[job[0]] -= 1
+                if not remaining[job[0]]:
+                    del remaining[job[0]]
+                    release(job[0])
+
+            def jobs():
+                nonlocal total
+                for t in targets:
+                    total += jobs_per_target
+                    progress.update(parent_task_id, total=total)
+                    # Output folders themselves are created lazily, by the commands writing into them
+                    prepare_output_dirs(dir_for(t), t, selected_tasks, lazy=True)
+                    if not run_jobs_per_target:
+                        release(t)
+                        continue
+                    remaining[t] = run_jobs_per_target
+                    # A target's sequential jobs come after its concurrent ones
+                    yield from iter_jobs([t], run_plan, concurrent_jobs=True)
+                    yield from iter_jobs([t], run_plan, concurrent_jobs=False)
+
+            _run_scheduled(pool, jobs(), workers, submit, console, dir_for, on_done)
+            wait(list(finishing))
+
+        streaming.attach(consumers, launch)
+        try:
+            if executor is not None:
+                run(executor)
+            else:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    run(pool)
+        finally:
+            streaming.finish()
 
 def deduplicate_subdomains(subdomain_files: list, output_file: str, console=None, sort_result=True):
     """Combine, deduplicate, and clean subdomain results from multiple files."""
     subdomains = set()
     for file in subdomain_files:
-        if os.path.isfile(file):
-            with open(file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line:
-                        subdomains.add(line)
+        for line in storage.iter_lines(file):
+            line = line.strip()
+            if line:
+                subdomains.add(line)
     if sort_result:
         subdomains = sorted(subdomains)
-    with open(output_file, 'w', encoding='utf-8') as f:
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    with storage.open_text(output_file, 'w') as f:
         for sub in subdomains:
             f.write(f"{sub}\n")
     if console:
         console.print(f"[green]Deduplicated subdomains saved to {output_file} ({len(subdomains)} unique)")
     return output_file
 
-def check_live_subdomains(input_file: str, output_file: str, console=None, tool_preference='httpx', status_codes=None):
-    """Check which subdomains are alive using httpx (preferred) or dnsx."""
+def check_live_subdomains(input_file: str, output_file: str, console=None, tool_preference='cyfer-probe', status_codes=None, tools_config=None):
+    """Check which subdomains are alive using the built-in prober (default), httpx or dnsx."""
     import shutil
-    if not os.path.isfile(input_file):
+    if not storage.exists(input_file):
         if console:
             console.print(f"[yellow]Input file {input_file} not found. Skipping live check.")
         return
     if status_codes is None:
         status_codes = [200, 301, 302, 403, 401]
-    # Prefer httpx
-    if tool_preference == 'httpx' and shutil.which('httpx'):
-        cmd = f"cat {input_file} | httpx -silent -status-code -o {output_file}"
+    codes = ','.join(str(c) for c in status_codes)
+    # The input list is split into parallel chunks when --shards is set
+    shard_input = input_file
+    if tool_preference == 'cyfer-probe':
+        cmd = f"cyfer-probe {shlex.quote(input_file)} -o {shlex.quote(output_file)} --format live"
         if status_codes:
-            codes = ','.join(str(c) for c in status_codes)
-            cmd = f"cat {input_file} | httpx -silent -status-code -o {output_file} -mc {codes}"
+            cmd = f"{cmd} --mc {codes}"
+        tool_used = 'cyfer-probe'
+    elif tool_preference == 'httpx' and shutil.which('httpx'):
+        cmd = f"cat {shlex.quote(input_file)} | httpx -silent -status-code -o {shlex.quote(output_file)}"
+        if status_codes:
+            cmd = f"{cmd} -mc {codes}"
         tool_used = 'httpx'
     elif shutil.which('dnsx'):
-        cmd = f"cat {input_file} | dnsx -silent -o {output_file}"
+        cmd = f"cat {shlex.quote(input_file)} | dnsx -silent -o {shlex.quote(output_file)}"
         tool_used = 'dnsx'
     else:
         if console:
             console.print("[yellow]Neither httpx nor dnsx found. Skipping live subdomain check.")
         return
+    cmd = apply_resolver(cmd, tools_config)
     try:
-        subprocess.run(cmd, shell=True, check=True)
+        process = shards.run_sharded(cmd, None, shard_input, lambda c, s: run_command(c, stages=s))
+        if process is None:
+            with shards.busy():
+                process = run_command(cmd)
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, cmd, process.stdout, process.stderr)
         if console:
             console.print(f"[green]Live subdomains checked with {tool_used}, results saved to {output_file}")
     except Exception as e:
         if console:
             console.print(f"[red]Error running {tool_used} for live subdomain check: {e}")
 
-def postprocess_subdomains(target_dir: str, console=None, skip_live_check=False, tool_preference='httpx', status_codes=None):
+def postprocess_subdomains(target_dir: str, console=None, skip_live_check=False, tool_preference='cyfer-probe', status_codes=None, tools_config=None):
     """Deduplicate and check live subdomains for a target directory."""
     # Find all subdomain output files
     subdomain_files = []
     subdomain_dir = os.path.join(target_dir, 'subdomains')
     if os.path.isdir(subdomain_dir):
-        for f in os.listdir(subdomain_dir):
+        # Compressed results (name.txt.gz) are read through their logical name
+        for f in sorted(set(storage.logical_path(f) for f in os.listdir(subdomain_dir))):
             if f.endswith('.txt'):
                 subdomain_files.append(os.path.join(subdomain_dir, f))
     # Add findomain, dnsx, etc. if present in main dir
     for f in ['findomain.txt', 'dnsx.txt']:
         fpath = os.path.join(subdomain_dir, f)
-        if os.path.isfile(fpath):
+        if storage.exists(fpath) and fpath not in subdomain_files:
             subdomain_files.append(fpath)
     unique_file = os.path.join(target_dir, 'unique_subdomains.txt')
-    deduplicate_subdomains(subdomain_files, unique_file, console=console)
+    with tracing.span('deduplicate subdomains', 'postprocess', target=os.path.basename(target_dir), files=len(subdomain_files)):
+        deduplicate_subdomains(subdomain_files, unique_file, console=console)
     if not skip_live_check:
         live_file = os.path.join(target_dir, 'live_subdomains.txt')
-        check_live_subdomains(unique_file, live_file, console=console, tool_preference=tool_preference, status_codes=status_codes)
+        with tracing.span(f"live check ({tool_preference})", 'postprocess', target=os.path.basename(target_dir)):
+            check_live_subdomains(unique_file, live_file, console=console, tool_preference=tool_preference, status_codes=status_codes,
+                                  tools_config=tools_config)
 
-def run_custom_commands(target: str, commands: List[str], output_dir: str, concurrent: bool, console: Any, wordlists: dict = None, dry_run: bool = False, discord_webhook: str = None) -> None:
+def run_custom_commands(target: str, commands: List[str], output_dir: str, concurrent: bool, console: Any, wordlists: dict = None, dry_run: bool = False, discord_webhook: str = None, tools_config: Dict[str, Any] = None) -> None:
     """
     Run custom commands for a target with progress bars.
     
@@ -271,36 +527,39 @@ def run_custom_commands(target: str, commands: List[str], output_dir: str, concu
         wordlists (dict, optional): Mapping of tool name to wordlist path. Defaults to None.
         dry_run (bool, optional): If True, print commands instead of running. Defaults to False.
         discord_webhook (str, optional): Discord webhook URL for notifications. Defaults to None.
+        tools_config (Dict[str, Any], optional): tools.json contents, used for per-tool settings such as proxy support. Defaults to None.
     """
     if wordlists is None:
         wordlists = {}
     
-    # Process commands and substitute placeholders
+    # Compile commands once and render them for this target
     processed_commands = []
     for cmd in commands:
-        # Replace target placeholder
-        cmd_processed = cmd.replace('{target}', target).replace('{output}', output_dir)
+        try:
+            template = compile_command(cmd)
+        except TemplateError as e:
+            console.print(f"[red]{e}")
+            continue
         
         # Handle wordlist placeholder
-        if "{wordlist}" in cmd_processed:
-            tool = cmd.split()[0]
-            wordlist = wordlists.get(tool)
-            if wordlist:
-                cmd_processed = cmd_processed.replace("{wordlist}", wordlist)
-            else:
-                console.print(f"[yellow]Warning: No wordlist configured for {tool}, skipping command.")
-                continue
+        wordlist = wordlists.get(template.tool)
+        if 'wordlist' in template.placeholders and not wordlist:
+            console.print(f"[yellow]Warning: No wordlist configured for {template.tool}, skipping command.")
+            continue
         
-        processed_commands.append(cmd_processed)
+        try:
+            processed_commands.append(template.render(target=target, output=output_dir, wordlist=wordlist or ''))
+        except TemplateError as e:
+            console.print(f"[red]{e}")
     
     if dry_run:
         console.print(f"[yellow]Dry run mode - commands for {target}:")
         for cmd in processed_commands:
-            console.print(f"[yellow]  {cmd}")
+            console.print(f"[yellow]  {cmd.command}")
         return
     
     # Execute commands
-    with Progress(SpinnerColumn(), TextColumn("{task.description}"), BarColumn(), TimeElapsedColumn(), TimeRemainingColumn()) as progress:
+    with Progress(SpinnerColumn(), TextColumn("{task.description}"), BarColumn(), TimeElapsedColumn(), TimeRemainingColumn(), console=console) as progress:
         parent_task_id = progress.add_task("Overall Progress", total=len(processed_commands))
         
         failed_cmds = []
@@ -308,48 +567,59 @@ def run_custom_commands(target: str, commands: List[str], output_dir: str, concu
         if concurrent:
             with ThreadPoolExecutor() as executor:
                 futures = {
-                    executor.submit(execute_single_command, cmd, output_dir, console, discord_webhook): cmd
+                    executor.submit(execute_single_command, cmd, output_dir, console, discord_webhook, tools_config): cmd
                     for cmd in processed_commands
                 }
                 for future in as_completed(futures):
                     try:
                         future.result()
                     except Exception as e:
-                        failed_cmds.append({"cmd": futures[future], "error": str(e)})
-                        console.print(f"[red]Error in command {futures[future]}: {e}")
+                        failed_cmds.append({"cmd": futures[future].command, "error": str(e)})
+                        console.print(f"[red]Error in command {futures[future].command}: {e}")
                     finally:
                         progress.advance(parent_task_id, 1)
         else:
             for cmd in processed_commands:
                 try:
-                    execute_single_command(cmd, output_dir, console, discord_webhook)
+                    execute_single_command(cmd, output_dir, console, discord_webhook, tools_config)
                 except Exception as e:
-                    failed_cmds.append({"cmd": cmd, "error": str(e)})
-                    console.print(f"[red]Error in command {cmd}: {e}")
+                    failed_cmds.append({"cmd": cmd.command, "error": str(e)})
+                    console.print(f"[red]Error in command {cmd.command}: {e}")
                 finally:
                     progress.advance(parent_task_id, 1)
         
         if failed_cmds and discord_webhook:
             send_discord_notification(discord_webhook, f"[ERROR] Failed commands for {target}: {failed_cmds}")
 
-def execute_single_command(cmd: str, output_dir: str, console: Any, discord_webhook: str = None) -> None:
-    """Execute a single command with error handling."""
+def execute_single_command(cmd: Union[str, Rendered], output_dir: str, console: Any, discord_webhook: str = None, tools_config: Dict[str, Any] = None) -> None:
+    """Execute a single command (a string or a rendered template) with error handling."""
+    rendered = cmd if isinstance(cmd, Rendered) else None
+    if rendered is not None:
+        cmd = rendered.command
     tool = cmd.split()[0]
     
     # Check if tool exists
     import shutil
-    if shutil.which(tool) is None:
+    if not is_builtin(tool) and shutil.which(tool) is None:
         error_msg = f"Tool '{tool}' not found in PATH."
         console.print(f"[red]{error_msg}")
         if discord_webhook:
             send_discord_notification(discord_webhook, f"[ERROR] {error_msg}")
         raise ToolNotFoundError(error_msg)
     
-    # Ensure output directory exists
-    os.makedirs(output_dir, exist_ok=True)
+    # Ensure output directory (and any folders the command writes into) exists
+    ensure_output_dirs(cmd, output_dir)
+    cmd = apply_resolver(cmd, tools_config)
+    cmd, env = apply_proxy(cmd, tools_config)
     
     try:
-        process = subprocess.run(cmd, shell=True, capture_output=True, text=True, cwd=output_dir)
+        with phase(f"tool: {tool}"), tracing.span(tool, 'job', task='custom', command=cmd) as trace, \
+                storage.plain_views(cmd, output_dir) as cmd_run, shards.busy():
+            stages = rendered.stages if rendered is not None and cmd_run == rendered.command else None
+            process = run_command(cmd_run, cwd=output_dir, env=env, stages=stages, limits=tool_limits(tools_config))
+            trace['exit_code'] = process.returncode
+        if getattr(process, 'limit_exceeded', None):
+            raise ResourceLimitError(tool, cmd, process.returncode, process.stdout, process.stderr, process.limit_exceeded)
         if process.returncode != 0:
             raise TaskExecutionError(tool, cmd, process.returncode, process.stdout, process.stderr)
     except TaskExecutionError as e:
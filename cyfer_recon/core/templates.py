@@ -0,0 +1,218 @@
+"""
+Precompiled command templates.
+
+A command from tasks.json (or a custom preset) is compiled once: output paths the runner redirects
+are rewritten, placeholders are checked against the known typed set and the command is split into
+pipeline tokens whose words are lists of literal and placeholder parts. Rendering for a target is
+then plain substitution into those parts; nothing is re-parsed and substituted values never become
+shell syntax. Targets must look like hosts, paths are passed as single argv words (and quoted when
+a command has to go through /bin/sh).
+"""
+import os
+import re
+import shlex
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Union
+
+from cyfer_recon.core.pipeline import Stage, parse_tokens, tokenize
+from cyfer_recon.core.utils import TemplateError
+
+# Placeholder name -> value type
+PLACEHOLDERS = {
+    'target': 'host',
+    'output': 'path',
+    'wordlist': 'path',
+    'wordlist_name': 'name',  # derived from {wordlist}, used for per-wordlist output names
+    'shard': 'marker',  # renders to nothing; marks the input list after it as splittable (see shards.py)
+}
+# Tools whose output file is named after the wordlist they ran with
+WORDLIST_OUTPUT_TOOLS = ('ffuf', 'gobuster', 'kiterunner')
+
+_PLACEHOLDER_RE = re.compile(r'\{([A-Za-z_][A-Za-z0-9_]*)\}')
+_HOST_VALUE_RE = re.compile(r'^[A-Za-z0-9_.\-:\[\]]+$')
+_NAME_VALUE_RE = re.compile(r'^[A-Za-z0-9_.\-]+$')
+_GLOB_SAFE_RE = re.compile(r'[^A-Za-z0-9_@%+=:,./*?\[\]-]')
+_SHARD_RE = re.compile(r'\{shard\}([^\s"\'<>|;&]+)')
+
+# A word is a tuple of parts: str for literal text, (name,) for a placeholder
+Part = Union[str, Tuple[str]]
+
+
+def get_tool_and_ext(cmd: str) -> Tuple[str, str]:
+    """Extract tool name and output file extension from a command string."""
+    tool = cmd.split()[0]
+    # Try to guess extension from command (default to .txt)
+    match = re.search(r'-o(?:N|G)?\s+([^\s]+)', cmd)
+    if match:
+        out_file = match.group(1)
+        ext = os.path.splitext(out_file)[1] or '.txt'
+    elif '>' in cmd:
+        # e.g. tool ... > file.ext
+        parts = cmd.split('>')
+        if len(parts) > 1:
+            ext = os.path.splitext(parts[1].strip())[1] or '.txt'
+        else:
+            ext = '.txt'
+    else:
+        ext = '.txt'
+    return tool, ext
+
+
+def _split_parts(text: str) -> Tuple[Part, ...]:
+    parts = []  # type: List[Part]
+    pos = 0
+    for m in _PLACEHOLDER_RE.finditer(text):
+        if m.start() > pos:
+            parts.append(text[pos:m.start()])
+        parts.append((m.group(1),))
+        pos = m.end()
+    if pos < len(text):
+        parts.append(text[pos:])
+    return tuple(parts)
+
+
+def _rewrite_outputs(cmd: str, result_name: str) -> str:
+    """Send outputs that do not already go to {output}/... to {output}/<result_name>."""
+    result = '{output}/' + result_name
+
+    def output_repl(m):
+        if m.group(2).strip('"\'').startswith('{output}'):
+            return m.group(0)
+        return m.group(1) + result
+    cmd = re.sub(r'(-o(?:N|G)?\s+)([^\s]+)', output_repl, cmd)
+    if '>' in cmd:
+        def redir_repl(m):
+            dest = m.group(2).strip('"\'')
+            if dest.startswith('{output}') or dest.startswith('&') or dest == '/dev/null':
+                return m.group(0)
+            return f'{m.group(1)} "{result}"'
+        cmd = re.sub(r'(?<![0-9&])(>>?)\s*([^\s]+)', redir_repl, cmd)
+    return cmd
+
+
+class Rendered:
+    """
+    A command rendered for one target: display/shell text plus pipeline stages when no shell is needed,
+    and the path of the input list marked with {shard}, if any.
+    """
+    __slots__ = ('command', 'stages', 'tool', 'shard_input')
+
+    def __init__(self, command: str, stages: Optional[List[Stage]], tool: str, shard_input: Optional[str] = None):
+        self.command = command
+        self.stages = stages
+        self.tool = tool
+        self.shard_input = shard_input
+
+    def __repr__(self):
+        return repr(self.command)
+
+
+class CommandTemplate:
+    """A command compiled once and rendered per target by substitution."""
+
+    def __init__(self, source: str, task: Optional[str] = None):
+        if not source or not source.strip():
+            raise TemplateError("Empty command")
+        self.source = source
+        self.tool, self.ext = get_tool_and_ext(source)
+        text = source
+        # Runner-side rewriting only applies to tasks.json commands (task given), not custom presets
+        if task is not None and '{wordlist}' in text and self.tool in WORDLIST_OUTPUT_TOOLS:
+            text = re.sub(r'(ffuf|gobuster|kiterunner)([^>]*)(-o\s*|>\s*)([^\s]+)',
+                          lambda m: f"{m.group(1)}{m.group(2)}{m.group(3)}{{output}}/{m.group(1)}_{{wordlist_name}}.txt",
+                          text, count=1)
+        if task is not None:
+            text = _rewrite_outputs(text, f"{self.tool}_{task.replace(' ', '_').lower()}_1{self.ext}")
+        unknown = sorted(set(_PLACEHOLDER_RE.findall(text)) - set(PLACEHOLDERS))
+        if unknown:
+            raise TemplateError(f"Unknown placeholder(s) {', '.join('{' + u + '}' for u in unknown)} in: {source}")
+        self.text = text
+        self.placeholders = frozenset(_PLACEHOLDER_RE.findall(text))
+        shard = _SHARD_RE.search(text)
+        self.shard_source = _split_parts(shard.group(1)) if shard else None  # type: Optional[Tuple[Part, ...]]
+        tokens = tokenize(text)
+        if tokens and parse_tokens(tokens) is not None:
+            # (kind, parts or operator, is_glob)
+            self.tokens = [(kind, _split_parts(value) if kind == 'word' else value, is_glob)
+                           for kind, value, is_glob in tokens]  # type: Optional[list]
+            self.segments = None  # type: Optional[Tuple[Part, ...]]
+        else:
+            # Needs a real shell (variables, loops, &&, ...): substitute into the text, quoting values
+            self.tokens = None
+            self.segments = _split_parts(text)
+
+    def __repr__(self):
+        return repr(self.source)
+
+    @property
+    def needs_shell(self) -> bool:
+        return self.tokens is None
+
+    def _values(self, values: Dict[str, str]) -> Dict[str, str]:
+        values = dict(values)
+        if values.get('wordlist') and 'wordlist_name' not in values:
+            values['wordlist_name'] = os.path.splitext(os.path.basename(values['wordlist']))[0]
+        values['shard'] = ''
+        for name in self.placeholders:
+            if PLACEHOLDERS[name] == 'marker':
+                continue
+            value = values.get(name)
+            if not value:
+                raise TemplateError(f"No value for {{{name}}} in: {self.source}")
+            kind = PLACEHOLDERS[name]
+            if kind == 'host' and not _HOST_VALUE_RE.match(value):
+                raise TemplateError(f"Invalid target {value!r}")
+            if kind == 'name' and not _NAME_VALUE_RE.match(value):
+                values[name] = re.sub(r'[^A-Za-z0-9_.\-]', '_', value)
+        return values
+
+    def render(self, **values: str) -> Rendered:
+        """Substitute placeholder values. Raises TemplateError for missing or invalid values."""
+        values = self._values(values)
+        shard_input = None
+        if self.shard_source is not None:
+            shard_input = ''.join(p if isinstance(p, str) else values[p[0]] for p in self.shard_source)
+        if self.tokens is None:
+            text = ''.join(p if isinstance(p, str) else _quote_value(values[p[0]]) for p in self.segments)
+            return Rendered(text, None, self.tool, shard_input)
+        tokens = []
+        words = []
+        for kind, value, is_glob in self.tokens:
+            if kind == 'op':
+                tokens.append((kind, value, False))
+                words.append(value)
+                continue
+            tokens.append((kind, ''.join(p if isinstance(p, str) else values[p[0]] for p in value), is_glob))
+            words.append(''.join(_quote_literal(p, is_glob) if isinstance(p, str) else _quote_value(values[p[0]])
+                                 for p in value))
+        return Rendered(' '.join(words), parse_tokens(tokens), self.tool, shard_input)
+
+
+def _quote_value(value: str) -> str:
+    # Markers render to nothing rather than to ''
+    return shlex.quote(value) if value else value
+
+
+def _quote_literal(text: str, is_glob: bool) -> str:
+    if not is_glob:
+        return shlex.quote(text) if text else text
+    # Keep wildcard characters active, escape anything else the shell would interpret
+    return _GLOB_SAFE_RE.sub(lambda m: '\\' + m.group(0), text)
+
+
+@lru_cache(maxsize=4096)
+def compile_command(cmd: str, task: Optional[str] = None) -> CommandTemplate:
+    """Compile (and cache) a command template. task enables the runner's output rewriting."""
+    return CommandTemplate(cmd, task)
+
+
+def compile_tasks(tasks_config: Dict[str, object]) -> Dict[str, List[CommandTemplate]]:
+    """Compile every command of tasks.json up front; raises TemplateError naming the bad task."""
+    compiled = {}
+    for task, task_config in tasks_config.items():
+        commands = task_config if isinstance(task_config, list) else task_config.get('commands', [])
+        try:
+            compiled[task] = [compile_command(cmd, task) for cmd in commands]
+        except TemplateError as e:
+            raise TemplateError(f"Task '{task}': {e}")
+    return compiled
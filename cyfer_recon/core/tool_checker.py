@@ -2,6 +2,8 @@ import os
 import shutil
 from typing import Dict, List, Any
 
+from cyfer_recon.core.builtins import builtin_requirements
+
 def check_tools(selected_tasks: List[str], tasks_config: Dict[str, Any], tools_config: Dict[str, Any]) -> Dict[str, str]:
     """
     Check for missing tools required by the selected tasks.
@@ -11,10 +13,13 @@ def check_tools(selected_tasks: List[str], tasks_config: Dict[str, Any], tools_c
     required_tools = set()
     for task in selected_tasks:
         commands = tasks_config.get(task, [])
+        if isinstance(commands, dict):
+            commands = commands.get('commands', [])
         for cmd in commands:
             tool = cmd.split()[0]
-            if tool in tools_config:
-                required_tools.add(tool)
+            for name in (tool,) + builtin_requirements(tool):
+                if name in tools_config:
+                    required_tools.add(name)
     missing = {}
     for tool in required_tools:
         check_val = tools_config[tool]['check']
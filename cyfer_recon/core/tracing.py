@@ -0,0 +1,124 @@
+"""
+Opt-in timeline tracing of a run (--trace).
+
+Job execution and post-processing steps are wrapped in `with span(name, category, **args):`. Without an
+active tracer this is a no-op; with one, every span becomes a complete event on the lane of the worker slot
+that ran it. A slot is claimed when a thread starts its outermost span and released when that span ends, so
+lanes show how many workers were busy at any moment. Spans nested on the same thread (a shard chunk inside its
+job) share their parent's lane. A "busy slots" counter track follows every claim and release.
+write() exports the Chrome trace-event JSON format, readable by chrome://tracing and ui.perfetto.dev.
+"""
+import heapq
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+_active = None  # type: Optional[Tracer]
+
+
+class Tracer:
+    """Collects span events per worker slot."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.wall_started = time.time()
+        self.events = []  # type: List[Dict[str, Any]]
+        self.slots = 0
+        self._lock = threading.Lock()
+        self._free = []  # type: List[int]  heap of released slot numbers
+        self._busy = 0
+        self._local = threading.local()
+
+    def _ts(self, moment: float) -> float:
+        return round((moment - self.started) * 1e6, 1)
+
+    def enter(self) -> Tuple[int, bool]:
+        """(slot, owned): the calling thread's slot, claiming the lowest free one for an outermost span."""
+        slot = getattr(self._local, 'slot', None)
+        if slot is not None:
+            return slot, False
+        with self._lock:
+            if self._free:
+                slot = heapq.heappop(self._free)
+            else:
+                slot = self.slots
+                self.slots += 1
+            self._busy += 1
+            self._counter(time.perf_counter())
+        self._local.slot = slot
+        return slot, True
+
+    def leave(self, name: str, category: str, slot: int, owned: bool, began: float, args: Dict[str, Any]) -> None:
+        ended = time.perf_counter()
+        event = {'name': name, 'cat': category, 'ph': 'X', 'pid': 1, 'tid': slot,
+                 'ts': self._ts(began), 'dur': round((ended - began) * 1e6, 1),
+                 'args': {k: v for k, v in args.items() if v is not None}}
+        with self._lock:
+            self.events.append(event)
+            if owned:
+                heapq.heappush(self._free, slot)
+                self._busy -= 1
+                self._counter(ended)
+        if owned:
+            self._local.slot = None
+
+    def _counter(self, moment: float) -> None:
+        # Called with the lock held
+        self.events.append({'name': 'busy slots', 'ph': 'C', 'pid': 1, 'ts': self._ts(moment), 'args': {'slots': self._busy}})
+
+    def trace(self) -> Dict[str, Any]:
+        meta = [{'name': 'process_name', 'ph': 'M', 'pid': 1, 'args': {'name': 'cyfer_recon'}}]
+        for slot in range(self.slots):
+            meta.append({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': slot, 'args': {'name': f"slot {slot}"}})
+            meta.append({'name': 'thread_sort_index', 'ph': 'M', 'pid': 1, 'tid': slot, 'args': {'sort_index': slot}})
+        with self._lock:
+            events = sorted(self.events, key=lambda e: e['ts'])
+        return {'traceEvents': meta + events, 'displayTimeUnit': 'ms',
+                'otherData': {'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.wall_started)),
+                              'slots': self.slots}}
+
+    def write(self, directory: str) -> str:
+        """Write cyfer_trace_<timestamp>.json into directory; returns its path."""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"cyfer_trace_{time.strftime('%Y%m%d-%H%M%S')}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.trace(), f)
+        return path
+
+
+def start() -> Tracer:
+    """Start the run-wide tracer; span() calls are recorded from now on."""
+    global _active
+    _active = Tracer()
+    return _active
+
+
+def stop() -> Optional[Tracer]:
+    """Detach and return the run-wide tracer (None if tracing was not started)."""
+    global _active
+    tracer, _active = _active, None
+    return tracer
+
+
+@contextmanager
+def span(name: str, category: str = 'job', **args: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Record the enclosed block as an event when tracing is active. Yields the args dict, so results
+    (exit code, ...) can be added before the block ends; an escaping exception is added as "error".
+    """
+    tracer = _active
+    if tracer is None:
+        yield args
+        return
+    slot, owned = tracer.enter()
+    began = time.perf_counter()
+    try:
+        yield args
+    except BaseException as e:
+        args['error'] = str(e) or type(e).__name__
+        raise
+    finally:
+        tracer.leave(name, category, slot, owned, began, args)
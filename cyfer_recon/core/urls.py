@@ -0,0 +1,109 @@
+"""
+Streaming URL normalization and pattern collapsing.
+
+gau, waybackurls and hakrawler dumps are dominated by near-duplicates: the same page with
+different parameter values, http vs https, static assets. collapse_url_files() canonicalizes
+every URL, drops static files and keeps one URL per (host, path, parameter names) signature.
+Only an 8-byte digest per signature is kept in memory, inputs are streamed line by line.
+"""
+import hashlib
+import os
+import posixpath
+import re
+from typing import Iterable, Iterator, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from cyfer_recon.core import storage
+
+STATIC_EXTENSIONS = frozenset((
+    '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico', '.bmp', '.webp', '.tif', '.tiff',
+    '.css', '.woff', '.woff2', '.ttf', '.eot', '.otf',
+    '.mp3', '.mp4', '.avi', '.mov', '.webm', '.flv', '.wav', '.ogg', '.m4a',
+    '.pdf', '.zip', '.gz', '.rar', '.7z', '.exe', '.dmg', '.iso',
+))
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+_HOST_RE = re.compile(r'^[a-z0-9_.\-:\[\]]+$')
+
+
+def normalize_url(url: str) -> Optional[str]:
+    """
+    Return a canonical form of url, or None if it is not an http(s) URL.
+    Lower-cases scheme and host, drops default ports, fragments and dot segments,
+    and sorts query parameters by name.
+    """
+    url = url.strip()
+    if not url:
+        return None
+    if '://' not in url:
+        url = 'http://' + url
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').rstrip('.')
+    if scheme not in DEFAULT_PORTS or not host or not _HOST_RE.match(host):
+        return None
+    if ':' in host:
+        host = f"[{host}]"
+    netloc = host if port in (None, DEFAULT_PORTS[scheme]) else f"{host}:{port}"
+    path = parts.path or '/'
+    while '//' in path:
+        path = path.replace('//', '/')
+    if '/.' in path:
+        trailing = path.endswith('/')
+        path = posixpath.normpath(path)
+        if trailing and path != '/':
+            path += '/'
+    params = sorted(parse_qsl(parts.query, keep_blank_values=True), key=lambda kv: kv[0])
+    return urlunsplit((scheme, netloc, path, urlencode(params, safe='/:,@$'), ''))
+
+
+def is_static(url: str) -> bool:
+    """True if the URL path ends in a static asset extension."""
+    path = urlsplit(url).path
+    return os.path.splitext(path)[1].lower() in STATIC_EXTENSIONS
+
+
+def url_signature(url: str) -> Tuple[str, str, Tuple[str, ...]]:
+    """(host, path, sorted parameter names): URLs sharing it only differ in parameter values or scheme."""
+    parts = urlsplit(url)
+    names = tuple(sorted(set(k for k, _ in parse_qsl(parts.query, keep_blank_values=True))))
+    return parts.netloc, parts.path, names
+
+
+def _digest(signature: Tuple[str, str, Tuple[str, ...]]) -> bytes:
+    key = '\x00'.join((signature[0], signature[1], '&'.join(signature[2])))
+    return hashlib.blake2b(key.encode('utf-8', 'surrogateescape'), digest_size=8).digest()
+
+
+def collapse_urls(urls: Iterable[str], keep_static: bool = False) -> Iterator[str]:
+    """Yield one normalized URL per signature, in input order."""
+    seen = set()  # type: Set[bytes]
+    for raw in urls:
+        url = normalize_url(raw)
+        if url is None or (not keep_static and is_static(url)):
+            continue
+        digest = _digest(url_signature(url))
+        if digest in seen:
+            continue
+        seen.add(digest)
+        yield url
+
+
+def _iter_lines(paths: Iterable[str]) -> Iterator[str]:
+    for path in paths:
+        yield from storage.iter_lines(path, errors='surrogateescape')
+
+
+def collapse_url_files(input_files: Iterable[str], output_file: str, keep_static: bool = False) -> int:
+    """Merge URL dumps into output_file with normalization and collapsing. Returns the number written."""
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    count = 0
+    with storage.open_text(output_file, 'w', errors='surrogateescape') as out:
+        for url in collapse_urls(_iter_lines(input_files), keep_static=keep_static):
+            out.write(url + '\n')
+            count += 1
+    return count
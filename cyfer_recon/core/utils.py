@@ -1,5 +1,8 @@
 import os
+import re
 import json
+import shlex
+import hashlib
 import tempfile
 import urllib.request
 import urllib.parse
@@ -17,11 +20,27 @@ def save_targets(targets: List[str], path: str = 'targets.txt') -> None:
         for t in targets:
             f.write(f"{t}\n")
 
-def prepare_output_dirs(base_dir: str, target: str, selected_tasks: List[str], extra_folders: Optional[List[str]] = None) -> str:
+def target_output_dir(target: str, output_root: Optional[str] = None, sharded: bool = False) -> str:
+    """
+    Return the output directory for a target under output_root (defaults to the current directory).
+    With sharded=True the folder is nested under two hash prefixes (root/ab/cd/target)
+    so very large target lists do not end up as one huge flat directory.
+    """
+    root = output_root or os.getcwd()
+    if sharded:
+        digest = hashlib.sha1(target.encode('utf-8')).hexdigest()
+        return os.path.join(root, digest[:2], digest[2:4], target)
+    return os.path.join(root, target)
+
+def prepare_output_dirs(base_dir: str, target: str, selected_tasks: List[str], extra_folders: Optional[List[str]] = None, lazy: bool = False) -> str:
     """
     Create the main output directory and subfolders for each task.
+    If lazy is True nothing is created up front; folders are made by ensure_output_dirs
+    when a command that writes to them actually runs.
     Returns the path to the output directory.
     """
+    if lazy:
+        return base_dir
     os.makedirs(base_dir, exist_ok=True)
     subfolders = [
         'subdomains', 'ports', 'screenshots', 'logs',
@@ -41,6 +60,58 @@ def prepare_output_dirs(base_dir: str, target: str, selected_tasks: List[str], e
         os.makedirs(os.path.join(base_dir, sub), exist_ok=True)
     return base_dir
 
+def ensure_output_dirs(cmd: str, output_dir: str) -> None:
+    """
+    Create the folders a rendered command refers to under output_dir.
+    Paths ending in a separator are created as directories, anything else gets its parent created.
+    The folder may appear shell-quoted in the command (rendered templates quote paths with spaces).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    prefixes = '|'.join(re.escape(p) for p in dict.fromkeys((shlex.quote(output_dir), output_dir)))
+    for match in re.finditer(r'(?:' + prefixes + r')([/\\][^\s"\'<>|;&]*)', cmd):
+        path = output_dir + match.group(1)
+        if path.endswith(('/', os.sep)):
+            os.makedirs(path, exist_ok=True)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+def set_tool_option(cmd: str, names, option: str, after=None) -> str:
+    """
+    Give every invocation of a tool in cmd the option "flag value", replacing the value if the flag is
+    already there. names are the tool's spellings (tools.json key and check binary). The option goes
+    right after the tool name, or after its subcommand when after names one (a string or a list);
+    invocations without such a subcommand are left alone.
+    """
+    flag, _, value = option.partition(' ')
+    subcommands = [after] if isinstance(after, str) else list(after or [])
+    sub_re = re.compile(r'\s(' + '|'.join(re.escape(s) for s in subcommands) + r')(?=\s|$)') if subcommands else None
+    existing_re = re.compile(r'(?<=\s)' + re.escape(flag) + r'(?:\s+|=)(\S+)')
+    for name in dict.fromkeys(names):
+        # Tool at the start of the command or of a pipeline stage / loop body
+        tool_re = re.compile(r'(^|[|;&]\s*|\bdo\s+)(' + re.escape(name) + r')(?=\s|$)')
+        pos = 0
+        while True:
+            match = tool_re.search(cmd, pos)
+            if not match:
+                break
+            stage_end = re.compile(r'[|;&]').search(cmd, match.end())
+            end = stage_end.start() if stage_end else len(cmd)
+            insert_at = match.end()
+            if sub_re is not None:
+                sub = sub_re.search(cmd, insert_at, end)
+                if not sub:
+                    pos = end
+                    continue
+                insert_at = sub.end(1)
+            before = len(cmd)
+            found = existing_re.search(cmd, insert_at, end)
+            if found:
+                cmd = cmd[:found.start(1)] + value + cmd[found.end(1):]
+            else:
+                cmd = f"{cmd[:insert_at]} {option}{cmd[insert_at:]}"
+            pos = end + len(cmd) - before
+    return cmd
+
 def list_files_in_folder(folder: str, extensions: Optional[List[str]] = None) -> List[str]:
     """List files in a folder, optionally filtering by extension(s)."""
     if not os.path.isdir(folder):
@@ -69,6 +140,10 @@ class ToolNotFoundError(Exception):
     """Exception raised when a required tool is not found."""
     pass
 
+class TemplateError(ValueError):
+    """Exception raised for invalid command templates or placeholder values."""
+    pass
+
 class TaskExecutionError(Exception):
     """Exception raised for errors during task execution."""
     def __init__(self, tool, cmd, exit_code, stdout, stderr):
@@ -79,6 +154,13 @@ class TaskExecutionError(Exception):
         self.stderr = stderr
         super().__init__(f"Error executing {tool}: {stderr}")
 
+class ResourceLimitError(TaskExecutionError):
+    """Exception raised when a tool is killed for exceeding its configured resource limits."""
+    def __init__(self, tool, cmd, exit_code, stdout, stderr, limit):
+        super().__init__(tool, cmd, exit_code, stdout, stderr)
+        self.limit = limit
+        self.args = (f"Resource limit hit, {limit}",)
+
 def send_discord_notification(webhook_url: str, message: str) -> None:
     """Send a notification to a Discord channel via webhook."""
     try:
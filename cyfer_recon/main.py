@@ -3,13 +3,30 @@ import typer
 from rich.console import Console
 from rich.panel import Panel
 import questionary
-from cyfer_recon.core.utils import load_targets, save_targets, prepare_output_dirs
+from cyfer_recon.core.utils import prepare_output_dirs, target_output_dir
+from cyfer_recon.core.targets import ScopeRules, iter_targets, record_targets
 from cyfer_recon.core.tool_checker import check_tools
-from cyfer_recon.core.task_runner import run_tasks, postprocess_subdomains, run_custom_commands
+from cyfer_recon.core.task_runner import build_plan, default_workers, run_tasks, postprocess_subdomains, run_custom_commands
+from cyfer_recon.core.dns_cache import parse_upstream, start_forwarder, stop_forwarder
+from cyfer_recon.core.http_cache import start_proxy, stop_proxy
+from cyfer_recon.core import history as job_history
+from cyfer_recon.core import shards as input_shards
+from cyfer_recon.core import manifest as artifact_manifest
+from cyfer_recon.core import probe as http_probe
+from cyfer_recon.core import liveness
+from cyfer_recon.core import streaming as stream_consumers
+from cyfer_recon.core import plan as execution_plan
+from cyfer_recon.core import profiling, storage, tracing
+from cyfer_recon.core.profiling import phase
+from cyfer_recon.core.daemon import DEFAULT_PORT, DEFAULT_QUEUE_DIR, JobStore, ScanConfig, ScanDaemon, make_server
+from cyfer_recon.core.limits import tool_limits
+from cyfer_recon.core.templates import compile_command, compile_tasks
+from cyfer_recon.core.utils import TemplateError
 import json
 import os
 import sys
 import glob
+import itertools
 import logging
 from typing import List, Optional
 from rich.table import Table
@@ -33,20 +50,19 @@ def load_json(path):
         return json.load(f)
 
 
-def prompt_targets():
+def prompt_targets(scope: Optional[ScopeRules] = None):
+    """Ask for targets and return a lazy iterator over them."""
     method = questionary.select(
         "How would you like to provide targets?",
         choices=["Enter manually", "Load from file"]
     ).ask()
     if method == "Enter manually":
         targets = questionary.text("Enter targets (comma or space separated):").ask()
-        targets = [t.strip() for t in targets.replace(',', ' ').split() if t.strip()]
-    else:
-        file_path = questionary.path("Path to targets file:").ask()
-        with open(file_path, 'r', encoding='utf-8') as f:
-            targets = [line.strip() for line in f if line.strip()]
-    save_targets(targets)
-    return targets
+        return iter_targets([targets or ''], scope)
+    file_path = questionary.path("Path to targets file:").ask()
+    if not file_path or not os.path.isfile(file_path):
+        raise FileNotFoundError(file_path)
+    return iter_targets([file_path], scope)
 
 
 # Utility: Validate config file existence and structure
@@ -100,6 +116,53 @@ def save_custom_presets(custom_presets):
     with open(CUSTOM_PRESETS_FILE, 'w', encoding='utf-8') as f:
         json.dump(data, f, indent=2)
 
+# Utility: Dry-run plan explain
+def format_duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+def explain_run(targets, plan, workers: int, wordlists: dict, tools_config: dict, output_root: Optional[str],
+                shard_output: bool, incremental: bool, plan_file: Optional[str]) -> None:
+    """Print the projected schedule of a run and write its JSON plan."""
+    pairs = ((t, target_output_dir(t, output_root, sharded=shard_output)) for t in targets)
+    data = execution_plan.build(pairs, plan, workers, wordlists, tools_config, incremental)
+    jobs = data['jobs']
+    table = Table(title="Execution Plan")
+    table.add_column("Metric", style="cyan")
+    table.add_column("Value", style="magenta")
+    table.add_row("Jobs", str(data['job_count']))
+    table.add_row("Workers", str(data['workers']))
+    table.add_row("Total work", format_duration(data['total_work_seconds']))
+    table.add_row("Projected makespan", format_duration(data['makespan_seconds']))
+    table.add_row("Critical path", f"{format_duration(data['critical_path']['seconds'])} ({len(data['critical_path']['jobs'])} jobs)")
+    table.add_row("Worker utilization", f"{data['utilization'] * 100:.0f}%")
+    console.print(table)
+    tools = Table(title="Estimated time by tool")
+    tools.add_column("Tool", style="cyan")
+    tools.add_column("Jobs")
+    tools.add_column("Time", style="magenta")
+    for row in data['by_tool'][:10]:
+        tools.add_row(row['tool'], str(row['jobs']), format_duration(row['seconds']))
+    console.print(tools)
+    console.print("[bold cyan]Critical path:[/bold cyan]")
+    for job_id in data['critical_path']['jobs'][:15]:
+        job = jobs[job_id]
+        console.print(f"  {format_duration(job['estimate_seconds']):>8}  {job['target']} - {job['task']}: {job['tool']}")
+    if len(data['critical_path']['jobs']) > 15:
+        console.print(f"  ... {len(data['critical_path']['jobs']) - 15} more")
+    for warning in data['warnings'][:5]:
+        console.print(f"[yellow]{warning}")
+    if len(data['warnings']) > 5:
+        console.print(f"[yellow]... {len(data['warnings']) - 5} more ordering warnings in the plan file")
+    path = plan_file or os.path.join(output_root or os.getcwd(), 'cyfer_plan.json')
+    execution_plan.write(data, path)
+    if path != '-':
+        console.print(f"[green]Plan written to {path}")
+
 @app.command()
 def version():
     """Show version information."""
@@ -142,21 +205,54 @@ def list_presets():
             console.print(f"    {i}. {cmd}")
 
 def cli(
-    targets: str = typer.Option(None, help="Comma-separated targets or path to file."),
+    targets: str = typer.Option(None, help="Comma-separated targets, path to file, or - for stdin. CIDRs and IP ranges are expanded."),
     setup_tools: bool = typer.Option(False, help="Automatically download and setup missing tools globally."),
     skip_live_check: bool = typer.Option(False, help="Skip live subdomain check after deduplication."),
-    live_check_tool: str = typer.Option('httpx', help="Tool to use for live subdomain check: httpx or dnsx."),
+    live_check_tool: str = typer.Option('cyfer-probe', help="Tool to use for live subdomain check: cyfer-probe (built-in), httpx or dnsx."),
     debug: bool = typer.Option(False, help="Enable debug logging."),
     dry_run: bool = typer.Option(False, help="Show what would be run, but do not execute commands."),
     preset: str = typer.Option(None, help="Run a specific preset by name (bypass menu)."),
     discord_webhook: str = typer.Option(None, help="Discord webhook URL for notifications."),
+    output_root: str = typer.Option(None, help="Root directory for per-target output (defaults to the current directory)."),
+    shard_output: bool = typer.Option(False, help="Nest target folders under hashed shard directories (root/ab/cd/target)."),
+    http_cache: bool = typer.Option(False, help="Route proxy-capable HTTP tools through a local caching proxy for this run."),
+    http_cache_ttl: int = typer.Option(3600, help="Seconds a cached HTTP response stays valid."),
+    http_cache_size: int = typer.Option(1024, help="Maximum size of the HTTP cache on disk, in MB."),
+    dns_cache: bool = typer.Option(False, help="Point resolver-capable tools at a local caching DNS forwarder for this run."),
+    dns_upstream: str = typer.Option(None, help="Upstream resolvers for --dns-cache (comma-separated or file; defaults to /etc/resolv.conf)."),
+    scope_include: str = typer.Option(None, help="Only scan targets matching these rules (comma-separated or file: domains, *.wildcards, CIDRs)."),
+    scope_exclude: str = typer.Option(None, help="Never scan targets matching these rules (comma-separated or file)."),
+    save_targets: str = typer.Option(None, help="Write the final, normalized target list to this file."),
+    compress: str = typer.Option(None, help="Compress bulky outputs: gzip or zstd (zstd needs the zstandard package, falls back to gzip)."),
+    compress_min_size: int = typer.Option(1024, help="Only compress outputs larger than this many KB."),
+    profile: bool = typer.Option(False, help="Time each orchestration phase and write a profile report into the output root."),
+    profile_python: bool = typer.Option(False, help="With --profile, also record cProfile and tracemalloc data (slower)."),
+    trace: bool = typer.Option(False, help="Record every job and post-processing step on a timeline and write a Chrome trace (Perfetto) JSON into the output root."),
+    use_history: bool = typer.Option(True, "--history/--no-history", help="Learn job durations across runs and start the longest jobs first."),
+    shards: int = typer.Option(1, help="Split {shard}-marked input lists (and the live check) into up to this many parallel chunks."),
+    incremental: bool = typer.Option(False, help="Skip commands whose inputs, command and tool are unchanged since their last successful run."),
+    incremental_max_age: int = typer.Option(None, help="With --incremental, re-run commands whose last run is older than this many seconds. Commands that read no files (they only query the live target) are skipped only with it."),
+    preflight: bool = typer.Option(False, help="Probe each target (DNS + TCP 443/80) before active jobs and skip the active jobs of unreachable ones."),
+    breaker_threshold: int = typer.Option(liveness.DEFAULT_BREAKER_THRESHOLD, help="Skip a target's remaining active jobs after this many consecutive connection failures (0 disables)."),
+    stream: bool = typer.Option(False, help="Start consumers of {shard}-marked lists with the command producing the list and feed them its new lines in micro-batches."),
+    stream_batch: int = typer.Option(stream_consumers.DEFAULT_BATCH_LINES, help="With --stream, lines per micro-batch."),
+    stream_interval: float = typer.Option(stream_consumers.DEFAULT_BATCH_SECONDS, help="With --stream, seconds before a smaller micro-batch is run anyway."),
+    workers: int = typer.Option(None, help="Worker threads for concurrent jobs (defaults to CPU count + 4, at most 32)."),
+    plan_file: str = typer.Option(None, help="With --dry-run, write the JSON plan here (- for stdout; defaults to cyfer_plan.json in the output root)."),
 ):
     if debug:
         logging.basicConfig(level=logging.DEBUG)
         logger.debug("Debug logging enabled.")
     else:
         logging.basicConfig(level=logging.INFO)
+    if dry_run and plan_file == '-':
+        # The JSON plan owns stdout; the banner, prompts and plan summary go to stderr
+        console.file = sys.stderr
     console.print(Panel(f"[bold cyan]Cybersecurity Recon Automation CLI Tool v{__version__}[/bold cyan]", expand=False))
+    if profile:
+        profiling.start(cpu=profile_python, memory=profile_python)
+    if trace and not dry_run:
+        tracing.start()
 
     # Platform check
     if sys.platform.startswith("win"):
@@ -165,36 +261,50 @@ def cli(
         console.print("[red]Unsupported platform. This tool is designed for Linux, macOS, or Windows (with WSL recommended). Exiting.")
         raise typer.Exit(1)
 
-    # 1. Collect targets
+    # 1. Collect targets (streamed: expanded, normalized, deduplicated and scope-filtered lazily)
+    scope = ScopeRules.from_options(scope_include, scope_exclude)
     if targets:
-        if os.path.isfile(targets):
-            try:
-                targets_list = load_targets(targets)
-            except Exception as e:
-                console.print(f"[red]Failed to load targets from file: {e}")
-                raise typer.Exit(1)
-        else:
-            targets_list = [t.strip() for t in targets.replace(',', ' ').split() if t.strip()]
-        save_targets(targets_list)
+        targets_iter = iter_targets([targets], scope)
     else:
         try:
-            targets_list = prompt_targets()
+            targets_iter = prompt_targets(scope)
         except FileNotFoundError as e:
             console.print(f"[red]File not found: {e}")
             raise typer.Exit(1)
         except Exception as e:
             console.print(f"[red]Error: {e}")
             raise typer.Exit(1)
-    if not targets_list:
+    try:
+        with phase("load targets (first)"):
+            first_target = next(targets_iter, None)
+    except OSError as e:
+        console.print(f"[red]Failed to load targets: {e}")
+        raise typer.Exit(1)
+    if first_target is None:
         console.print("[red]No targets provided. Exiting.")
         raise typer.Exit(1)
+    targets_list = itertools.chain([first_target], targets_iter)
+    if save_targets:
+        targets_list = record_targets(targets_list, save_targets)
 
     # 2. Load tasks and tools
-    tasks_config = validate_json_config(TASKS_FILE)
-    tools_config = validate_json_config(TOOLS_FILE)
-    task_names = list(tasks_config.keys())
-    presets = load_presets()
-    custom_presets = load_custom_presets()
+    with phase("load config"):
+        tasks_config = validate_json_config(TASKS_FILE)
+        tools_config = validate_json_config(TOOLS_FILE)
+        task_names = list(tasks_config.keys())
+        presets = load_presets()
+        custom_presets = load_custom_presets()
+        # Compile every command template once; bad placeholders are reported before anything runs
+        try:
+            compile_tasks(tasks_config)
+        except TemplateError as e:
+            console.print(f"[red]Invalid tasks.json: {e}")
+            raise typer.Exit(1)
+        try:
+            tool_limits(tools_config)
+        except ValueError as e:
+            console.print(f"[red]Invalid limits in tools.json: {e}")
+            raise typer.Exit(1)
     
     # Validate and sort presets
     valid_presets = {}
@@ -346,7 +456,8 @@ def cli(
     
     # 4. Tool check
     if selected_tasks:
-        missing_tools = check_tools(selected_tasks, tasks_config, tools_config)
+        with phase("check_tools"):
+            missing_tools = check_tools(selected_tasks, tasks_config, tools_config)
     else:
         # For custom presets, check tools from commands
         tools_to_check = []
@@ -405,93 +516,167 @@ def cli(
     ).ask()
     concurrent = exec_mode == "Concurrent"
 
-    # 5.5. Collect all output folders from tasks_config for selected_tasks and custom presets
-    import re
-    output_folders = set()
-    if selected_tasks:
-        for task in selected_tasks:
-            task_config = tasks_config[task]
-            commands = task_config if isinstance(task_config, list) else task_config.get("commands", [])
-            for cmd in commands:
-                matches = re.findall(r'\{output\}/([\w\-]+)/', cmd)
-                output_folders.update(matches)
-        # Add known folders from commands (e.g., js, gitdump, etc.)
-        for task in selected_tasks:
-            task_config = tasks_config[task]
-            commands = task_config if isinstance(task_config, list) else task_config.get("commands", [])
-            for cmd in commands:
-                if '{output}/js/' in cmd:
-                    output_folders.add('js')
-                if '{output}/gitdump/' in cmd:
-                    output_folders.add('gitdump')
-    elif selected_custom_preset:
-        for cmd in selected_custom_preset["commands"]:
-            matches = re.findall(r'\{output\}/([\w\-]+)/', cmd)
-            output_folders.update(matches)
-            if '{output}/js/' in cmd:
-                output_folders.add('js')
-            if '{output}/gitdump/' in cmd:
-                output_folders.add('gitdump')
-
-    # 6. Prepare output dirs and run tasks per target
-    summary = []
-    for target in targets_list:
-        output_dir = os.path.join(os.getcwd(), target)
+    # 5.5. Optional shared HTTP cache for the whole run
+    if http_cache and not dry_run:
+        proxy = start_proxy(ttl=http_cache_ttl, max_bytes=http_cache_size * 1024 * 1024)
+        console.print(f"[green]HTTP cache proxy listening on {proxy.url}")
+    if dns_cache and not dry_run:
+        upstreams = None
+        if dns_upstream:
+            if os.path.isfile(dns_upstream):
+                with open(dns_upstream, 'r', encoding='utf-8') as f:
+                    specs = [line.split('#')[0] for line in f]
+            else:
+                specs = dns_upstream.split(',')
+            upstreams = [parse_upstream(s) for s in specs if s.strip()]
+        forwarder = start_forwarder(upstreams)
+        console.print(f"[green]DNS cache listening on {forwarder.address} (upstreams: {', '.join(h for h, _ in forwarder.upstreams)})")
+
+    # 5.6. Optional compressed storage for bulky outputs
+    if compress:
+        try:
+            codec = storage.configure(compress.lower(), min_size=compress_min_size * 1024)
+        except ValueError as e:
+            console.print(f"[red]{e}")
+            raise typer.Exit(1)
+        if codec != compress.lower():
+            console.print(f"[yellow]zstandard is not installed, compressing with {codec} instead.")
+
+    # 5.7. Job duration history used to schedule long jobs first
+    if use_history and not dry_run:
+        job_history.start()
+
+    # 5.8. Input-list sharding for list-consuming scanners
+    input_shards.configure(shards)
+
+    # 5.9. Make-style re-runs from the per-target artifact manifest
+    artifact_manifest.configure(incremental, incremental_max_age)
+
+    # 5.10. Liveness gate: pre-flight probe and per-target circuit breaker for active jobs
+    liveness.configure(preflight=preflight, threshold=breaker_threshold)
+
+    # 5.11. Cross-task streaming: consumers of a {shard} list start on its producer's partial output
+    stream_consumers.configure(stream, batch_lines=stream_batch, batch_seconds=stream_interval)
+
+    # 5.12. Dry run: explain the plan (jobs, dependencies, estimates, critical path) instead of running it
+    if dry_run:
         if selected_tasks:
-            prepare_output_dirs(output_dir, target, selected_tasks, extra_folders=list(output_folders))
+            plan = build_plan(selected_tasks, tasks_config, concurrent, tool_wordlists, tools_config)
+        else:
+            templates = []
+            for cmd in selected_custom_preset["commands"]:
+                try:
+                    template = compile_command(cmd)
+                except TemplateError as e:
+                    console.print(f"[red]{e}")
+                    continue
+                if 'wordlist' not in template.placeholders or tool_wordlists.get(template.tool):
+                    templates.append(template)
+            plan = [("Custom commands", templates, concurrent)]
+        with phase("explain plan"):
+            explain_run(targets_list, plan, workers or default_workers(), tool_wordlists, tools_config,
+                        output_root, shard_output, incremental, plan_file)
+        profiler = profiling.stop()
+        if profiler is not None:
+            console.print(f"[cyan]Profile report written to {profiler.write_report(output_root or os.getcwd())}")
+        return
+
+    # 6. Prepare output dirs and run tasks
+    # Folders are created lazily by the runner, only when a command writes into them.
+    # Task presets schedule the jobs of all targets in one pool, each target writing into its own folder;
+    # every target is post-processed as soon as its last job is done.
+    summary = []
+    subdomain_run = bool(
+        (selected_tasks and any(task.lower().startswith('automated subdomain enumeration') for task in selected_tasks)) or
+        (selected_custom_preset and any('subfinder' in cmd or 'amass' in cmd for cmd in selected_custom_preset["commands"])))
+
+    def output_dir_for(target: str) -> str:
+        return target_output_dir(target, output_root, sharded=shard_output)
+
+    def finish_target(target: str, error: Optional[str]) -> None:
+        output_dir = output_dir_for(target)
+        if error is not None:
+            logger.error(f"Error running tasks for {target}: {error}")
+            summary.append((target, f"[red]Failed: {error}[/red]"))
         else:
-            prepare_output_dirs(output_dir, target, [], extra_folders=list(output_folders))
-        
-        try:
-            if selected_tasks:
-                # Run task-based preset
-                run_tasks(
-                    targets=[target],
-                    selected_tasks=selected_tasks,
-                    tasks_config=tasks_config,
-                    output_dir=output_dir,
-                    concurrent=concurrent,
-                    console=console,
-                    wordlists=tool_wordlists,
-                    dry_run=dry_run,
-                    discord_webhook=discord_webhook
-                )
-            else:
-                # Run custom command preset
-                run_custom_commands(
-                    target=target,
-                    commands=selected_custom_preset["commands"],
-                    output_dir=output_dir,
-                    concurrent=concurrent,
-                    console=console,
-                    wordlists=tool_wordlists,
-                    dry_run=dry_run,
-                    discord_webhook=discord_webhook
-                )
             summary.append((target, "[green]Success[/green]"))
-        except Exception as e:
-            logger.error(f"Error running tasks for {target}: {e}")
-            summary.append((target, f"[red]Failed: {e}[/red]"))
-        
+
         # Post-processing for subdomain enumeration
-        if selected_tasks and any(task.lower().startswith('automated subdomain enumeration') for task in selected_tasks):
+        if subdomain_run:
             from cyfer_recon.core.task_runner import postprocess_subdomains
-            postprocess_subdomains(
-                output_dir,
-                console=console,
-                skip_live_check=skip_live_check,
-                tool_preference=live_check_tool,
-                status_codes=[200, 301, 302, 403, 401]
-            )
-        elif selected_custom_preset and any('subfinder' in cmd or 'amass' in cmd for cmd in selected_custom_preset["commands"]):
-            from cyfer_recon.core.task_runner import postprocess_subdomains
-            postprocess_subdomains(
-                output_dir,
+            with phase("postprocess_subdomains"):
+                postprocess_subdomains(
+                    output_dir,
+                    console=console,
+                    skip_live_check=skip_live_check,
+                    tool_preference=live_check_tool,
+                    status_codes=[200, 301, 302, 403, 401],
+                    tools_config=tools_config
+                )
+
+        if storage.enabled() and not dry_run:
+            with phase("compress outputs"), tracing.span("compress outputs", 'postprocess', target=target):
+                count, saved = storage.compact_tree(output_dir)
+            if count:
+                console.print(f"[cyan]Compressed {count} output file(s) for {target}, saved {saved / (1024 * 1024):.1f} MB")
+
+    if selected_tasks:
+        # Run task-based preset
+        with phase("run_tasks"):
+            run_tasks(
+                targets=targets_list,
+                selected_tasks=selected_tasks,
+                tasks_config=tasks_config,
+                output_dir=output_dir_for,
+                concurrent=concurrent,
                 console=console,
-                skip_live_check=skip_live_check,
-                tool_preference=live_check_tool,
-                status_codes=[200, 301, 302, 403, 401]
+                wordlists=tool_wordlists,
+                dry_run=dry_run,
+                discord_webhook=discord_webhook,
+                tools_config=tools_config,
+                max_workers=workers,
+                on_target_done=finish_target
             )
+    else:
+        for target in targets_list:
+            output_dir = output_dir_for(target)
+            with phase("prepare_output_dirs"):
+                prepare_output_dirs(output_dir, target, [], lazy=True)
+            error = None
+            try:
+                # Run custom command preset
+                with phase("run_custom_commands"):
+                    run_custom_commands(
+                        target=target,
+                        commands=selected_custom_preset["commands"],
+                        output_dir=output_dir,
+                        concurrent=concurrent,
+                        console=console,
+                        wordlists=tool_wordlists,
+                        dry_run=dry_run,
+                        discord_webhook=discord_webhook,
+                        tools_config=tools_config
+                    )
+            except Exception as e:
+                error = str(e)
+            finish_target(target, error)
+
+    job_history.stop()
+    cache_stats = stop_proxy()
+    if cache_stats:
+        console.print(f"[cyan]HTTP cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['tunnels']} HTTPS tunnels")
+    dns_stats = stop_forwarder()
+    if dns_stats:
+        answered = dns_stats['hits'] + dns_stats['negative_hits']
+        rate = 100.0 * answered / dns_stats['queries'] if dns_stats['queries'] else 0.0
+        console.print(f"[cyan]DNS cache: {dns_stats['queries']} queries, {answered} from cache ({rate:.1f}%, "
+                      f"{dns_stats['negative_hits']} negative), {dns_stats['misses']} forwarded, "
+                      f"{dns_stats['coalesced']} coalesced, {dns_stats['upstream_timeouts']} upstream timeouts")
+    probe_stats = http_probe.stats()
+    if probe_stats:
+        console.print(f"[cyan]HTTP prober: {probe_stats['requests']} requests over {probe_stats['connections']} connections "
+                      f"({probe_stats['reused']} keep-alive reuses, {probe_stats['tls_resumed']} TLS sessions resumed), "
+                      f"{probe_stats['cached']} answered from earlier probes")
 
     # Show summary table
     table = Table(title="Recon Run Summary")
@@ -501,6 +686,65 @@ def cli(
         table.add_row(*row)
     console.print(table)
 
+    profiler = profiling.stop()
+    if profiler is not None:
+        report = profiler.write_report(output_root or os.getcwd())
+        console.print(f"[cyan]Profile report written to {report}")
+    tracer = tracing.stop()
+    if tracer is not None:
+        console.print(f"[cyan]Timeline trace written to {tracer.write(output_root or os.getcwd())} (open it in ui.perfetto.dev or chrome://tracing)")
+
+@app.command()
+def serve(
+    host: str = typer.Option('127.0.0.1', help="Address to listen on for the job API."),
+    port: int = typer.Option(DEFAULT_PORT, help="Port for the job API."),
+    socket: str = typer.Option(None, help="Listen on this Unix socket (owner-only) instead of host:port."),
+    output_root: str = typer.Option(None, help="Root directory for job results (defaults to the current directory)."),
+    queue_dir: str = typer.Option(DEFAULT_QUEUE_DIR, help="Directory holding the persistent job queue."),
+    workers: int = typer.Option(None, help="Size of the shared worker pool."),
+    scan_slots: int = typer.Option(2, help="Jobs run at the same time."),
+    skip_live_check: bool = typer.Option(False, help="Skip live subdomain check after deduplication."),
+    live_check_tool: str = typer.Option('cyfer-probe', help="Tool to use for live subdomain check: cyfer-probe (built-in), httpx or dnsx."),
+    discord_webhook: str = typer.Option(None, help="Discord webhook URL for notifications."),
+    use_history: bool = typer.Option(True, "--history/--no-history", help="Learn job durations across runs and start the longest jobs first."),
+    shards: int = typer.Option(1, help="Split {shard}-marked input lists (and the live check) into up to this many parallel chunks."),
+    incremental: bool = typer.Option(False, help="Skip commands whose inputs, command and tool are unchanged since their last successful run."),
+    incremental_max_age: int = typer.Option(None, help="With --incremental, re-run commands whose last run is older than this many seconds. Commands that read no files (they only query the live target) are skipped only with it."),
+    preflight: bool = typer.Option(False, help="Probe each target (DNS + TCP 443/80) before active jobs and skip the active jobs of unreachable ones."),
+    breaker_threshold: int = typer.Option(liveness.DEFAULT_BREAKER_THRESHOLD, help="Skip a target's remaining active jobs after this many consecutive connection failures (0 disables)."),
+):
+    """Run as a service that queues scan jobs submitted over a local HTTP API."""
+    tasks_config = validate_json_config(TASKS_FILE)
+    tools_config = validate_json_config(TOOLS_FILE)
+    try:
+        config = ScanConfig(tasks_config, tools_config, load_presets(), load_custom_presets(),
+                            load_json(os.path.join(CONFIG_DIR, 'wordlists.json')))
+    except (TemplateError, ValueError) as e:
+        console.print(f"[red]Invalid configuration: {e}")
+        raise typer.Exit(1)
+    if use_history:
+        job_history.start()
+    input_shards.configure(shards)
+    artifact_manifest.configure(incremental, incremental_max_age)
+    liveness.configure(preflight=preflight, threshold=breaker_threshold)
+    store = JobStore(queue_dir)
+    scan_daemon = ScanDaemon(config, store, os.path.abspath(output_root or os.getcwd()), workers=workers,
+                             scan_slots=scan_slots, skip_live_check=skip_live_check,
+                             live_check_tool=live_check_tool, discord_webhook=discord_webhook).start()
+    server = make_server(scan_daemon, host=host, port=port, socket_path=socket)
+    where = socket or f"http://{host}:{server.server_address[1]}"
+    console.print(f"[green]Cyfer Recon service listening on {where} ({scan_daemon.workers} workers, {scan_daemon.scan_slots} scan slots, "
+                  f"{store.counts().get('queued', 0)} queued job(s))")
+    console.print(f"[green]API token written to {server.token_file} (send it as 'Authorization: Bearer <token>')")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        console.print("[yellow]Shutting down; running jobs will be resumed on the next start.")
+    finally:
+        server.server_close()
+        scan_daemon.stop()
+        job_history.stop()
+
 @app.command()
 def notify_discord(webhook_url: str, message: str):
     """Send a custom notification to a Discord channel."""
@@ -696,6 +940,7 @@ Commands:
   cyfer-recon custom-preset-edit   # Edit command-based presets
   cyfer-recon wordlist-edit        # Edit tool-to-wordlist mapping
   cyfer-recon command-edit         # Edit task commands
+  cyfer-recon serve                # Run as a service with a local job API
   cyfer-recon help                 # Show this help menu
 
 Preset Types:
@@ -0,0 +1,107 @@
+import json
+import os
+
+import pytest
+
+import cyfer_recon
+from cyfer_recon.core import coalesce, task_runner
+from cyfer_recon.core.templates import CommandTemplate
+
+CONFIG = os.path.join(os.path.dirname(cyfer_recon.__file__), 'config')
+
+
+def _load(name):
+    with open(os.path.join(CONFIG, name), encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope='module')
+def tools():
+    return _load('tools.json')
+
+
+@pytest.fixture(scope='module')
+def shipped(tools):
+    tasks = _load('tasks.json')
+    return task_runner.build_plan(list(tasks), tasks, True, {}, tools)
+
+
+def _nuclei(plan):
+    # Piped commands name `cat` as their tool, so look for the scanner in the text
+    return {task: [t for t in templates if ' nuclei ' in f" {t.text} "] for task, templates, _ in plan
+            if any(' nuclei ' in f" {t.text} " for t in templates)}
+
+
+def test_shipped_nuclei_commands_with_the_same_input_are_merged(shipped):
+    nuclei = _nuclei(shipped)
+    merged = {task: t for task, templates in nuclei.items() for t in templates if isinstance(t, coalesce.CoalescedTemplate)}
+    # The merged command takes the place of the last command it replaces; the others are dropped
+    assert sorted(merged) == ['Automated CORS Misconfiguration Scan', 'Automated JavaScript Analysis',
+                              'Automated Open Redirect Detection']
+    assert 'Automated SSRF Discovery' not in nuclei and 'Automated LFI and RFI Detection' not in nuclei
+    cors = merged['Automated CORS Misconfiguration Scan'].text
+    assert cors.startswith('nuclei -u https://{target} -tags ssrf,cors -jsonl -omit-raw -o {output}/coalesced/nuclei_')
+    assert '-tags lfi,rfi,redirect' in merged['Automated Open Redirect Detection'].text
+    js = merged['Automated JavaScript Analysis'].text
+    assert js.startswith('cat {shard}{output}/js/live_output.txt | nuclei -c 30 '
+                         '-t nuclei-templates/http/exposures/tokens,nuclei-templates/http/exposures ')
+    # Different inputs or selector flags keep their own runs
+    for task in ('Automated API Recon', 'Automated Subdomain Takeover Detection', 'Automated Vulnerability Scanning'):
+        assert [type(t) for t in nuclei[task]] == [CommandTemplate]
+
+
+def test_commands_whose_output_is_read_elsewhere_are_kept(tools):
+    plan = [
+        ('CORS', [CommandTemplate('nuclei -u https://{target} -tags cors -o {output}/cors.txt')], True),
+        ('SSRF', [CommandTemplate('nuclei -u https://{target} -tags ssrf -o {output}/ssrf.txt'),
+                  CommandTemplate('cat {output}/ssrf.txt')], True),
+    ]
+    assert coalesce.optimize(plan, tools) is plan
+    # ...and commands only merge with commands of the same mode
+    plan[1] = ('SSRF', plan[1][1][:1], False)
+    assert coalesce.optimize(plan, tools) is plan
+
+
+def test_each_result_is_written_to_the_files_of_the_commands_that_asked_for_it(shipped, tmp_path):
+    merged = next(t for t in _nuclei(shipped)['Automated Open Redirect Detection']
+                  if isinstance(t, coalesce.CoalescedTemplate))
+    output = str(tmp_path)
+    results = [
+        {'template-id': 'open-redirect', 'type': 'http', 'info': {'severity': 'medium', 'tags': ['redirect', 'generic']},
+         'matched-at': 'http://example.com/?next=//evil'},
+        {'template-id': 'lfi-linux', 'type': 'http', 'info': {'severity': 'high', 'tags': 'lfi,linux'},
+         'matched-at': 'http://example.com/?file=../../etc/passwd'},
+        {'template-id': 'rfi-and-redirect', 'type': 'http', 'info': {'severity': 'low', 'tags': ['RFI', 'redirect']},
+         'matched-at': 'http://example.com/x'},
+    ]
+    result_file = merged.text.split(' -o ')[-1].replace('{output}', output)
+    os.makedirs(os.path.dirname(result_file))
+    with open(result_file, 'w') as f:
+        f.write('\n'.join(json.dumps(r) for r in results) + '\nnot json\n')
+    counts = merged.split(target='example.com', output=output)
+    lfi, redirects = tmp_path / 'lfi' / 'example.com_nuclei.txt', tmp_path / 'redirects' / 'example.com_nuclei.txt'
+    assert counts == {str(lfi): 2, str(redirects): 2}
+    assert lfi.read_text().splitlines() == [
+        '[lfi-linux] [http] [high] http://example.com/?file=../../etc/passwd',
+        '[rfi-and-redirect] [http] [low] http://example.com/x',
+    ]
+    assert redirects.read_text().splitlines() == [
+        '[open-redirect] [http] [medium] http://example.com/?next=//evil',
+        '[rfi-and-redirect] [http] [low] http://example.com/x',
+    ]
+    # A later run that finds nothing leaves no stale results behind
+    open(result_file, 'w').close()
+    assert merged.split(target='example.com', output=output) == {str(lfi): 0, str(redirects): 0}
+    assert lfi.read_text() == '' and redirects.read_text() == ''
+
+
+def test_path_selectors_match_template_directories(shipped, tmp_path):
+    merged = next(t for t in _nuclei(shipped)['Automated JavaScript Analysis'] if isinstance(t, coalesce.CoalescedTemplate))
+    result_file = merged.text.split(' -o ')[-1].replace('{output}', str(tmp_path))
+    os.makedirs(os.path.dirname(result_file))
+    with open(result_file, 'w') as f:
+        f.write(json.dumps({'template-id': 'aws-key', 'template-path': '/root/nuclei-templates/http/exposures/tokens/aws.yaml'}) + '\n')
+        f.write(json.dumps({'template-id': 'git-config', 'template-path': 'nuclei-templates/http/exposures/configs/git.yaml'}) + '\n')
+        f.write(json.dumps({'template-id': 'tokenizer', 'template-path': 'nuclei-templates/http/exposures/tokensmith.yaml'}) + '\n')
+    counts = merged.split(target='example.com', output=str(tmp_path))
+    assert counts == {str(tmp_path / 'js' / 'nuclei_creds.txt'): 1, str(tmp_path / 'js' / 'nuclei_exposures.txt'): 3}
@@ -0,0 +1,62 @@
+import http.client
+import json
+import os
+import stat
+import threading
+
+import pytest
+
+from cyfer_recon.core.daemon import JobStore, ScanConfig, ScanDaemon, make_server
+
+
+@pytest.fixture
+def api(tmp_path):
+    config = ScanConfig({}, {}, {}, {}, {})
+    daemon = ScanDaemon(config, JobStore(str(tmp_path / 'queue')), str(tmp_path / 'out'))
+    server = make_server(daemon, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    with open(server.token_file, encoding='utf-8') as f:
+        token = f.read().strip()
+    yield server, token
+    server.shutdown()
+    server.server_close()
+
+
+def _request(server, method, path, headers, body=None):
+    conn = http.client.HTTPConnection(*server.server_address, timeout=5)
+    conn.request(method, path, body=body, headers=headers)
+    resp = conn.getresponse()
+    resp.read()
+    conn.close()
+    return resp.status
+
+
+def test_token_file_is_owner_only_and_next_to_the_queue(api, tmp_path):
+    server, token = api
+    assert os.path.dirname(server.token_file) == str(tmp_path)
+    assert stat.S_IMODE(os.stat(server.token_file).st_mode) == 0o600
+    assert len(token) >= 32
+
+
+def test_requests_without_the_token_are_refused(api):
+    server, token = api
+    assert _request(server, 'GET', '/jobs', {}) == 401
+    assert _request(server, 'GET', '/jobs', {'Authorization': 'Bearer wrong'}) == 401
+    assert _request(server, 'GET', '/jobs', {'Authorization': f'Bearer {token}'}) == 200
+
+
+def test_browser_and_rebound_requests_are_refused(api):
+    server, token = api
+    auth = {'Authorization': f'Bearer {token}'}
+    assert _request(server, 'GET', '/health', dict(auth, Origin='https://evil.example')) == 403
+    assert _request(server, 'GET', '/health', dict(auth, Host='evil.example:8787')) == 403
+    assert _request(server, 'GET', '/health', dict(auth, Host='localhost:8787')) == 200
+
+
+def test_jobs_must_be_posted_as_json(api):
+    server, token = api
+    auth = {'Authorization': f'Bearer {token}'}
+    body = json.dumps({'targets': ['example.com'], 'tasks': ['nope']})
+    assert _request(server, 'POST', '/jobs', dict(auth, **{'Content-Type': 'text/plain'}), body) == 415
+    # Accepted as JSON, then rejected by job validation (unknown task)
+    assert _request(server, 'POST', '/jobs', dict(auth, **{'Content-Type': 'application/json'}), body) == 400
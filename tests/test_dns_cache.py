@@ -0,0 +1,49 @@
+import json
+import os
+import re
+from types import SimpleNamespace
+
+import pytest
+
+import cyfer_recon
+from cyfer_recon.core.dns_cache import apply_resolver
+
+CONFIG = os.path.join(os.path.dirname(cyfer_recon.__file__), 'config')
+FORWARDER = SimpleNamespace(address='127.0.0.1:5353', resolvers_file='/tmp/cyfer-resolvers.txt')
+
+
+def _load(name):
+    with open(os.path.join(CONFIG, name), encoding='utf-8') as f:
+        return json.load(f)
+
+
+TOOLS = _load('tools.json')
+COMMANDS = [cmd for task in _load('tasks.json').values() for cmd in task['commands']]
+
+
+def _flag(info):
+    return info['resolver'].replace('{resolvers_file}', FORWARDER.resolvers_file).replace('{resolver}', FORWARDER.address).split()
+
+
+@pytest.mark.parametrize('cmd', COMMANDS)
+def test_every_task_command_gets_the_flag_where_its_tool_accepts_it(cmd):
+    rendered = apply_resolver(cmd, TOOLS, FORWARDER)
+    for stage in re.split(r'[|;&]', rendered):
+        words = stage.split()
+        info = TOOLS.get(words[0]) if words else None
+        if not isinstance(info, dict) or not info.get('resolver'):
+            continue
+        flag = _flag(info)
+        at = words.index(info['resolver_after']) + 1 if info.get('resolver_after') else 1
+        assert words[at:at + len(flag)] == flag, rendered
+        assert words.count(flag[0]) == 1, rendered
+
+
+def test_amass_gets_the_flag_after_its_subcommand_only():
+    assert apply_resolver('amass enum -d example.com', TOOLS, FORWARDER) == 'amass enum -r 127.0.0.1:5353 -d example.com'
+    assert apply_resolver('amass intel -whois -d example.com', TOOLS, FORWARDER) == 'amass intel -whois -d example.com'
+
+
+def test_an_existing_resolver_value_is_replaced():
+    cmd = 'massdns -r resolvers.txt -t A -o S -w out.txt hosts.txt'
+    assert apply_resolver(cmd, TOOLS, FORWARDER) == cmd.replace('resolvers.txt', FORWARDER.resolvers_file, 1)
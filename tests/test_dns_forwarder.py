@@ -0,0 +1,183 @@
+import socket
+import socketserver
+import struct
+import threading
+
+import pytest
+
+from cyfer_recon.core.dns_cache import DnsForwarder, Message
+
+NXDOMAIN, SERVFAIL = 3, 2
+
+
+def _question(name, qtype=1):
+    return b''.join(bytes([len(p)]) + p.encode() for p in name.split('.')) + b'\x00' + struct.pack('!HH', qtype, 1)
+
+
+def _query(name, uid=0x1234):
+    return struct.pack('!HHHHHH', uid, 0x0100, 1, 0, 0, 0) + _question(name)
+
+
+def _a(ttl, last_octet):
+    return b'\xc0\x0c' + struct.pack('!HHIH', 1, 1, ttl, 4) + bytes([192, 0, 2, last_octet])
+
+
+def _soa(ttl, minimum):
+    rdata = b'\x00\x00' + struct.pack('!IIIII', 1, 3600, 600, 86400, minimum)
+    return b'\xc0\x0c' + struct.pack('!HHIH', 6, 1, ttl, len(rdata)) + rdata
+
+
+class _Upstream:
+    """Stub authoritative answers on 127.0.0.1, UDP and TCP on one port; records every question it gets."""
+
+    def __init__(self):
+        self.seen = []  # (protocol, name)
+        self.servfails = {'flaky.example.com': 1}
+        self.udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.udp.bind(('127.0.0.1', 0))
+        self.address = self.udp.getsockname()
+        upstream = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                size = struct.unpack('!H', self.request.recv(2))[0]
+                answer = upstream.answer(self.request.recv(size), 'tcp')
+                self.request.sendall(struct.pack('!H', len(answer)) + answer)
+        socketserver.TCPServer.allow_reuse_address = True
+        self.tcp = socketserver.ThreadingTCPServer(self.address, Handler)
+        threading.Thread(target=self.tcp.serve_forever, daemon=True).start()
+        threading.Thread(target=self._serve_udp, daemon=True).start()
+
+    def _serve_udp(self):
+        while True:
+            try:
+                query, client = self.udp.recvfrom(65535)
+            except OSError:
+                return
+            answer = self.answer(query, 'udp')
+            delay = 0.3 if Message(query).qname.startswith('slow.') else 0
+            threading.Timer(delay, self.udp.sendto, (answer, client)).start()
+
+    def answer(self, query, protocol):
+        message = Message(query)
+        name = message.qname
+        self.seen.append((protocol, name))
+        rcode, answers, authority = 0, [], []
+        if self.servfails.get(name):
+            self.servfails[name] -= 1
+            rcode = SERVFAIL
+        elif name.startswith('nx.'):
+            rcode, authority = NXDOMAIN, [_soa(600, 30)]
+        elif name.startswith('big.'):
+            answers = [_a(300, i) for i in range(40)]
+        else:
+            answers = [_a(300, 1)]
+        flags = 0x8180 | rcode
+        if protocol == 'udp' and sum(map(len, answers)) > 400:
+            flags, answers = flags | 0x0200, []
+        header = struct.pack('!HHHHHH', message.id, flags, 1, len(answers), len(authority), 0)
+        return header + query[12:message.question_end] + b''.join(answers + authority)
+
+    def close(self):
+        self.tcp.shutdown()
+        self.tcp.server_close()
+        self.udp.close()
+
+
+@pytest.fixture
+def dns():
+    upstream = _Upstream()
+    # Listed twice, so a SERVFAIL is retried "on the next upstream"
+    forwarder = DnsForwarder([upstream.address, upstream.address], timeout=1.0).start()
+    yield forwarder, upstream
+    forwarder.stop()
+    upstream.close()
+
+
+def _ask(forwarder, name, uid=0x1234):
+    host, port = forwarder.address.rsplit(':', 1)
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.settimeout(5)
+        sock.sendto(_query(name, uid), (host, int(port)))
+        data = sock.recv(65535)
+    return Message(data), data
+
+
+def _ask_tcp(forwarder, name):
+    host, port = forwarder.address.rsplit(':', 1)
+    with socket.create_connection((host, int(port)), timeout=5) as sock:
+        query = _query(name)
+        sock.sendall(struct.pack('!H', len(query)) + query)
+        size = struct.unpack('!H', sock.recv(2))[0]
+        data = b''
+        while len(data) < size:
+            data += sock.recv(size - len(data))
+    return Message(data)
+
+
+def _age(forwarder, name, seconds):
+    for key, entry in forwarder._cache.items():
+        if key[0] == name:
+            entry.stored -= seconds
+            entry.expires -= seconds
+
+
+def test_repeated_questions_are_answered_from_the_cache(dns):
+    forwarder, upstream = dns
+    first, _ = _ask(forwarder, 'www.example.com', uid=1)
+    again, _ = _ask(forwarder, 'WWW.example.com', uid=2)
+    assert (first.id, again.id) == (1, 2)
+    assert first.counts[0] == again.counts[0] == 1
+    assert upstream.seen == [('udp', 'www.example.com')]
+    assert forwarder.stats['hits'] == 1 and forwarder.stats['misses'] == 1
+
+
+def test_cached_ttls_count_down(dns):
+    forwarder, _ = dns
+    _ask(forwarder, 'www.example.com')
+    _age(forwarder, 'www.example.com', 100)
+    message, _ = _ask(forwarder, 'www.example.com')
+    assert [ttl for section, _, ttl, *_ in message.records if section == 0] == [200]
+
+
+def test_nxdomain_is_cached_for_the_soa_minimum(dns):
+    forwarder, upstream = dns
+    assert _ask(forwarder, 'nx.example.com')[0].rcode == NXDOMAIN
+    assert _ask(forwarder, 'nx.example.com')[0].rcode == NXDOMAIN
+    assert forwarder.stats['negative_hits'] == 1 and len(upstream.seen) == 1
+    _age(forwarder, 'nx.example.com', 31)
+    _ask(forwarder, 'nx.example.com')
+    assert len(upstream.seen) == 2
+
+
+def test_identical_questions_in_flight_are_sent_upstream_once(dns):
+    forwarder, upstream = dns
+    answers = []
+    threads = [threading.Thread(target=lambda i=i: answers.append(_ask(forwarder, 'slow.example.com', uid=i)[0].id))
+               for i in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(answers) == [0, 1, 2]
+    assert upstream.seen == [('udp', 'slow.example.com')]
+    assert forwarder.stats['coalesced'] == 2
+
+
+def test_servfail_is_retried_on_the_next_upstream(dns):
+    forwarder, upstream = dns
+    message, _ = _ask(forwarder, 'flaky.example.com')
+    assert message.rcode == 0 and message.counts[0] == 1
+    assert upstream.seen == [('udp', 'flaky.example.com')] * 2
+
+
+def test_truncated_answers_are_fetched_again_over_tcp(dns):
+    forwarder, upstream = dns
+    message, data = _ask(forwarder, 'big.example.com')
+    assert message.truncated and message.counts[0] == 0
+    full = _ask_tcp(forwarder, 'big.example.com')
+    assert not full.truncated and full.counts[0] == 40
+    assert upstream.seen == [('udp', 'big.example.com'), ('tcp', 'big.example.com')]
+    # The full answer is cached; a UDP client still gets it truncated to its 512 bytes
+    assert _ask(forwarder, 'big.example.com')[0].truncated
+    assert forwarder.stats['tcp'] == 1 and len(upstream.seen) == 2
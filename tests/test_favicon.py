@@ -0,0 +1,76 @@
+import base64
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from cyfer_recon.core import favicon
+
+# Both bodies are long enough for base64.encodebytes to wrap lines, as Shodan hashes them
+DECLARED = b'\x89PNG\r\n\x1a\n' + bytes(range(256))
+DEFAULT = b'\x00\x00\x01\x00' + bytes(range(255, -1, -1)) * 2
+
+
+class _Site(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    icon_hits = 0
+
+    def do_GET(self):
+        if self.path in ('/', '/index'):
+            body, ctype = b'<html><head><link rel="shortcut icon" href="/static/logo.png"></head></html>', 'text/html'
+        elif self.path == '/static/logo.png':
+            type(self).icon_hits += 1
+            body, ctype = DECLARED, 'image/png'
+        elif self.path == '/favicon.ico':
+            body, ctype = DEFAULT, 'image/x-icon'
+        else:
+            body, ctype = b'<html>not found</html>', 'text/html'
+        self.send_response(200)
+        self.send_header('Content-Type', ctype)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def site(monkeypatch):
+    monkeypatch.setattr(favicon, '_fetched', {})
+    monkeypatch.setattr(favicon, '_hashes', None)
+    _Site.icon_hits = 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Site)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _expected(content, url):
+    return f"{favicon.murmur3_32(base64.encodebytes(content))} {hashlib.md5(content).hexdigest()} {url}"
+
+
+def test_murmur3_matches_the_reference_vectors():
+    assert favicon.murmur3_32(b'') == 0
+    assert favicon.murmur3_32(b'hello') == 613153351
+    assert favicon.murmur3_32(b'The quick brown fox jumps over the lazy dog') == 0x2e4ff723
+
+
+def test_declared_and_default_icons_are_hashed(site, tmp_path):
+    out = tmp_path / 'favicons.txt'
+    stats = favicon.hash_favicons([site], str(out), cache_file=str(tmp_path / 'hashes.json'))
+    assert out.read_text().splitlines() == [
+        _expected(DECLARED, f"{site}/static/logo.png"),
+        _expected(DEFAULT, f"{site}/favicon.ico"),
+    ]
+    assert stats == {'hosts': 1, 'unreachable': 0, 'icons': 2, 'unique': 2, 'fetched': 2}
+    assert (tmp_path / 'hashes.json').exists()
+
+
+def test_a_shared_icon_url_is_fetched_once(site, tmp_path):
+    hosts = tmp_path / 'hosts.txt'
+    hosts.write_text(f"{site}/ [200]\n{site}/index\n")
+    favicon.hash_favicons([str(hosts)], str(tmp_path / 'favicons.txt'), cache_file=str(tmp_path / 'hashes.json'))
+    assert _Site.icon_hits == 1
@@ -0,0 +1,122 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from cyfer_recon.core import fingerprint
+from cyfer_recon.core.fingerprint import Signatures, required_literal
+
+PAGE = '''<html><head>
+<meta name="generator" content="WordPress 6.4.2">
+<link rel="stylesheet" href="https://example.com/wp-content/themes/x/style.css">
+<script src="https://example.com/wp-includes/js/jquery/jquery-3.6.0.min.js"></script>
+</head><body>Powered by nothing in particular</body></html>'''
+HEADERS = [('Server', 'openresty/1.21.4.1'), ('CF-RAY', '8a1b2c3d4e5f-AMS'), ('Set-Cookie', 'PHPSESSID=abc; path=/')]
+
+
+@pytest.fixture
+def shipped(monkeypatch, tmp_path):
+    # A user's ~/.cyfer_recon/technologies.json must not change the results
+    monkeypatch.setattr(fingerprint, 'USER_SIGNATURES', str(tmp_path / 'missing.json'))
+    return fingerprint.load_signatures()
+
+
+@pytest.mark.parametrize('pattern, literal', [
+    (r'nginx(?:/([\d.]+))?', 'nginx'),
+    (r'jquery[.-]([\d.]*\d)[^/]*\.js', 'jquery'),
+    (r'/xmlrpc\.php$', '/xmlrpc.php'),
+    (r'^Microsoft-IIS', 'microsoft-iis'),
+    (r'wp-contents?/', 'wp-content'),
+    (r'(?:Apache|HTTPD)', None),
+    (r'drupal|joomla', None),
+    (r'ab', None),
+])
+def test_required_literals(pattern, literal):
+    assert required_literal(pattern) == literal
+
+
+def _brute_force(matcher, text):
+    patterns = list(matcher.always) + [p for ps in matcher.by_literal.values() for p in ps]
+    return {p.tech for p in patterns if p.regex.search(text)}
+
+
+def test_the_prefilter_finds_every_pattern_a_full_scan_finds(shipped):
+    texts = [PAGE, 'https://example.com/index.php?id=1', 'openresty/1.21.4.1', 'Apache/2.4.57 (Debian)',
+             'Microsoft-IIS/10.0', 'cloudflare', '/assets/jquery.min.js', 'PHP/8.2.1', '']
+    matchers = list(shipped.text.values()) + [m for by_key in shipped.keyed.values() for m in by_key.values()]
+    for matcher in matchers:
+        for text in texts:
+            assert {tech for tech, _, _ in matcher.match(text)} == _brute_force(matcher, text)
+
+
+def test_shipped_signatures_detect_versions_and_implied_technologies(shipped):
+    found = {t['name']: t for t in shipped.analyze({'url': 'https://example.com/', 'headers': HEADERS, 'body': PAGE})}
+    assert {name: t['version'] for name, t in found.items()} == {
+        'Cloudflare': None, 'Nginx': None, 'OpenResty': '1.21.4.1', 'PHP': None, 'MySQL': None,
+        'WordPress': '6.4.2', 'jQuery': '3.6.0'}
+    assert found['WordPress']['categories'] and found['WordPress']['website'] == 'https://wordpress.org'
+
+
+def test_confidence_adds_up_and_excludes_win():
+    signatures = Signatures({
+        'Alpha': {'html': ['alpha\\;confidence:40', 'beta\\;confidence:30'], 'excludes': 'Gamma'},
+        'Gamma': {'html': 'gamma'},
+        'Delta': {'headers': {'x-delta': 'v(\\d+)\\;version:\\1'}, 'implies': 'Epsilon\\;confidence:50'},
+        'Epsilon': {},
+    }, {})
+    found = signatures.analyze({'url': '', 'headers': [('X-Delta', 'v7')], 'body': 'alpha beta gamma'})
+    assert [(t['name'], t['version'], t['confidence']) for t in found] == [
+        ('Alpha', None, 70), ('Delta', '7', 100), ('Epsilon', None, 50)]
+
+
+def test_later_signature_files_override_earlier_ones(monkeypatch, tmp_path):
+    monkeypatch.setattr(fingerprint, 'USER_SIGNATURES', str(tmp_path / 'missing.json'))
+    extra = tmp_path / 'sigs'
+    extra.mkdir()
+    (extra / 'categories.json').write_text(json.dumps({'99': {'name': 'Internal'}}))
+    (extra / 'n.json').write_text(json.dumps({'Nginx': {'cats': [99], 'html': 'internal-nginx-banner'}}))
+    compiled = fingerprint.load_signatures([str(extra)])
+    assert compiled is fingerprint.load_signatures([str(extra)])
+    found = compiled.analyze({'url': '', 'headers': [('Server', 'nginx')], 'body': 'internal-nginx-banner'})
+    assert [(t['name'], t['categories']) for t in found] == [('Nginx', ['Internal'])]
+    assert compiled.analyze({'url': '', 'headers': [('Server', 'nginx')], 'body': ''}) == []
+
+
+class _Site(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def version_string(self):
+        return dict(HEADERS)['Server']
+
+    def do_GET(self):
+        body = PAGE.encode()
+        self.send_response(200)
+        for name, value in HEADERS:
+            if name != 'Server':
+                self.send_header(name, value)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_listed_hosts_are_deduplicated_fetched_and_reported(shipped, tmp_path):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Site)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/"
+        hosts = tmp_path / 'alive.txt'
+        hosts.write_text(f"{url} [200] [text/html]\n{url}\n{url}\n\n")
+        report = tmp_path / 'tech' / 'report.json'
+        counts = fingerprint.fingerprint_hosts([str(hosts), str(tmp_path / 'missing.txt')], str(report), processes=1)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert counts == {'hosts': 2, 'reachable': 2, 'technologies': 7, 'detections': 14}
+    data = json.loads(report.read_text())
+    assert [h['server'] for h in data['hosts']] == ['openresty/1.21.4.1'] * 2
+    assert data['technologies']['WordPress'] == 2
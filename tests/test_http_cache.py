@@ -0,0 +1,89 @@
+import http.client
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from cyfer_recon.core.http_cache import CachingProxy, DiskCache, apply_proxy
+
+
+class _Origin(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    hits = 0
+
+    def do_GET(self):
+        type(self).hits += 1
+        body = f"origin={self.headers.get('Origin')} host={self.headers.get('Host')}".encode()
+        self.send_response(200)
+        self.send_header('Access-Control-Allow-Origin', self.headers.get('Origin') or '*')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def servers(tmp_path):
+    _Origin.hits = 0
+    origin = ThreadingHTTPServer(('127.0.0.1', 0), _Origin)
+    threading.Thread(target=origin.serve_forever, daemon=True).start()
+    proxy = CachingProxy(DiskCache(str(tmp_path / 'cache'))).start()
+    yield f"http://127.0.0.1:{origin.server_address[1]}/page", proxy
+    proxy.stop()
+    origin.shutdown()
+    origin.server_close()
+
+
+def _get(proxy, url, headers):
+    conn = http.client.HTTPConnection(*proxy.server_address, timeout=5)
+    conn.request('GET', url, headers=headers)
+    resp = conn.getresponse()
+    result = resp.getheader('Access-Control-Allow-Origin'), resp.read().decode()
+    conn.close()
+    return result
+
+
+def test_origin_header_is_part_of_the_cache_key(servers):
+    url, proxy = servers
+    assert _get(proxy, url, {'Origin': 'https://app.example'})[0] == 'https://app.example'
+    assert _get(proxy, url, {'Origin': 'https://evil.example'})[0] == 'https://evil.example'
+    # The same request again is served from the cache
+    assert _get(proxy, url, {'Origin': 'https://evil.example'})[0] == 'https://evil.example'
+    assert _Origin.hits == 2
+    assert proxy.stats['hits'] == 1
+
+
+def test_crafted_host_header_is_forwarded_and_not_served_from_cache(servers):
+    url, proxy = servers
+    assert 'host=127.0.0.1' in _get(proxy, url, {})[1]
+    assert 'host=evil.example' in _get(proxy, url, {'Host': 'evil.example'})[1]
+    assert _Origin.hits == 2
+
+
+def test_tools_sending_their_own_user_agent_share_entries(servers):
+    url, proxy = servers
+    _get(proxy, url, {'User-Agent': 'httpx'})
+    _get(proxy, url, {'User-Agent': 'nuclei'})
+    assert _Origin.hits == 1
+    assert proxy.stats['hits'] == 1
+
+
+TOOLS = {
+    'dalfox': {'check': 'dalfox', 'proxy': '--proxy {proxy}', 'proxy_after': ['file', 'url']},
+    'nuclei': {'check': 'nuclei', 'proxy': '-proxy {proxy}'},
+    'hakrawler': {'check': 'hakrawler-bin', 'proxy': '-proxy {proxy}'},
+}
+PROXY = 'http://127.0.0.1:3128'
+
+
+@pytest.mark.parametrize('cmd, expected', [
+    ('dalfox file params.txt -o out.txt', f'dalfox file --proxy {PROXY} params.txt -o out.txt'),
+    ('nuclei -proxy http://old:8080 -u https://example.com', f'nuclei -proxy {PROXY} -u https://example.com'),
+    ('cat hosts.txt | nuclei -l - | nuclei -t x', f'cat hosts.txt | nuclei -proxy {PROXY} -l - | nuclei -proxy {PROXY} -t x'),
+    ('hakrawler-bin -url https://example.com', f'hakrawler-bin -proxy {PROXY} -url https://example.com'),
+    ('dalfox version', 'dalfox version'),
+])
+def test_apply_proxy_places_the_flag_where_the_tool_accepts_it(cmd, expected):
+    assert apply_proxy(cmd, TOOLS, PROXY) == (expected, None)
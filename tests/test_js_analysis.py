@@ -0,0 +1,79 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from cyfer_recon.core import js_analysis
+from cyfer_recon.core.http_client import HttpClient
+
+APP_JS = b'''fetch("/api/users");
+var cfg = '/admin/config.json';
+const apiKey = "AKIA123";
+localStorage.setItem("session", token);
+'''
+
+
+class _Scripts(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        # /app.js and /copy.js serve the same body; it is scanned once
+        body, status = (APP_JS, 200) if self.path in ('/app.js', '/copy.js') else (b'', 404)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/javascript')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def urls_file(tmp_path):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Scripts)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    path = tmp_path / 'js_urls.txt'
+    path.write_text(f"{base}/app.js [200]\n{base}/copy.js\n{base}/missing.js\n{base}/app.js\n")
+    yield str(path)
+    server.shutdown()
+    server.server_close()
+
+
+def _lines(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read().splitlines()
+
+
+def test_endpoints_and_secrets_are_written(urls_file, tmp_path):
+    out = tmp_path / 'js'
+    stats = js_analysis.analyze_js_urls(urls_file, str(out), workers=4)
+    assert stats == {'fetched': 3, 'failed': 0, 'unique': 1, 'endpoints': 2, 'secrets': 2}
+    assert _lines(out / 'linkfinder_endpoints.txt') == ['/api/users', '/admin/config.json']
+    assert _lines(out / 'linkfinder_api_endpoints.txt') == ['/api/users']
+    assert _lines(out / 'linkfinder_sensitive_endpoints.txt') == ['/api/users', '/admin/config.json']
+    assert _lines(out / 'manual_secrets.txt') == ['const apiKey = "AKIA123";', 'localStorage.setItem("session", token);']
+    assert _lines(out / 'local_storage_refs.txt') == ['localStorage.setItem("session", token);']
+
+
+def test_results_are_appended_to_existing_outputs(urls_file, tmp_path):
+    out = tmp_path / 'js'
+    out.mkdir()
+    (out / 'manual_secrets.txt').write_text('from an earlier command\n')
+    js_analysis.analyze_js_urls(urls_file, str(out), workers=2)
+    assert _lines(out / 'manual_secrets.txt')[0] == 'from an earlier command'
+    assert len(_lines(out / 'manual_secrets.txt')) == 3
+
+
+def test_worker_connections_are_closed_when_the_scan_ends(urls_file, tmp_path, monkeypatch):
+    opened = []
+
+    class Recording(HttpClient):
+        def _connection(self, scheme, host, port):
+            conn = super()._connection(scheme, host, port)
+            opened.append(conn)
+            return conn
+    monkeypatch.setattr(js_analysis, 'HttpClient', Recording)
+    js_analysis.analyze_js_urls(urls_file, str(tmp_path / 'js'), workers=4)
+    assert opened and all(conn.sock is None for conn in opened)
@@ -0,0 +1,63 @@
+import subprocess
+import sys
+
+import pytest
+
+from cyfer_recon.core import limits
+from cyfer_recon.core.limits import ResourceLimits, Sandbox
+
+pytestmark = pytest.mark.skipif(limits.resource is None, reason="no rlimits on this platform")
+
+
+@pytest.fixture(autouse=True)
+def no_cgroup(monkeypatch):
+    # Keep memory limits on RLIMIT_DATA so the verdicts do not depend on the host's cgroups
+    monkeypatch.setattr(limits, 'cgroup_parent', lambda: None)
+
+
+def run(sandbox, code):
+    proc = subprocess.run(sandbox.argv([sys.executable, '-c', code]), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          universal_newlines=True, timeout=60, **sandbox.popen_kwargs())
+    try:
+        return proc.returncode, sandbox.verdict(proc.returncode, proc.stderr)
+    finally:
+        sandbox.close()
+
+
+def test_bad_limits_are_rejected():
+    with pytest.raises(ValueError, match='memroy_mb'):
+        ResourceLimits.from_config('amass', {'memroy_mb': 1024})
+    with pytest.raises(ValueError, match='cpu_seconds'):
+        ResourceLimits.from_config('amass', {'cpu_seconds': -1})
+    with pytest.raises(ValueError, match='ionice'):
+        ResourceLimits.from_config('amass', {'ionice': 'best-effort:9'})
+    assert ResourceLimits.from_config('amass', {'nice': 10, 'ionice': 'idle'}).describe() == 'nice 10, ionice idle'
+
+
+def test_limits_are_found_by_tool_and_check_binary():
+    found = limits.tool_limits({'amass': {'check': 'amass-cli', 'limits': {'cpu_seconds': 60}}, 'httpx': {'check': 'httpx'}})
+    assert set(found) == {'amass', 'amass-cli'}
+    assert limits.limits_for_command('cat hosts.txt | amass enum -df -', found)[0] == 'amass'
+    assert limits.limits_for_command('echo amassed', found) is None
+    assert limits.sandbox_for(['/usr/bin/amass-cli', 'enum'], found).limits is found['amass']
+    assert limits.sandbox_for(['httpx'], found) is None
+
+
+def test_an_ordinary_failure_is_not_blamed_on_a_limit():
+    assert run(Sandbox('python', ResourceLimits(memory_mb=512, cpu_seconds=60)), 'raise SystemExit(3)') == (3, None)
+
+
+def test_running_out_of_cpu_time_is_reported():
+    returncode, verdict = run(Sandbox('python', ResourceLimits(cpu_seconds=1)), 'while True: pass')
+    assert returncode != 0 and verdict == 'cpu limit (1s)'
+
+
+def test_running_out_of_memory_is_reported():
+    returncode, verdict = run(Sandbox('python', ResourceLimits(memory_mb=256)), 'b = bytearray(1024 * 1024 * 1024)')
+    assert returncode != 0 and verdict == 'memory limit (256 MB)'
+
+
+def test_running_out_of_file_descriptors_is_reported():
+    code = 'import os\nfiles = [open(os.devnull) for _ in range(200)]'
+    returncode, verdict = run(Sandbox('python', ResourceLimits(nofile=32)), code)
+    assert returncode != 0 and verdict == 'open files limit (32)'
@@ -0,0 +1,36 @@
+import pytest
+
+from cyfer_recon.core.liveness import is_active
+
+TOOLS = {
+    'nuclei': {'check': 'nuclei'},
+    'ffuf': {'check': 'ffuf'},
+    'subjack': {'check': 'subjack'},
+    'gau': {'check': 'gau', 'passive': True},
+}
+
+
+@pytest.mark.parametrize('cmd', [
+    'nuclei -u https://{target} -tags cors -o {output}/cors/{target}_cors.txt',
+    "nuclei -u 'http://{target}:8080/api?x=1' -o {output}/api.txt",
+    'ffuf -w {wordlist} -u https://{target}/FUZZ -o {output}/ffuf_{target}.json',
+    'cyfer-portscan {target} {output}/{target}_nmap.txt',
+    'cyfer-probe http://{target} -o {output}/headers/{target}_headers.txt --format headers',
+])
+def test_commands_aimed_at_the_target_are_gated(cmd):
+    assert is_active(cmd, TOOLS)
+
+
+@pytest.mark.parametrize('cmd', [
+    'nuclei -l {shard}{output}/{target}_alive_subs.txt -tags takeover -o {output}/takeovers/{target}_nuclei.txt',
+    'subjack -w {output}/{target}_alive_subs.txt -o {output}/takeovers/{target}_subjack.txt',
+    'cat {shard}{output}/js/live_output.txt | nuclei -t exposures -o {output}/js/nuclei.txt',
+    'cyfer-probe {output}/js/alljs_unique.txt -o {output}/js/live_output.txt --format urls',
+    'cyfer-urlnorm {output}/urls/{target}_unique.txt {output}/urls/{target}_gau.txt',
+    'cyfer-techscan {output}/tech/{target}_tech.json https://{target} {output}/{target}_alive_subs.txt',
+    'cyfer-favicon {output}/favicons/{target}_favfreak.txt https://{target} {output}/{target}_alive_subs.txt',
+    'gau {target} > {output}/urls/{target}_gau.txt',
+    'nuclei -u https://github.com/search?q={target} -o {output}/x.txt',
+])
+def test_list_driven_passive_and_third_party_commands_are_not_gated(cmd):
+    assert not is_active(cmd, TOOLS)
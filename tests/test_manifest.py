@@ -0,0 +1,58 @@
+import os
+import time
+
+import pytest
+
+from cyfer_recon.core import manifest
+
+
+@pytest.fixture
+def root(tmp_path):
+    yield str(tmp_path / 'example.com')
+    manifest.configure(False)
+    manifest._manifests.clear()
+
+
+def _run(command, root):
+    """Record a successful run of command, creating its output the way the tool would."""
+    job = manifest.prepare(command, 'nuclei', root)
+    for rel in job.outputs:
+        os.makedirs(os.path.dirname(os.path.join(root, rel)), exist_ok=True)
+        with open(os.path.join(root, rel), 'w') as f:
+            f.write('result\n')
+    job.record()
+
+
+def test_commands_without_input_files_are_not_skipped_without_a_max_age(root):
+    cmd = f"nuclei -u https://example.com -o {root}/vuln/nuclei.txt"
+    _run(cmd, root)
+    manifest.configure(True)
+    assert not manifest.skip(manifest.prepare(cmd, 'nuclei', root))
+    manifest.configure(True, max_age=3600)
+    assert manifest.skip(manifest.prepare(cmd, 'nuclei', root))
+
+
+def test_entries_older_than_the_max_age_run_again(root):
+    cmd = f"nuclei -l {root}/alive.txt -o {root}/vuln/nuclei.txt"
+    os.makedirs(root)
+    with open(os.path.join(root, 'alive.txt'), 'w') as f:
+        f.write('a.example.com\n')
+    _run(cmd, root)
+    manifest.configure(True)
+    assert manifest.skip(manifest.prepare(cmd, 'nuclei', root))
+    manifest.configure(True, max_age=60)
+    key = manifest.prepare(cmd, 'nuclei', root).key
+    entry = dict(manifest.manifest_for(root).get(key), finished=time.time() - 120)
+    manifest.manifest_for(root).put(key, entry)
+    assert not manifest.skip(manifest.prepare(cmd, 'nuclei', root))
+
+
+def test_a_changed_wordlist_outside_the_folder_invalidates_the_entry(root, tmp_path):
+    wordlist = tmp_path / 'words.txt'
+    wordlist.write_text('admin\n')
+    cmd = f"ffuf -w {wordlist} -u https://example.com/FUZZ -o {root}/ffuf.json"
+    _run(cmd, root)
+    manifest.configure(True)
+    assert manifest.skip(manifest.prepare(cmd, 'nuclei', root))
+    wordlist.write_text('admin\nbackup\n')
+    assert not manifest.skip(manifest.prepare(cmd, 'nuclei', root))
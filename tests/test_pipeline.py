@@ -0,0 +1,57 @@
+import pytest
+
+from cyfer_recon.core import pipeline
+
+
+def test_words_quotes_and_operators_are_tokenized_like_sh():
+    tokens = pipeline.tokenize("""grep -E 'api|admin' "a b" *.txt 2>> err.log | sort -u > out\\ file.txt""")
+    assert tokens == [
+        ('word', 'grep', False), ('word', '-E', False), ('word', 'api|admin', False), ('word', 'a b', False),
+        ('word', '*.txt', True), ('op', '2>>', False), ('word', 'err.log', False), ('op', '|', False),
+        ('word', 'sort', False), ('word', '-u', False), ('op', '>', False), ('word', 'out file.txt', False),
+    ]
+
+
+@pytest.mark.parametrize('cmd', [
+    'for h in $(cat hosts.txt); do echo $h; done',
+    'subfinder -d example.com && echo done',
+    'httpx -l hosts.txt 2>&1 | tee log.txt',
+    'echo "$HOME"',
+    'cat a.txt > b.txt | sort',
+    'TOKEN=x gau example.com',
+])
+def test_shell_features_fall_back_to_the_shell(cmd):
+    assert pipeline.parse_pipeline(cmd) is None
+
+
+def test_stages_carry_their_redirections():
+    last = pipeline.parse_pipeline('cat a.txt | sort -u >> out.txt 2> err.txt')[-1]
+    assert last.argv == ['sort', '-u']
+    assert (last.stdout_path, last.stdout_append, last.stderr_path, last.stderr_append) == ('out.txt', True, 'err.txt', False)
+
+
+@pytest.fixture
+def no_shell(monkeypatch):
+    def refuse(*args):
+        raise AssertionError("ran through /bin/sh")
+    monkeypatch.setattr(pipeline, '_run_shell', refuse)
+
+
+def test_in_process_stages_stream_into_real_processes(tmp_path, no_shell):
+    (tmp_path / 'a.txt').write_text('b.example.com\na.example.com\n')
+    (tmp_path / 'b.txt').write_text('a.example.com\nadmin.example.com\n')
+    (tmp_path / 'seen.txt').write_text('B.EXAMPLE.COM\n')
+    result = pipeline.run_command("cat *.txt | grep -v admin | sort -u | tr a-z A-Z | anew seen.txt", cwd=str(tmp_path))
+    assert result.returncode == 0
+    # anew prints and appends only the lines seen.txt did not have yet
+    assert result.stdout == 'A.EXAMPLE.COM\n'
+    assert (tmp_path / 'seen.txt').read_text() == 'B.EXAMPLE.COM\nA.EXAMPLE.COM\n'
+
+
+def test_the_last_stage_sets_the_exit_code(tmp_path, no_shell):
+    (tmp_path / 'a.txt').write_text('x\n')
+    assert pipeline.run_command('cat a.txt | false', cwd=str(tmp_path)).returncode == 1
+    assert pipeline.run_command('cat a.txt | grep nothing', cwd=str(tmp_path)).returncode == 1
+    result = pipeline.run_command('cat missing.txt a.txt | tee copy.txt', cwd=str(tmp_path))
+    assert result.returncode == 0 and result.stdout == 'x\n' and 'missing.txt' in result.stderr
+    assert (tmp_path / 'copy.txt').read_text() == 'x\n'
@@ -0,0 +1,63 @@
+import pytest
+
+from cyfer_recon.core import plan
+from cyfer_recon.core.templates import CommandTemplate
+
+ESTIMATES = {'subfinder': 100.0, 'httpx': 20.0, 'nuclei': 300.0, 'gowitness': 10.0}
+
+
+@pytest.fixture(autouse=True)
+def estimates(monkeypatch):
+    monkeypatch.setattr(plan, '_Estimator', lambda: lambda tool, task, target, output_dir: (ESTIMATES[tool], 'history'))
+
+
+def _targets(tmp_path, *names):
+    return [(name, str(tmp_path / name)) for name in names]
+
+
+def _task(name, concurrent, *commands):
+    return (name, [CommandTemplate(c, name) for c in commands], concurrent)
+
+
+CHAIN = _task('Recon', True,
+              'subfinder -d {target} -o {output}/subs.txt',
+              'httpx -l {output}/subs.txt -o {output}/alive.txt',
+              'nuclei -l {output}/alive.txt -o {output}/vuln.txt')
+
+
+def test_the_critical_path_follows_data_dependencies(tmp_path):
+    data = plan.build(_targets(tmp_path, 'a.example.com'), [CHAIN], workers=4)
+    jobs = data['jobs']
+    assert [j['depends_on'] for j in jobs] == [[], [0], [1]]
+    assert data['critical_path'] == {'seconds': 420.0, 'jobs': [0, 1, 2]}
+    # The concurrent pass only orders starts, so the reads are flagged
+    assert len(data['warnings']) == 2
+
+
+def test_targets_share_the_workers_instead_of_running_one_after_another(tmp_path):
+    data = plan.build(_targets(tmp_path, 'a.example.com', 'b.example.com'), [CHAIN], workers=6)
+    assert data['job_count'] == 6
+    # Every job starts at once on the simulated clock; no target waits for another
+    assert [j['start'] for j in data['jobs']] == [0.0] * 6
+    assert data['makespan_seconds'] == 300.0
+    assert data['critical_path']['seconds'] == 420.0
+    assert {data['jobs'][i]['target'] for i in data['critical_path']['jobs']} == {'a.example.com'}
+
+
+def test_sequential_jobs_wait_for_their_target_and_run_one_at_a_time(tmp_path):
+    tasks = [_task('Enum', True, 'subfinder -d {target} -o {output}/subs.txt'),
+             _task('Shots', False, 'gowitness file -f {output}/subs.txt')]
+    data = plan.build(_targets(tmp_path, 'a.example.com', 'b.example.com'), tasks, workers=4)
+    jobs = data['jobs']
+    assert [(j['target'], j['mode']) for j in jobs] == [
+        ('a.example.com', 'concurrent'), ('a.example.com', 'sequential'),
+        ('b.example.com', 'concurrent'), ('b.example.com', 'sequential')]
+    assert [(j['start'], j['end']) for j in jobs] == [(0.0, 100.0), (100.0, 110.0), (0.0, 100.0), (110.0, 120.0)]
+    assert data['makespan_seconds'] == 120.0
+    assert data['critical_path'] == {'seconds': 120.0, 'jobs': [0, 1, 3]}
+
+
+def test_a_single_worker_runs_everything_back_to_back(tmp_path):
+    data = plan.build(_targets(tmp_path, 'a.example.com', 'b.example.com'), [CHAIN], workers=1)
+    assert data['makespan_seconds'] == 2 * 420.0
+    assert data['utilization'] == 1.0
@@ -0,0 +1,66 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from cyfer_recon.core import probe
+
+
+class _Site(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    hits = 0
+
+    def do_GET(self):
+        type(self).hits += 1
+        body = b'<html><title>Home</title></html>'
+        self.send_response(200)
+        self.send_header('Server', 'nginx/1.25.3')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def site(monkeypatch):
+    _Site.hits = 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Site)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    analyzed = []
+
+    def analyze(response):
+        analyzed.append(threading.current_thread().name)
+        return [{'name': 'Nginx', 'version': '1.25.3'}]
+    monkeypatch.setattr(probe, '_analyze', analyze)
+    yield f"http://127.0.0.1:{server.server_address[1]}/", analyzed
+    server.shutdown()
+    server.server_close()
+
+
+def test_views_without_tech_do_not_fingerprint(site):
+    url, analyzed = site
+    result, = probe.probe_iter([url])
+    assert (result.status, result.title, result.tech) == (200, 'Home', [])
+    assert analyzed == []
+
+
+def test_tech_hints_are_computed_on_the_match_threads_and_cached(site):
+    url, analyzed = site
+    result, = probe.probe_iter([url], tech=True)
+    assert result.tech == ['Nginx:1.25.3']
+    assert len(analyzed) == 1 and analyzed[0].startswith('cyfer-probe-match')
+    # Later tasks get the cached response, with or without the hints
+    again, = probe.probe_iter([url], tech=True)
+    plain, = probe.probe_iter([url])
+    assert again.tech == ['Nginx:1.25.3'] and plain.tech == []
+    assert _Site.hits == 1 and len(analyzed) == 1
+
+
+def test_tech_after_a_plain_probe_fetches_once_more(site):
+    url, analyzed = site
+    list(probe.probe_iter([url]))
+    result, = probe.probe_iter([url], tech=True)
+    assert result.tech == ['Nginx:1.25.3']
+    assert _Site.hits == 2 and len(analyzed) == 1
@@ -0,0 +1,45 @@
+import subprocess
+
+import pytest
+
+from cyfer_recon.core import shards
+
+
+@pytest.fixture
+def sharding():
+    shards.configure(4)
+    shards.set_capacity(4)
+    yield
+    shards.configure(1)
+    shards.set_capacity(1)
+
+
+def _scan(cmd, stages):
+    """Stand-in scanner: writes '<a|b>:<host>' to its first and second -o file, one line per input host."""
+    argv = stages[0].argv
+    with open(argv[argv.index('-l') + 1]) as f:
+        hosts = [line.strip() for line in f if line.strip()]
+    paths = [argv[idx + 1] for idx, word in enumerate(argv) if word == '-o']
+    for label, path in zip('ab', paths):
+        with open(path, 'w') as out:
+            out.writelines(f"{label}:{h}\n" for h in hosts)
+    return subprocess.CompletedProcess(cmd, 0, '', '')
+
+
+def test_chunk_outputs_are_merged_in_input_order(tmp_path, sharding):
+    hosts = [f"h{i}.example.com" for i in range(400)]
+    (tmp_path / 'alive.txt').write_text('\n'.join(hosts) + '\n')
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'b').mkdir()
+    cmd = f"scan -l {tmp_path}/alive.txt -o {tmp_path}/a/out.txt -o {tmp_path}/b/out.txt"
+    result = shards.run_sharded(cmd, None, f"{tmp_path}/alive.txt", _scan)
+    assert result is not None and result.returncode == 0
+    # Same file name in two folders: each output gets only its own lines, all of them, in order
+    assert (tmp_path / 'a' / 'out.txt').read_text().splitlines() == [f"a:{h}" for h in hosts]
+    assert (tmp_path / 'b' / 'out.txt').read_text().splitlines() == [f"b:{h}" for h in hosts]
+
+
+def test_short_lists_are_not_sharded(tmp_path, sharding):
+    (tmp_path / 'alive.txt').write_text('one.example.com\n')
+    cmd = f"scan -l {tmp_path}/alive.txt -o {tmp_path}/out.txt"
+    assert shards.run_sharded(cmd, None, f"{tmp_path}/alive.txt", _scan) is None
@@ -0,0 +1,68 @@
+import gzip
+import os
+import subprocess
+
+import pytest
+
+from cyfer_recon.core import storage
+
+
+@pytest.fixture
+def gzip_storage():
+    storage.configure('gzip', min_size=64)
+    yield
+    storage.configure(None)
+
+
+def test_small_outputs_stay_plain_and_large_ones_spill_to_gzip(tmp_path, gzip_storage):
+    small, large = str(tmp_path / 'small.txt'), str(tmp_path / 'large.txt')
+    with storage.open_text(small, 'w') as f:
+        f.write('a.example.com\n')
+    with storage.open_text(large, 'w') as f:
+        f.writelines(f"{i}.example.com\n" for i in range(100))
+    assert os.path.isfile(small) and not os.path.exists(small + '.gz')
+    assert not os.path.exists(large) and storage.detect(large + '.gz') == 'gzip'
+    assert list(storage.iter_lines(large)) == [f"{i}.example.com\n" for i in range(100)]
+    # Rewriting a compressed output with little data leaves only the plain file
+    with storage.open_text(large, 'w') as f:
+        f.write('only\n')
+    assert os.path.isfile(large) and not os.path.exists(large + '.gz')
+
+
+def test_appends_keep_the_form_the_file_has(tmp_path, gzip_storage):
+    path = str(tmp_path / 'urls.txt')
+    with gzip.open(path + '.gz', 'wt') as f:
+        f.write('one\n')
+    with storage.open_text(path, 'a') as f:
+        f.write('two\n')
+    assert not os.path.exists(path)
+    with gzip.open(path + '.gz', 'rt') as f:
+        assert f.read() == 'one\ntwo\n'
+
+
+def test_compact_tree_compresses_finished_large_files_only(tmp_path, gzip_storage):
+    (tmp_path / 'ports').mkdir()
+    (tmp_path / 'ports' / 'scan.gnmap').write_text('x' * 200)
+    (tmp_path / 'tiny.txt').write_text('x')
+    (tmp_path / '.hidden.txt').write_text('x' * 200)
+    (tmp_path / 'shot.png').write_bytes(b'x' * 200)
+    count, saved = storage.compact_tree(str(tmp_path))
+    assert count == 1 and saved > 0
+    assert sorted(p.name for p in tmp_path.rglob('*') if p.is_file()) == ['.hidden.txt', 'scan.gnmap.gz', 'shot.png', 'tiny.txt']
+    storage.restore_file(str(tmp_path / 'ports' / 'scan.gnmap'))
+    assert (tmp_path / 'ports' / 'scan.gnmap').read_text() == 'x' * 200
+
+
+def test_external_tools_read_compressed_inputs_through_a_plain_view(tmp_path, gzip_storage):
+    source = str(tmp_path / 'subs.txt')
+    with gzip.open(source + '.gz', 'wt') as f:
+        f.write('a.example.com\nb.example.com\n')
+    out = str(tmp_path / 'out.txt')
+    with gzip.open(out + '.gz', 'wt') as f:
+        f.write('earlier\n')
+    with storage.plain_views(f"cat {source} >> {out}", str(tmp_path)) as cmd:
+        assert source not in cmd
+        subprocess.run(cmd, shell=True, check=True, timeout=10)
+    # The appended-to output was restored to a plain file first
+    assert open(out).read() == 'earlier\na.example.com\nb.example.com\n'
+    assert not any(p.name.startswith('cyfer-views-') for p in tmp_path.iterdir())
@@ -0,0 +1,69 @@
+import subprocess
+import threading
+
+import pytest
+
+from cyfer_recon.core import storage, streaming
+from cyfer_recon.core.templates import compile_command
+
+PRODUCER = "subfinder -d {target} -o {output}/{target}_subs.txt"
+CONSUMER = "httpx -l {shard}{output}/{target}_subs.txt -o {output}/{target}_alive.txt"
+
+
+@pytest.fixture
+def streams(monkeypatch):
+    monkeypatch.setattr(streaming, 'POLL_SECONDS', 0.01)
+    streaming.configure(True, batch_lines=2, batch_seconds=0)
+    yield
+    streaming.configure(False)
+
+
+def test_command_paths_tell_reads_from_writes():
+    cmd = "httpx -l /out/subs.txt -o /out/alive.txt | tee -a /out/log.txt > /out/all.txt"
+    assert storage.command_paths(cmd, '/out') == [
+        ('/out/subs.txt', False), ('/out/alive.txt', True), ('/out/log.txt', True), ('/out/all.txt', True)]
+
+
+def test_consumers_of_concurrent_tasks_start_with_their_producer():
+    producer, consumer = compile_command(PRODUCER), compile_command(CONSUMER)
+    plan = [('Subdomains', [producer], True), ('Probe', [consumer], True)]
+    kept, consumers = streaming.link(plan)
+    assert kept == [('Subdomains', [producer], True), ('Probe', [], True)]
+    assert consumers == {producer: [('Probe', consumer)]}
+
+
+def test_consumers_of_sequential_tasks_keep_their_place():
+    producer, consumer = compile_command(PRODUCER), compile_command(CONSUMER)
+    plan = [('Subdomains', [producer], True), ('Probe', [consumer], False)]
+    assert streaming.link(plan) == (plan, {})
+
+
+def test_batches_are_run_as_lines_arrive_and_appended_in_order(tmp_path, streams):
+    source, output = tmp_path / 'subs.txt', tmp_path / 'alive.txt'
+    stream = streaming.Stream(str(source))
+    hosts = [f"h{i}.example.com" for i in range(5)]
+    batches = []
+
+    def produce():
+        with open(source, 'w') as f:
+            for host in hosts:
+                f.write(host + '\n')
+                f.flush()
+        stream.closed.set()
+
+    def run(cmd, stages):
+        argv = stages[0].argv
+        with open(argv[argv.index('-l') + 1]) as f:
+            lines = f.read().split()
+        batches.append(lines)
+        with open(argv[argv.index('-o') + 1], 'w') as out:
+            out.writelines(f"alive:{h}\n" for h in lines)
+        return subprocess.CompletedProcess(cmd, 0, 'ok\n', '')
+
+    threading.Thread(target=produce).start()
+    result = streaming.run_streamed(f"httpx -l {source} -o {output}", None, stream, run)
+    assert result.returncode == 0
+    assert [h for batch in batches for h in batch] == hosts
+    assert all(len(batch) <= 2 for batch in batches)
+    assert output.read_text().splitlines() == [f"alive:{h}" for h in hosts]
+    assert not any(p.name.startswith('.cyfer-stream-') for p in tmp_path.iterdir())
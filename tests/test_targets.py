@@ -0,0 +1,43 @@
+import itertools
+
+from cyfer_recon.core.targets import ScopeRules, expand_entry, iter_targets, record_targets
+
+
+def test_cidrs_and_ranges_are_expanded():
+    assert list(expand_entry('10.0.0.0/30')) == ['10.0.0.1', '10.0.0.2']
+    assert list(expand_entry('10.0.0.7/32')) == ['10.0.0.7']
+    assert list(expand_entry('192.168.1.250-252')) == ['192.168.1.250', '192.168.1.251', '192.168.1.252']
+    assert list(expand_entry('192.168.1.255-192.168.2.1')) == ['192.168.1.255', '192.168.2.0', '192.168.2.1']
+    assert list(expand_entry('https://example.com/a/b')) == ['https://example.com/a/b']
+
+
+def test_large_blocks_are_expanded_lazily():
+    first = list(itertools.islice(iter_targets(['10.0.0.0/8']), 3))
+    assert first == ['10.0.0.1', '10.0.0.2', '10.0.0.3']
+
+
+def test_files_and_inline_lists_are_normalized_and_deduplicated(tmp_path):
+    listing = tmp_path / 'targets.txt'
+    listing.write_text('# scope\nhttps://WWW.Example.com/login?x=1\n*.example.org., api.example.com # staging\n')
+    assert list(iter_targets([str(listing), 'www.example.com,EXAMPLE.org bad_host!'])) == [
+        'www.example.com', 'example.org', 'api.example.com']
+
+
+def test_scope_rules_filter_targets(tmp_path):
+    rules = tmp_path / 'exclude.txt'
+    rules.write_text('dev.example.com\n10.0.0.2/31\n')
+    scope = ScopeRules.from_options('example.com,10.0.0.0/29', str(rules))
+    entries = 'example.com api.example.com dev.example.com x.dev.example.com other.com 10.0.0.0/29'
+    assert list(iter_targets([entries], scope)) == [
+        'example.com', 'api.example.com', '10.0.0.1', '10.0.0.4', '10.0.0.5', '10.0.0.6']
+    assert ScopeRules(['*.shop.example.com']).allows('eu.shop.example.com')
+    assert not ScopeRules(['*.shop.example.com']).allows('shop.example.com')
+
+
+def test_recorded_targets_are_written_as_they_pass(tmp_path):
+    path = tmp_path / 'final.txt'
+    stream = record_targets(iter_targets(['b.com a.com b.com']), str(path))
+    assert next(stream) == 'b.com'
+    assert path.read_text() == 'b.com\n'
+    assert list(stream) == ['a.com']
+    assert path.read_text() == 'b.com\na.com\n'
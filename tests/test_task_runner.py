@@ -0,0 +1,141 @@
+import io
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from rich.console import Console
+
+from cyfer_recon.core import task_runner
+
+TASKS = {
+    'Scan': {'commands': ['subfinder -d {target} -o {output}/subs.txt', 'naabu -host {target} -o {output}/ports.txt'],
+             'run_mode': 'concurrent'},
+    'Report': {'commands': ['cat {output}/subs.txt', 'cat {output}/ports.txt'], 'run_mode': 'sequential'},
+}
+
+
+@pytest.fixture
+def ran(monkeypatch):
+    """Record every job run_tasks starts instead of running it: (target, command, targets read so far)."""
+    read = []
+    calls = []
+    lock = threading.Lock()
+
+    def fake(target, task, commands, output_dir, console, progress=None, parent_task_id=None, *args):
+        with lock:
+            calls.append((target, commands[0].source, len(read)))
+        if progress is not None:
+            progress.advance(parent_task_id, 1)
+        if target == 't1.example.com' and commands[0].tool == 'naabu':
+            raise task_runner.ToolNotFoundError("Tool 'naabu' not found in PATH.")
+    monkeypatch.setattr(task_runner, 'run_task_for_target', fake)
+
+    def targets(n):
+        for i in range(n):
+            read.append(i)
+            yield f"t{i}.example.com"
+    targets.read = read
+    return targets, calls
+
+
+def _run(targets, workers=1, **kwargs):
+    task_runner.run_tasks(targets, list(TASKS), TASKS, '/tmp/out', True, Console(file=io.StringIO()),
+                          max_workers=workers, **kwargs)
+
+
+def test_targets_are_read_lazily_in_one_pass(ran):
+    targets, calls = ran
+    _run(targets(50))
+    assert len(calls) == 200
+    # The first job starts long before the last target is read
+    assert calls[0][2] < 50
+
+
+def test_sequential_jobs_follow_their_targets_concurrent_jobs_in_order(ran):
+    targets, calls = ran
+    _run(targets(5), workers=4)
+    for i in range(5):
+        run = [cmd.split()[0] if cmd.startswith(('subfinder', 'naabu')) else cmd
+               for target, cmd, _ in calls if target == f"t{i}.example.com"]
+        assert sorted(run[:2]) == ['naabu', 'subfinder']
+        assert run[2:] == ['cat {output}/subs.txt', 'cat {output}/ports.txt']
+
+
+def test_each_target_is_finished_once_its_last_job_is_done(ran):
+    targets, calls = ran
+    finished = {}
+
+    def done(target, error):
+        runs = [c for c in calls if c[0] == target]
+        finished[target] = (error, len(runs), len(targets.read))
+    _run(targets(50), on_target_done=done)
+    assert len(finished) == 50
+    assert all(runs == 4 for _, runs, _ in finished.values())
+    # Only the target whose job raised is failed
+    assert finished['t1.example.com'][0] == "Tool 'naabu' not found in PATH."
+    assert [t for t, (error, _, _) in finished.items() if error] == ['t1.example.com']
+    # The first target is post-processed while later ones are still being read
+    assert finished['t0.example.com'][2] < 50
+
+
+class _Job:
+    """Minimal stand-in for a compiled template in scheduler tests."""
+
+    def __init__(self, tool):
+        self.tool = tool
+
+
+def test_jobs_are_read_through_a_bounded_window():
+    read = []
+
+    def jobs():
+        for i in range(1000):
+            read.append(i)
+            yield (f"t{i}.example.com", 'Scan', [_Job('httpx')], True)
+    seen_at_start = []
+
+    def submit(executor, job):
+        seen_at_start.append(len(read))
+        return executor.submit(lambda: None)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        task_runner._run_scheduled(pool, jobs(), 2, submit, Console(file=io.StringIO()))
+    assert len(seen_at_start) == 1000
+    assert all(at - i <= 2 * task_runner.SCHEDULER_LOOKAHEAD for i, at in enumerate(seen_at_start))
+
+
+def _schedule(jobs, workers, estimates=None, monkeypatch=None):
+    """Run jobs through _run_scheduled on a real pool; returns the order in which they were submitted."""
+    if estimates is not None:
+        monkeypatch.setattr(task_runner.history, 'estimate', lambda tool, task, target, output_dir=None: estimates[tool])
+    started = []
+
+    def submit(executor, job):
+        started.append(job[2][0].tool)
+        return executor.submit(lambda: None)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        task_runner._run_scheduled(pool, iter(jobs), workers, submit, Console(file=io.StringIO()))
+    return started
+
+
+def test_the_longest_remaining_chain_goes_first():
+    window = {('a.com', 'Scan'): deque([(10.0, None), (5.0, None)]), ('b.com', 'Scan'): deque([(100.0, None)])}
+    assert task_runner.pick_group(window, [], 4, 1) == ('b.com', 'Scan')
+    # Once long jobs hold all but the reserved workers, the shortest next job starts instead
+    assert task_runner.pick_group(window, [900.0, 600.0, 300.0], 4, 1) == ('a.com', 'Scan')
+
+
+def test_long_jobs_start_first_and_short_ones_keep_a_reserved_slot(monkeypatch):
+    estimates = {'httpx': 5.0, 'nmap': 900.0, 'nuclei': 300.0, 'dnsx': 20.0, 'ffuf': 600.0, 'katana': 10.0}
+    jobs = [(f"t{i}.example.com", 'Scan', [_Job(tool)], True) for i, tool in enumerate(estimates)]
+    started = _schedule(jobs, 4, estimates, monkeypatch)
+    assert started[:4] == ['nmap', 'ffuf', 'nuclei', 'httpx']
+    assert sorted(started) == sorted(estimates)
+
+
+def test_commands_of_one_task_keep_their_config_order(monkeypatch):
+    estimates = {'httpx': 5.0, 'nuclei': 300.0, 'subfinder': 100.0}
+    jobs = [('a.com', 'Probe', [_Job('httpx')], True), ('a.com', 'Probe', [_Job('nuclei')], True),
+            ('b.com', 'Subs', [_Job('subfinder')], True)]
+    # The a.com chain (305s) beats subfinder (100s), but httpx still starts before nuclei
+    assert _schedule(jobs, 4, estimates, monkeypatch) == ['httpx', 'nuclei', 'subfinder']
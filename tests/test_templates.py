@@ -0,0 +1,60 @@
+import json
+import os
+import shlex
+
+import pytest
+
+import cyfer_recon
+from cyfer_recon.core.templates import CommandTemplate, compile_tasks
+from cyfer_recon.core.utils import TemplateError
+
+OUTPUT = '/tmp/scan out/example.com'
+
+
+def test_values_stay_single_argv_words_and_are_quoted_in_the_text():
+    rendered = CommandTemplate('httpx -l {output}/subs.txt -o {output}/alive.txt').render(target='example.com', output=OUTPUT)
+    assert rendered.stages[0].argv == ['httpx', '-l', f"{OUTPUT}/subs.txt", '-o', f"{OUTPUT}/alive.txt"]
+    assert shlex.split(rendered.command) == rendered.stages[0].argv
+
+
+def test_targets_that_are_not_hosts_are_refused():
+    template = CommandTemplate('subfinder -d {target}')
+    with pytest.raises(TemplateError):
+        template.render(target='example.com; rm -rf ~', output=OUTPUT)
+    with pytest.raises(TemplateError):
+        template.render(output=OUTPUT)
+
+
+def test_shell_commands_get_quoted_values():
+    template = CommandTemplate('for u in $(cat {output}/urls.txt); do curl -s $u; done')
+    assert template.needs_shell
+    rendered = template.render(target='example.com', output=OUTPUT)
+    assert rendered.stages is None
+    assert rendered.command == "for u in $(cat '/tmp/scan out/example.com'/urls.txt); do curl -s $u; done"
+
+
+def test_unknown_placeholders_fail_at_compile_time():
+    with pytest.raises(TemplateError, match='{domain}'):
+        CommandTemplate('subfinder -d {domain}')
+
+
+def test_task_outputs_are_rewritten_under_the_output_folder():
+    template = CommandTemplate('subfinder -d {target} -o subs.txt', task='Subdomain Enumeration')
+    assert template.text == 'subfinder -d {target} -o {output}/subfinder_subdomain_enumeration_1.txt'
+    ffuf = CommandTemplate('ffuf -u https://{target}/FUZZ -w {wordlist} -o out.json', task='Fuzzing')
+    rendered = ffuf.render(target='example.com', output='/out', wordlist='/lists/raft small.txt')
+    assert rendered.stages[0].argv[-1] == '/out/ffuf_raft_small.txt'
+
+
+def test_the_shard_marker_names_the_input_list():
+    template = CommandTemplate('nuclei -l {shard}{output}/alive.txt -o {output}/nuclei.txt')
+    rendered = template.render(target='example.com', output='/out')
+    assert rendered.shard_input == '/out/alive.txt'
+    assert rendered.stages[0].argv[:3] == ['nuclei', '-l', '/out/alive.txt']
+
+
+def test_every_packaged_task_compiles():
+    with open(os.path.join(os.path.dirname(cyfer_recon.__file__), 'config', 'tasks.json'), encoding='utf-8') as f:
+        tasks = json.load(f)
+    compiled = compile_tasks(tasks)
+    assert set(compiled) == set(tasks)
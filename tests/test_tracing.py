@@ -0,0 +1,73 @@
+import json
+import threading
+
+import pytest
+
+from cyfer_recon.core import tracing
+
+
+@pytest.fixture
+def tracer():
+    yield tracing.start()
+    tracing.stop()
+
+
+def _spans(tracer):
+    return [e for e in tracer.events if e['ph'] == 'X']
+
+
+def test_spans_are_free_without_a_tracer():
+    assert tracing.stop() is None
+    with tracing.span('httpx', tool='httpx') as args:
+        args['exit_code'] = 0
+    assert args == {'tool': 'httpx', 'exit_code': 0}
+
+
+def test_nested_spans_share_their_parents_lane_and_record_results(tracer):
+    with tracing.span('nuclei', target='example.com', limit=None) as args:
+        with tracing.span('chunk 1', 'shard'):
+            pass
+        args['exit_code'] = 0
+    chunk, job = _spans(tracer)
+    assert (chunk['name'], job['name']) == ('chunk 1', 'nuclei')
+    assert chunk['tid'] == job['tid'] == 0
+    assert job['args'] == {'target': 'example.com', 'exit_code': 0}
+    assert job['ts'] <= chunk['ts'] and chunk['ts'] + chunk['dur'] <= job['ts'] + job['dur']
+    with pytest.raises(ValueError):
+        with tracing.span('httpx'):
+            raise ValueError('bad input')
+    assert _spans(tracer)[-1]['args'] == {'error': 'bad input'}
+
+
+def test_concurrent_spans_get_their_own_lanes_and_free_lanes_are_reused(tracer):
+    inside, release = threading.Barrier(3), threading.Event()
+
+    def job(name):
+        with tracing.span(name):
+            inside.wait(5)
+            release.wait(5)
+    threads = [threading.Thread(target=job, args=(f"job {i}",)) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    inside.wait(5)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    with tracing.span('later'):
+        pass
+    assert sorted(e['tid'] for e in _spans(tracer)[:2]) == [0, 1]
+    assert _spans(tracer)[-1]['tid'] == 0
+    busy = [e['args']['slots'] for e in tracer.events if e['ph'] == 'C']
+    assert max(busy) == 2 and busy[-1] == 0
+    assert tracer.slots == 2
+
+
+def test_the_written_trace_is_chrome_trace_json(tracer, tmp_path):
+    with tracing.span('subfinder'):
+        pass
+    with open(tracer.write(str(tmp_path / 'traces'))) as f:
+        trace = json.load(f)
+    names = [(e['ph'], e['name']) for e in trace['traceEvents']]
+    assert names[:3] == [('M', 'process_name'), ('M', 'thread_name'), ('M', 'thread_sort_index')]
+    assert ('X', 'subfinder') in names
+    assert trace['otherData']['slots'] == 1
@@ -0,0 +1,41 @@
+import pytest
+
+from cyfer_recon.core.urls import collapse_url_files, collapse_urls, normalize_url
+
+
+@pytest.mark.parametrize('raw, expected', [
+    ('HTTPS://Example.COM:443/a//b/../c?z=1&a=2#top', 'https://example.com/a/c?a=2&z=1'),
+    ('example.com', 'http://example.com/'),
+    ('http://example.com:8080/x/./', 'http://example.com:8080/x/'),
+    ('http://[::1]:80/', 'http://[::1]/'),
+    ('ftp://example.com/file', None),
+    ('http://exa mple.com/', None),
+    ('   ', None),
+])
+def test_urls_are_normalized(raw, expected):
+    assert normalize_url(raw) == expected
+
+
+def test_urls_differing_only_in_values_or_scheme_collapse():
+    urls = [
+        'https://example.com/item?id=1&ref=a',
+        'http://example.com/item?ref=b&id=2',
+        'https://example.com/item?id=3',
+        'https://example.com/static/logo.PNG',
+        'https://example.com/other?id=1',
+    ]
+    assert list(collapse_urls(urls)) == [
+        'https://example.com/item?id=1&ref=a',
+        'https://example.com/item?id=3',
+        'https://example.com/other?id=1',
+    ]
+    assert 'https://example.com/static/logo.PNG' in list(collapse_urls(urls, keep_static=True))
+
+
+def test_dumps_are_merged_into_one_collapsed_file(tmp_path):
+    (tmp_path / 'gau.txt').write_text('https://example.com/a?x=1\nhttps://example.com/a?x=2\n')
+    (tmp_path / 'wayback.txt').write_text('http://example.com/a?x=3\nhttps://example.com/b\n')
+    out = tmp_path / 'urls' / 'collapsed.txt'
+    count = collapse_url_files([str(tmp_path / 'gau.txt'), str(tmp_path / 'wayback.txt')], str(out))
+    assert count == 2
+    assert out.read_text().splitlines() == ['https://example.com/a?x=1', 'https://example.com/b']
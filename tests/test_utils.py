@@ -0,0 +1,18 @@
+from cyfer_recon.core.templates import compile_command
+from cyfer_recon.core.utils import ensure_output_dirs
+
+
+def test_folders_of_a_quoted_output_dir_are_created(tmp_path):
+    output_dir = str(tmp_path / 'my scans' / 'example.com')
+    template = compile_command("katana -u https://{target} -o {output}/js/alljs.txt -srd {output}/screens/")
+    cmd = template.render(target='example.com', output=output_dir).command
+    assert "'" in cmd
+    ensure_output_dirs(cmd, output_dir)
+    assert (tmp_path / 'my scans' / 'example.com' / 'js').is_dir()
+    assert (tmp_path / 'my scans' / 'example.com' / 'screens').is_dir()
+
+
+def test_only_folders_the_command_names_are_created(tmp_path):
+    output_dir = str(tmp_path / 'example.com')
+    ensure_output_dirs(f"nuclei -u https://example.com -o {output_dir}/vuln/nuclei.txt", output_dir)
+    assert sorted(p.name for p in (tmp_path / 'example.com').iterdir()) == ['vuln']